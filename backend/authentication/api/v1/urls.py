@@ -12,6 +12,7 @@ from authentication.views import (
 
 
 TokenRefreshView.renderer_classes = [BankJSONRenderer, BrowsableAPIRenderer]
+TokenRefreshView.rate_limit_scope = 'auth'
 
 router = routers.DefaultRouter(trailing_slash=settings.APPEND_SLASH)
 router.register(r'users', UserViewSet)
@@ -0,0 +1,43 @@
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.contrib.auth.backends import ModelBackend
+from django.db import transaction
+
+PERMISSIONS_VERSION_CACHE_KEY = 'permissions:version'
+
+
+def get_cache():
+    return caches[settings.PERMISSIONS_CACHE]
+
+
+def get_permissions_version():
+    return get_cache().get_or_set(PERMISSIONS_VERSION_CACHE_KEY, lambda: uuid.uuid4().hex, None)
+
+
+def bump_permissions_version():
+    # A fresh random version rather than a counter, so an evicted key can never bring back an old version.
+    # After the commit, a read in between would otherwise cache the old permissions under the new version.
+    transaction.on_commit(lambda: get_cache().set(PERMISSIONS_VERSION_CACHE_KEY, uuid.uuid4().hex, None))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend whose permission sets are kept in the shared cache, keyed by user and by the
+    permissions version. Any change to group membership, group or user permissions bumps the
+    version (see authentication.signals.handlers), which invalidates every cached set at once.
+    """
+
+    def get_permissions_cache_key(self, user_obj):
+        return f'permissions:{get_permissions_version()}:{user_obj.pk}:{int(user_obj.is_superuser)}'
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, '_perm_cache'):
+            user_obj._perm_cache = get_cache().get_or_set(
+                self.get_permissions_cache_key(user_obj),
+                lambda: super(CachedModelBackend, self).get_all_permissions(user_obj),
+                settings.PERMISSIONS_CACHE_TIMEOUT,
+            )
+        return user_obj._perm_cache
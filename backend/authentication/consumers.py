@@ -0,0 +1,42 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from authentication.models import UserRole
+from core.events import get_bank_group, get_provider_group, get_customer_group
+
+
+def get_user_groups(user):
+    role_object = user.role_object
+    if role_object is None:
+        return []
+    if user.role == UserRole.BANK_PERSONNEL.value:
+        return [get_bank_group(role_object.bank_id)]
+    if user.role == UserRole.LOAN_PROVIDER.value:
+        return [get_provider_group(role_object.pk)]
+    if user.role == UserRole.LOAN_CUSTOMER.value:
+        return [get_customer_group(role_object.pk)]
+    return []
+
+
+class EventsConsumer(AsyncJsonWebsocketConsumer):
+    # Server push only: joins the groups of the authenticated user and relays their events (core.events)
+    event_groups = ()
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close()
+            return
+        self.event_groups = await database_sync_to_async(get_user_groups)(user)
+        for group in self.event_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        for group in self.event_groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        pass
+
+    async def push_event(self, message):
+        await self.send_json({'event': message['event'], 'data': message['data']})
@@ -1,12 +1,24 @@
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from channels.security.websocket import OriginValidator
+from django.db import DEFAULT_DB_ALIAS
+from django.http.cookie import parse_cookie
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from rest_framework import status
 from rest_framework import exceptions, serializers
 from rest_framework.authentication import CSRFCheck
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.exceptions import InvalidToken
+from authentication.models import UserRole, BankPersonnel, LoanProvider, LoanCustomer
+from banks.models import Branch
+
+User = get_user_model()
 
 
 access_cookie_name = settings.JWT_AUTH_ACCESS_COOKIE_NAME
@@ -18,6 +30,67 @@ cookie_secure = settings.JWT_AUTH_COOKIE_SECURE
 cookie_samesite = settings.JWT_AUTH_COOKIE_SAMESITE
 
 
+claims_backed_user = settings.JWT_CLAIMS_BACKED_USER
+
+ROLE_MODELS = {
+    UserRole.BANK_PERSONNEL.value: BankPersonnel,
+    UserRole.LOAN_PROVIDER.value: LoanProvider,
+    UserRole.LOAN_CUSTOMER.value: LoanCustomer,
+}
+USER_CLAIMS = ('role', 'is_active', 'is_staff', 'is_superuser')
+
+
+def add_user_claims(token, user):
+    # Everything get_queryset and the validators read on every request, so it doesn't have to be queried
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    role_object = user.role_object if user.role in ROLE_MODELS else None
+    if role_object is not None:
+        token['role_id'] = str(role_object.pk)
+        token['bank_id'] = str(role_object.bank_id)
+        if isinstance(role_object, BankPersonnel):
+            token['branch_id'] = str(role_object.branch_id)
+    return token
+
+
+def from_claims(model, values):
+    # A model instance loaded with only the given fields, the others are deferred.
+    # from_db expects the values in the order of the model's concrete fields.
+    fields = [field for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(
+        DEFAULT_DB_ALIAS, [field.attname for field in fields],
+        [field.to_python(values[field.attname]) for field in fields]
+    )
+
+
+def get_user_from_claims(validated_token):
+    # Builds the user and its role object as model instances with every other field deferred, so they can
+    # be used in filters and assigned to foreign keys, and only touch the database when a missing field is read
+    try:
+        user = from_claims(User, {
+            api_settings.USER_ID_FIELD: validated_token[api_settings.USER_ID_CLAIM],
+            **{claim: validated_token[claim] for claim in USER_CLAIMS},
+        })
+    except KeyError:
+        raise InvalidToken(_('Token contained no recognizable user identification'))
+
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+    role_model = ROLE_MODELS.get(user.role)
+    if role_model is not None and 'role_id' in validated_token:
+        if role_model is BankPersonnel:
+            role_object = from_claims(role_model, {'id': validated_token['role_id'], 'user_id': user.pk, 'branch_id': validated_token['branch_id']})
+            branch = from_claims(Branch, {'id': validated_token['branch_id'], 'bank_id': validated_token['bank_id']})
+            role_model._meta.get_field('branch').set_cached_value(role_object, branch)
+        else:
+            role_object = from_claims(role_model, {'id': validated_token['role_id'], 'user_id': user.pk, 'bank_id': validated_token['bank_id']})
+        role_model._meta.get_field('user').set_cached_value(role_object, user)
+        User._meta.get_field(user.role).set_cached_value(user, role_object)
+
+    return user
+
+
 def set_jwt_access_cookie(response, access_token):
     access_token_expiration = (timezone.now() + api_settings.ACCESS_TOKEN_LIFETIME)
 
@@ -76,4 +149,42 @@ class JWTCookieAuthentication(JWTAuthentication):
             return None
 
         validated_token = self.get_validated_token(raw_token)
-        return self.get_user(validated_token), validated_token
+        return self.get_token_user(validated_token), validated_token
+
+    def get_token_user(self, validated_token):
+        if claims_backed_user and 'role' in validated_token: # Tokens issued before the claims existed fall back to the lookup
+            return get_user_from_claims(validated_token)
+        return self.get_user(validated_token)
+
+
+def get_websocket_user(scope):
+    # Browsers send the access cookie with the handshake, an invalid or missing one is an anonymous connection
+    headers = dict(scope.get('headers', []))
+    raw_token = parse_cookie(headers.get(b'cookie', b'').decode('latin1')).get(access_cookie_name) if access_cookie_name else None
+    if not raw_token:
+        return AnonymousUser()
+    authentication = JWTCookieAuthentication()
+    try:
+        return authentication.get_token_user(authentication.get_validated_token(raw_token))
+    except exceptions.AuthenticationFailed: # InvalidToken included
+        return AnonymousUser()
+
+
+class JWTCookieAuthMiddleware(BaseMiddleware):
+    # WebSocket counterpart of JWTCookieAuthentication, sets scope['user'] for the consumers
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope, user=await database_sync_to_async(get_websocket_user)(scope))
+        return await super().__call__(scope, receive, send)
+
+
+class JWTCookieOriginValidator(OriginValidator):
+    # The access cookie is sent by the browser whatever page opens the socket, so the origin is checked.
+    # WEBSOCKET_ALLOWED_ORIGINS is read on each handshake rather than once when the application is built.
+
+    def __init__(self, application):
+        super().__init__(application, allowed_origins=())
+
+    def valid_origin(self, parsed_origin):
+        self.allowed_origins = settings.WEBSOCKET_ALLOWED_ORIGINS
+        return super().valid_origin(parsed_origin)
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0013_alter_bankpersonnel_options'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bankpersonnel',
+            name='authenticat_id_89a443_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='bankpersonnel',
+            name='authenticat_user_id_4d3690_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='bankpersonnel',
+            name='authenticat_branch__d96c54_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='loancustomer',
+            name='authenticat_id_76f0c1_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='loancustomer',
+            name='authenticat_user_id_eee356_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='loanprovider',
+            name='authenticat_id_cae34a_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='loanprovider',
+            name='authenticat_user_id_3b0a2e_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='authenticat_usernam_61ef80_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='authenticat_id_9bf31e_idx',
+        ),
+        migrations.AddIndex(
+            model_name='loancustomer',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['bank', 'status'], name='auth_customer_bank_status_live'),
+        ),
+        migrations.AddIndex(
+            model_name='loanprovider',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['bank', 'status'], name='auth_provider_bank_status_live'),
+        ),
+    ]
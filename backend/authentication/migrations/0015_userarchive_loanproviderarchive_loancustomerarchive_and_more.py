@@ -0,0 +1,124 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:53
+
+import authentication.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banks', '0009_brancharchive_bankarchive'),
+        ('authentication', '0014_remove_bankpersonnel_authenticat_id_89a443_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserArchive',
+            fields=[
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('created_at', models.DateTimeField(verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(blank=True, null=True, verbose_name='Updated at')),
+                ('deleted_at', models.DateTimeField(blank=True, null=True, verbose_name='Deleted at')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('username', models.CharField(db_index=True, max_length=30)),
+                ('email', models.EmailField(max_length=100)),
+                ('first_name', models.CharField(blank=True, max_length=40, null=True)),
+                ('last_name', models.CharField(blank=True, max_length=50, null=True)),
+                ('picture', models.ImageField(blank=True, null=True, upload_to=authentication.models.User.get_user_picture_upload_path)),
+                ('phone_number', models.CharField(blank=True, max_length=20, null=True)),
+                ('city', models.CharField(blank=True, max_length=30, null=True)),
+                ('address', models.CharField(blank=True, max_length=255, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_staff', models.BooleanField(default=False)),
+                ('is_superuser', models.BooleanField(default=False)),
+                ('role', models.CharField(choices=[('admin', 'Admin'), ('bank_personnel', 'Bank Personnel'), ('loan_provider', 'Loan Provider'), ('loan_customer', 'Loan Customer')], max_length=30)),
+                ('archived_at', models.DateTimeField(db_index=True, verbose_name='Archived at')),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+                ('deleted_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Deleted by')),
+                ('updated_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Updated by')),
+            ],
+            options={
+                'verbose_name': 'archived user',
+                'verbose_name_plural': 'archived users',
+                'db_table': 'authentication_user_archive',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='LoanProviderArchive',
+            fields=[
+                ('created_at', models.DateTimeField(verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(blank=True, null=True, verbose_name='Updated at')),
+                ('deleted_at', models.DateTimeField(blank=True, null=True, verbose_name='Deleted at')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='pending', max_length=20)),
+                ('name_en', models.CharField(max_length=150)),
+                ('name_ar', models.CharField(max_length=150)),
+                ('total_funds', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('registration_number', models.CharField(max_length=20)),
+                ('vat_number', models.CharField(max_length=20)),
+                ('archived_at', models.DateTimeField(db_index=True, verbose_name='Archived at')),
+                ('bank', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='banks.bank', verbose_name='bank')),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+                ('deleted_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Deleted by')),
+                ('updated_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Updated by')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'archived loan provider',
+                'verbose_name_plural': 'archived loan providers',
+                'db_table': 'authentication_loanprovider_archive',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='LoanCustomerArchive',
+            fields=[
+                ('created_at', models.DateTimeField(verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(blank=True, null=True, verbose_name='Updated at')),
+                ('deleted_at', models.DateTimeField(blank=True, null=True, verbose_name='Deleted at')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='pending', max_length=20)),
+                ('ssn', models.CharField(db_index=True, max_length=20)),
+                ('credit_score', models.PositiveIntegerField()),
+                ('monthly_income', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('archived_at', models.DateTimeField(db_index=True, verbose_name='Archived at')),
+                ('bank', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='banks.bank', verbose_name='bank')),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+                ('deleted_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Deleted by')),
+                ('updated_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Updated by')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'archived loan customer',
+                'verbose_name_plural': 'archived loan customers',
+                'db_table': 'authentication_loancustomer_archive',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='BankPersonnelArchive',
+            fields=[
+                ('created_at', models.DateTimeField(verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(blank=True, null=True, verbose_name='Updated at')),
+                ('deleted_at', models.DateTimeField(blank=True, null=True, verbose_name='Deleted at')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('archived_at', models.DateTimeField(db_index=True, verbose_name='Archived at')),
+                ('branch', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='banks.branch', verbose_name='branch')),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+                ('deleted_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Deleted by')),
+                ('updated_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Updated by')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'archived bank personnel',
+                'verbose_name_plural': 'archived bank personnels',
+                'db_table': 'authentication_bankpersonnel_archive',
+                'managed': True,
+            },
+        ),
+    ]
@@ -6,7 +6,7 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from core.models import BankManager, BaseBankModel
+from core.models import BankManager, BaseBankModel, create_archive_model
 
 
 class UserManager(BaseUserManager, BankManager):
@@ -77,8 +77,6 @@ class User(AbstractBaseUser, BaseBankModel, PermissionsMixin):
     class Meta:
         managed = True
         indexes = [
-            models.Index(fields=['id']),
-            models.Index(fields=['username']),
             models.Index(fields=['email']),
         ]
     
@@ -111,8 +109,7 @@ class LoanProvider(BaseApplicant):
     class Meta:
         managed = True
         indexes = [
-            models.Index(fields=['id']),
-            models.Index(fields=['user']),
+            models.Index(fields=['bank', 'status'], name='auth_provider_bank_status_live', condition=models.Q(deleted_at__isnull=True)),
         ]
     
     def __str__(self) -> str:
@@ -128,8 +125,7 @@ class LoanCustomer(BaseApplicant):
     class Meta:
         managed = True
         indexes = [
-            models.Index(fields=['id']),
-            models.Index(fields=['user']),
+            models.Index(fields=['bank', 'status'], name='auth_customer_bank_status_live', condition=models.Q(deleted_at__isnull=True)),
         ]
     
     def __str__(self) -> str:
@@ -150,11 +146,6 @@ class BankPersonnel(BaseBankModel):
 
     class Meta:
         managed = True
-        indexes = [
-            models.Index(fields=['id']),
-            models.Index(fields=['user']),
-            models.Index(fields=['branch']),
-        ]
         permissions = [
             ('can_approve_applicant', 'Can approve applicant'),
             ('can_reject_applicant', 'Can reject applicant'),
@@ -162,3 +153,10 @@ class BankPersonnel(BaseBankModel):
     
     def __str__(self) -> str:
         return f'{self.user} ({self.branch})'
+
+
+# Mirror tables of the soft deleted rows moved out by archive_deleted_rows
+UserArchive = create_archive_model(User)
+LoanProviderArchive = create_archive_model(LoanProvider)
+LoanCustomerArchive = create_archive_model(LoanCustomer)
+BankPersonnelArchive = create_archive_model(BankPersonnel)
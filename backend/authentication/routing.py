@@ -0,0 +1,6 @@
+from django.urls import path
+from authentication.consumers import EventsConsumer
+
+websocket_urlpatterns = [
+    path('ws/events/', EventsConsumer.as_asgi()),
+]
@@ -9,9 +9,11 @@ from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
-from core.serializers import BaseBankSerializer
+from core.serializers import BaseBankSerializer, CompiledRepresentationMixin
 from core.utils import get_attr_in_lang
 from authentication.models import UserRole, BankPersonnel, LoanProvider, LoanCustomer
+from authentication.jwt_auth import add_user_claims
+from banks.models import FundsMovement, FundsLedgerEntry
 
 User = get_user_model()
 
@@ -61,6 +63,10 @@ class BankTokenObtainPairSerializer(TokenObtainPairSerializer):
         'no_active_account': _('Invalid username or password')
     }
 
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
+
     def validate(self, attrs):
         data = super().validate(attrs)
 
@@ -166,6 +172,26 @@ class LoanProviderSerializer(BaseUserRoleSerializer):
             return obj.name_en
         return get_attr_in_lang(obj, self.context['request'], 'name_ar', 'name_en')
 
+    def record_funds_movement(self, instance, movement, provider_funds):
+        # total_funds is written by the save itself, the ledger only records the change
+        if provider_funds:
+            FundsLedgerEntry.objects.create(
+                movement=movement, bank_id=instance.bank_id, provider_id=instance.pk, provider_funds=provider_funds
+            )
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            instance = super().create(validated_data)
+            self.record_funds_movement(instance, FundsMovement.OPENING.value, instance.total_funds)
+        return instance
+
+    def update(self, instance, validated_data):
+        previous_total_funds = instance.total_funds
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            self.record_funds_movement(instance, FundsMovement.ADJUSTMENT.value, instance.total_funds - previous_total_funds)
+        return instance
+
 
 class LoanCustomerSerializer(BaseUserRoleSerializer):
 
@@ -184,7 +210,7 @@ class LoanCustomerSerializer(BaseUserRoleSerializer):
 ########################### Serializers for Sub-Models ###########################
 
 
-class LoanProviderSubSerializer(BaseBankSerializer):
+class LoanProviderSubSerializer(CompiledRepresentationMixin, BaseBankSerializer):
     name = serializers.SerializerMethodField(source='get_name')
 
     class Meta:
@@ -197,7 +223,7 @@ class LoanProviderSubSerializer(BaseBankSerializer):
         return get_attr_in_lang(obj, self.context['request'], 'name_ar', 'name_en')
 
 
-class LoanCustomerSubSerializer(BaseBankSerializer):
+class LoanCustomerSubSerializer(CompiledRepresentationMixin, BaseBankSerializer):
     
     class Meta:
         model = LoanCustomer
@@ -1,7 +1,9 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_migrate, pre_save
+from django.db.models.signals import post_migrate, pre_save, post_save, post_delete, m2m_changed
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
 from authentication.apps import AuthenticationConfig
+from authentication.backends import bump_permissions_version
 from authentication.utils import (
     create_superuser, create_permission_groups, add_permissions_to_admin_group,
     add_permissions_to_bank_personnel_group, add_permissions_to_loan_provider_group,
@@ -20,6 +22,7 @@ def perform_post_migrate_actions(sender, **kwargs):
         add_permissions_to_bank_personnel_group()
         add_permissions_to_loan_provider_group()
         add_permissions_to_loan_customer_group()
+        bump_permissions_version() # Provisioning may have changed any group's permissions
 
 
 @receiver(pre_save, sender=User)
@@ -32,3 +35,18 @@ def delete_old_user_picture_on_update(sender, instance, **kwargs):
 
         if user.picture != instance.picture:
             user.picture.delete(save=False)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_permissions_cache_on_m2m_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_permissions_version()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def invalidate_permissions_cache(sender, **kwargs):
+    bump_permissions_version()
@@ -0,0 +1,21 @@
+import pytest
+from django.contrib.auth.models import Permission
+from authentication.backends import get_permissions_version
+from authentication.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+def test_permission_changes_bump_the_version_on_commit(personnel, django_capture_on_commit_callbacks):
+    user = personnel.user
+    version = get_permissions_version()
+    assert not user.has_perm('banks.delete_bank')
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        user.user_permissions.add(Permission.objects.get(codename='delete_bank'))
+        assert get_permissions_version() == version # Not before the commit
+    for callback in callbacks:
+        callback()
+
+    assert get_permissions_version() != version
+    assert User.objects.get(pk=user.pk).has_perm('banks.delete_bank')
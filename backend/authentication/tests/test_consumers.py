@@ -0,0 +1,144 @@
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.test import override_settings
+from django.utils import timezone
+from backend.asgi import application
+from authentication.models import ApplicantStatus, LoanCustomer, User, UserRole
+from authentication.serializers import BankTokenObtainPairSerializer
+from banks.models import Bank
+from loans.models import Loan, LoanPayment, LoanStatus
+
+pytestmark = pytest.mark.django_db
+
+# The communicators go through the whole ASGI stack (origin check, JWTCookieAuthMiddleware, routing)
+# over the in memory channel layer. The requests are made from the async side with sync_to_async,
+# which runs them on the test's thread, in its transaction.
+
+
+@pytest.fixture(autouse=True)
+def allowed_origins():
+    # Whatever the environment allows, only the test client's origin is
+    with override_settings(WEBSOCKET_ALLOWED_ORIGINS=['http://testserver']):
+        yield
+
+
+def get_communicator(user=None, origin=b'http://testserver', token=None):
+    headers = [(b'origin', origin)]
+    if user is not None:
+        token = str(BankTokenObtainPairSerializer.get_token(user).access_token)
+    if token is not None:
+        headers.append((b'cookie', f'{settings.JWT_AUTH_ACCESS_COOKIE_NAME}={token}'.encode()))
+    return WebsocketCommunicator(application, '/ws/events/', headers=headers)
+
+
+async def connect(user):
+    communicator = get_communicator(user)
+    connected, code = await communicator.connect()
+    assert connected
+    return communicator
+
+
+async def receive_events(communicator):
+    # Every event already pushed, the communicator is closed afterwards
+    events = []
+    while not await communicator.receive_nothing(timeout=0.1):
+        events.append(await communicator.receive_json_from())
+    await communicator.disconnect()
+    return events
+
+
+def get_connection_result(communicator):
+    async def connect_and_close():
+        connected, code = await communicator.connect()
+        await communicator.disconnect()
+        return connected
+    return async_to_sync(connect_and_close)()
+
+
+def test_anonymous_and_invalid_tokens_are_refused(personnel):
+    assert not get_connection_result(get_communicator())
+    assert not get_connection_result(get_communicator(token='invalid'))
+    assert get_connection_result(get_communicator(personnel.user))
+
+
+def test_other_origins_are_refused(personnel):
+    assert not get_connection_result(get_communicator(personnel.user, origin=b'http://example.com'))
+
+
+def test_loan_changes_reach_the_loan_bank_and_parties(api_client, plan, personnel, provider, customer, make_personnel, django_capture_on_commit_callbacks):
+    other_bank = Bank.objects.create(name_en='Other', name_ar='Other', created_at=timezone.now())
+    other_personnel = make_personnel(other_bank, 'other')
+    loan = Loan.objects.create(
+        purpose='Car', amount='12000.00', plan=plan, provider=provider, customer=customer, bank=plan.bank,
+        total_payable_amount='12794.23', monthly_payable_amount='1066.19', created_at=timezone.now(),
+    )
+
+    def approve():
+        with django_capture_on_commit_callbacks(execute=True):
+            assert api_client(personnel.user).get(f'/api/v1/loans/applications/{loan.pk}/approve').status_code == 200
+
+    async def run():
+        users = (personnel.user, provider.user, customer.user, other_personnel.user)
+        communicators = [await connect(user) for user in users]
+        await sync_to_async(approve)()
+        return [await receive_events(communicator) for communicator in communicators]
+
+    bank_events, provider_events, customer_events, other_bank_events = async_to_sync(run)()
+
+    assert bank_events == [{
+        'event': 'loans.status_changed',
+        'data': {'loans': [{'id': str(loan.pk), 'status': LoanStatus.APPROVED.value, 'is_schedule_ready': False}]},
+    }]
+    assert provider_events == bank_events
+    assert customer_events == bank_events
+    assert other_bank_events == []
+
+
+def test_payments_reach_the_customer(api_client, plan, personnel, provider, customer, django_capture_on_commit_callbacks):
+    loan_id = api_client(customer.user).post('/api/v1/loans', {
+        'purpose': 'Car', 'amount': '12000.00', 'plan': plan.pk, 'customer': customer.pk, 'provider': provider.pk,
+    }, format='json').json()['data']['id']
+    api_client(personnel.user).get(f'/api/v1/loans/applications/{loan_id}/approve')
+    api_client(provider.user).get(f'/api/v1/loans/applications/{loan_id}/release')
+    api_client(personnel.user).get(f'/api/v1/loans/applications/{loan_id}/disburse')
+    payment = LoanPayment.objects.get(loan_id=loan_id, installment_number=1)
+
+    def pay():
+        with django_capture_on_commit_callbacks(execute=True):
+            assert api_client(customer.user).get(f'/api/v1/loans/{loan_id}/payments/{payment.pk}/pay').status_code == 200
+
+    async def run():
+        communicator = await connect(customer.user)
+        await sync_to_async(pay)()
+        return await receive_events(communicator)
+
+    events = async_to_sync(run)()
+
+    assert [event['event'] for event in events] == ['payments.recorded']
+    assert [(row['id'], row['installment_number']) for row in events[0]['data']['payments']] == [(str(payment.pk), 1)]
+
+
+def test_applicant_changes_reach_the_bank(api_client, bank, personnel, django_capture_on_commit_callbacks):
+    user = User.objects.create_user('applicant@example.com', 'applicant', 'password')
+    user.role = UserRole.LOAN_CUSTOMER.value
+    user.save()
+    applicant = LoanCustomer.objects.create(
+        user=user, bank=bank, ssn='2', credit_score=700, monthly_income='5000.00', created_at=timezone.now(),
+    )
+
+    def approve():
+        with django_capture_on_commit_callbacks(execute=True):
+            assert api_client(personnel.user).get(f'/api/v1/customers/applications/{applicant.pk}/approve').status_code == 200
+
+    async def run():
+        communicator = await connect(personnel.user)
+        await sync_to_async(approve)()
+        return await receive_events(communicator)
+
+    events = async_to_sync(run)()
+
+    assert events == [{
+        'event': 'customers.status_changed', 'data': {'id': str(applicant.pk), 'status': ApplicantStatus.APPROVED.value},
+    }]
@@ -46,7 +46,8 @@ def add_permissions_to_bank_personnel_group():
         'view_branch', 'view_loanprovider', 'view_loancustomer',
         'view_loanplan', 'view_loan', 'view_loanpayment', 'can_view_amortization_schedule',
         'add_loanplan', 'can_approve_applicant', 'can_reject_applicant', 'can_approve_loan',
-        'can_reject_loan', 'can_disburse_loan',
+        'can_reject_loan', 'can_disburse_loan', 'can_import_repayments', 'can_view_portfolio_summary',
+        'can_export_data',
     ]
     permissions = Permission.objects.filter(codename__in=codenames)
     bank_personnel_group.permissions.add(*permissions)
@@ -30,6 +30,7 @@ class UserViewSet(BaseBankViewSet):
 
 class LoginView(TokenObtainPairView):
     renderer_classes = [BankJSONRenderer, BrowsableAPIRenderer]
+    rate_limit_scope = 'auth'
 
     def post(self, request, *args, **kwargs):
         response = super().post(request, *args, **kwargs)
@@ -53,7 +54,7 @@ class BaseAccountRegistrationViewSet(NonCreatableViewSet, BaseBankViewSet):
     def perform_create(self, serializer):
         serializer.save(created_by=None, created_at=timezone.now())
     
-    @action(detail=False, methods=['post',], url_path='register', url_name='register', permission_classes=[])
+    @action(detail=False, methods=['post',], url_path='register', url_name='register', permission_classes=[], rate_limit_scope='auth')
     def register(self, request):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
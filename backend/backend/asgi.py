@@ -13,4 +13,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+django_asgi_application = get_asgi_application() # Sets up the apps before the consumers import any model
+
+from channels.routing import ProtocolTypeRouter, URLRouter
+from authentication.jwt_auth import JWTCookieAuthMiddleware, JWTCookieOriginValidator
+from authentication.routing import websocket_urlpatterns
+
+application = ProtocolTypeRouter({
+    'http': django_asgi_application,
+    'websocket': JWTCookieOriginValidator(JWTCookieAuthMiddleware(URLRouter(websocket_urlpatterns))),
+})
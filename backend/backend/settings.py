@@ -55,6 +55,7 @@ CSRF_TRUSTED_ORIGINS = env.list('CSRF_TRUSTED_ORIGINS', default=[])
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne', # ASGI server, runserver included
     'django.contrib.admin',
     'corsheaders', # CORS
     'django.contrib.auth',
@@ -65,6 +66,8 @@ INSTALLED_APPS = [
     'rest_framework', # REST Framework
     'rest_framework_simplejwt', # JWT
     'django_filters', # Django Filters
+    'django_celery_beat', # Celery Beat (DatabaseScheduler)
+    'channels', # WebSocket push (authentication.consumers)
     'core.apps.CoreConfig',
     'banks.apps.BanksConfig',
     'loans.apps.LoansConfig',
@@ -215,17 +218,59 @@ REST_FRAMEWORK = {
     'NON_FIELD_ERRORS_KEY': 'non-field-errors',
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': env.int('PAGE_SIZE', default=10),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'core.throttling.BankRateThrottle',
+    ),
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=None), # Proxies in front of the app (nginx), for the client IP of the rate limits
 }
 
 if DEBUG:
     REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'] += ('rest_framework.authentication.SessionAuthentication',) # For DRF Browsable API only
 
+JSON_RENDERER_USE_ORJSON = env.bool('JSON_RENDERER_USE_ORJSON', default=True) # Used by streamed responses when orjson is installed
+STREAMING_CHUNK_SIZE = env.int('STREAMING_CHUNK_SIZE', default=2000) # Rows fetched per round trip by unpaginated streamed lists
+EXPORT_CHUNK_SIZE = env.int('EXPORT_CHUNK_SIZE', default=2000) # Rows fetched per round trip by CSV/NDJSON exports
+
 
 # Pagination Configurations
 
 PAGINATION_PAGE_SIZE = 10
 PAGINATION_MAX_PAGE_SIZE = 100
 PAGINATION_ADMIN_PAGE_SIZE = 20
+PAGINATION_COUNT_CACHE_TIMEOUT = env.int('PAGINATION_COUNT_CACHE_TIMEOUT', default=30) # In seconds
+PAGINATION_ESTIMATED_COUNT_THRESHOLD = env.int('PAGINATION_ESTIMATED_COUNT_THRESHOLD', default=100000) # Use the planner estimate above this many rows
+
+
+# Bank Configurations
+
+BANK_FUNDS_SHARDS = env.int('BANK_FUNDS_SHARDS', default=0) # Spread balance updates over N rows per bank, 0 updates the Bank row directly. Above 0 the Bank row lags until compaction, read through banks.funds.get_bank_funds
+BANK_FUNDS_COMPACTION_INTERVAL = env.int('BANK_FUNDS_COMPACTION_INTERVAL', default=60) # In seconds, how often shard deltas are folded into the Bank rows
+FUNDS_SNAPSHOT_LAG = env.int('FUNDS_SNAPSHOT_LAG', default=60) # In seconds, how far behind now ledger snapshots are taken
+FUNDS_SNAPSHOT_INTERVAL = env.int('FUNDS_SNAPSHOT_INTERVAL', default=3600) # In seconds, how often ledger snapshots are taken
+
+
+# Loan Configurations
+
+LOAN_SCHEDULE_MODE = env.str('LOAN_SCHEDULE_MODE', default='materialized') # materialized or virtual (computed on read)
+LOAN_BULK_DISBURSE_MAX_SIZE = env.int('LOAN_BULK_DISBURSE_MAX_SIZE', default=5000)
+LOAN_SCHEDULE_BATCH_SIZE = env.int('LOAN_SCHEDULE_BATCH_SIZE', default=2000) # Rows per INSERT when bulk creating installments
+LOAN_SCHEDULE_ASYNC = env.bool('LOAN_SCHEDULE_ASYNC', default=False) # Generate materialized schedules in a Celery task after disbursement
+LOAN_SCHEDULE_ASYNC_CHUNK_SIZE = env.int('LOAN_SCHEDULE_ASYNC_CHUNK_SIZE', default=100) # Loans per transaction in the schedule task
+LOAN_REPAYMENT_CHUNK_SIZE = env.int('LOAN_REPAYMENT_CHUNK_SIZE', default=1000) # Repayment file rows per transaction
+LOAN_REPAYMENT_MAX_REPORTED_ERRORS = env.int('LOAN_REPAYMENT_MAX_REPORTED_ERRORS', default=100)
+LOAN_ANNUITY_FACTOR_CACHE_SIZE = env.int('LOAN_ANNUITY_FACTOR_CACHE_SIZE', default=1024) # Distinct (rate, duration) pairs kept per process
+LOAN_QUOTE_MAX_PLANS = env.int('LOAN_QUOTE_MAX_PLANS', default=500)
+LOAN_OVERDUE_SWEEP_INTERVAL = env.int('LOAN_OVERDUE_SWEEP_INTERVAL', default=3600) # In seconds, how often the overdue sweep runs
+LOAN_PAYMENT_PARTITION_INTERVAL = env.str('LOAN_PAYMENT_PARTITION_INTERVAL', default='month') # month or quarter, PostgreSQL only, don't change once partitioned
+LOAN_PAYMENT_PARTITIONS_AHEAD = env.int('LOAN_PAYMENT_PARTITIONS_AHEAD', default=3) # Months of partitions kept ready past the longest plan
+LOAN_PAYMENT_PARTITIONING_INTERVAL = env.int('LOAN_PAYMENT_PARTITIONING_INTERVAL', default=86400) # In seconds, how often partitions are created ahead
+
+
+# Archive Configurations
+
+ARCHIVE_RETENTION_DAYS = env.int('ARCHIVE_RETENTION_DAYS', default=90) # Soft deleted rows older than this are moved to the archive tables
+ARCHIVE_BATCH_SIZE = env.int('ARCHIVE_BATCH_SIZE', default=500) # Rows moved per transaction
+ARCHIVE_INTERVAL = env.int('ARCHIVE_INTERVAL', default=86400) # In seconds, how often the archiving runs
 
 
 # Security Configurations
@@ -243,7 +288,7 @@ CSRF_COOKIE_SECURE = env.bool('CSRF_COOKIE_SECURE', default=False)
 CORS_ALLOWED_ORIGINS = env.list('CORS_ALLOWED_ORIGINS', default=[])
 CORS_ORIGIN_WHITELIST = env.list('CORS_ORIGIN_WHITELIST', default=[])
 CORS_ALLOW_CREDENTIALS = env.bool('CORS_ALLOW_CREDENTIALS', default=True)
-CORS_ALLOW_HEADERS = list(default_headers) + env.list('CORS_ALLOW_HEADERS', default=[])
+CORS_ALLOW_HEADERS = list(default_headers) + ['idempotency-key'] + env.list('CORS_ALLOW_HEADERS', default=[])
 CORS_ALLOW_METHODS = list(default_methods) + env.list('CORS_ALLOW_METHODS', default=[])
 
 
@@ -275,6 +320,8 @@ JWT_AUTH_COOKIE_HTTPONLY = env.bool('JWT_AUTH_ACCESS_COOKIE_HTTPONLY', default=T
 JWT_AUTH_COOKIE_SECURE = env.bool('JWT_AUTH_ACCESS_COOKIE_SECURE', default=False)
 JWT_AUTH_COOKIE_SAMESITE = env.str('JWT_AUTH_ACCESS_COOKIE_SAMESITE', default='Lax')
 
+JWT_CLAIMS_BACKED_USER = env.bool('JWT_CLAIMS_BACKED_USER', default=False) # Build request.user from the token claims instead of querying it
+
 
 # Email Configurations
 
@@ -288,17 +335,60 @@ EMAIL_HOST_USER = env.str('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = env.str('EMAIL_HOST_PASSWORD')
 EMAIL_SUBJECT_PREFIX = env.str('EMAIL_SUBJECT_PREFIX')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+EMAIL_QUEUE_BATCH_SIZE = env.int('EMAIL_QUEUE_BATCH_SIZE', default=50) # Queued emails sent per batch, over one connection
+EMAIL_QUEUE_DRAIN_INTERVAL = env.int('EMAIL_QUEUE_DRAIN_INTERVAL', default=60) # In seconds, how often retries are picked up
+EMAIL_MAX_ATTEMPTS = env.int('EMAIL_MAX_ATTEMPTS', default=5)
+EMAIL_RETRY_BACKOFF = env.int('EMAIL_RETRY_BACKOFF', default=60) # In seconds, doubled on every failed attempt
 
 
 # Miscellaneous Configurations
 
 AUTH_USER_MODEL = 'authentication.User'
+AUTHENTICATION_BACKENDS = ['authentication.backends.CachedModelBackend'] # ModelBackend with permission sets kept in the cache
 PASSWORD_RESET_TIMEOUT = env.int('PASSWORD_RESET_TIMEOUT', default=(60 * 60 * 24 * 3)) # 259200 seconds
 DATETIME_FORMATS = {
     'timestamp': '%Y-%m-%dT%H:%M:%S%z',
 }
 
 
+# Cache Configurations
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'), # e.g. redis://localhost:6379/1 to share across workers
+}
+
+PERMISSIONS_CACHE = env.str('PERMISSIONS_CACHE', default='default') # Must be shared (CACHE_URL), a bump has to reach every worker
+PERMISSIONS_CACHE_TIMEOUT = env.int('PERMISSIONS_CACHE_TIMEOUT', default=3600) # Seconds, cached sets are also invalidated on any permission change
+
+
+# Rate Limiting Configurations
+
+RATE_LIMIT_ENABLED = env.bool('RATE_LIMIT_ENABLED', default=True)
+RATE_LIMIT_BACKEND = env.str('RATE_LIMIT_BACKEND', default='core.throttling.CacheRateLimitBackend') # Or core.throttling.LocalRateLimitBackend, per process
+RATE_LIMIT_CACHE = env.str('RATE_LIMIT_CACHE', default='default') # Must be shared (CACHE_URL) for the limits to hold across workers
+RATE_LIMIT_DEFAULT_SCOPE = 'api'
+RATE_LIMITS = env.json('RATE_LIMITS', default={ # Per scope, then per user, bank or ip: requests/second, minute, hour or day
+    'api': {'user': '300/min', 'bank': '3000/min', 'ip': '600/min'},
+    'auth': {'ip': '20/min'}, # Login and registration
+    'transitions': {'user': '60/min', 'bank': '600/min'}, # Loan and application status changes, payments
+})
+
+
+# Idempotency Configurations
+
+IDEMPOTENCY_ENABLED = env.bool('IDEMPOTENCY_ENABLED', default=True) # Replay the first response of retried transitions (core.idempotency)
+IDEMPOTENCY_CACHE = env.str('IDEMPOTENCY_CACHE', default='default') # Must be shared (CACHE_URL) for retries reaching another worker
+IDEMPOTENCY_TTL = env.int('IDEMPOTENCY_TTL', default=86400) # In seconds, how long a response is replayed
+IDEMPOTENCY_LOCK_TIMEOUT = env.int('IDEMPOTENCY_LOCK_TIMEOUT', default=30) # In seconds, longer than any transition takes
+
+
+# HTTP Caching Configurations
+
+CONDITIONAL_GET_ENABLED = env.bool('CONDITIONAL_GET_ENABLED', default=True) # ETag and Last-Modified on versioned views (core.versions)
+VERSIONS_CACHE = env.str('VERSIONS_CACHE', default='default') # Must be shared (CACHE_URL), a bump has to reach every worker
+RESPONSE_CACHE_TIMEOUT = env.int('RESPONSE_CACHE_TIMEOUT', default=300) # In seconds, for views with cache_list_responses
+
+
 # Redis Configurations
 
 REDIS_HOST = env.str('REDIS_HOST', default='localhost')
@@ -313,22 +403,63 @@ CELERY_ENABLE_UTC = env.bool('CELERY_ENABLE_UTC', default=False)
 CELERY_TIMEZONE = env.str('CELERY_TIMEZONE', default='UTC')
 CELERY_BROKER_URL = env.str('CELERY_BROKER_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = env.str('CELERY_RESULT_BACKEND', default='redis://localhost:6379/0')
+CELERY_TASK_ALWAYS_EAGER = env.bool('CELERY_TASK_ALWAYS_EAGER', default=False) # Run tasks inline, for tests and setups without a worker
+CELERY_TASK_EAGER_PROPAGATES = env.bool('CELERY_TASK_EAGER_PROPAGATES', default=True)
 
 
 # Celery Beat Configurations
 
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_BEAT_SCHEDULE = { # Synced into the database by the scheduler on startup
+    'sweep-overdue-installments': {
+        'task': 'loans.tasks.sweep_overdue_installments',
+        'schedule': LOAN_OVERDUE_SWEEP_INTERVAL,
+        'options': {'expires': LOAN_OVERDUE_SWEEP_INTERVAL}, # Don't pile up sweeps behind a slow one
+    },
+    'create-loan-payment-partitions': {
+        'task': 'loans.tasks.create_loan_payment_partitions',
+        'schedule': LOAN_PAYMENT_PARTITIONING_INTERVAL,
+        'options': {'expires': LOAN_PAYMENT_PARTITIONING_INTERVAL},
+    },
+    'compact-bank-funds': {
+        'task': 'banks.tasks.compact_bank_funds',
+        'schedule': BANK_FUNDS_COMPACTION_INTERVAL,
+        'options': {'expires': BANK_FUNDS_COMPACTION_INTERVAL},
+    },
+    'take-funds-snapshots': {
+        'task': 'banks.tasks.take_funds_snapshots',
+        'schedule': FUNDS_SNAPSHOT_INTERVAL,
+        'options': {'expires': FUNDS_SNAPSHOT_INTERVAL},
+    },
+    'archive-deleted-rows': {
+        'task': 'core.tasks.archive_deleted_rows',
+        'schedule': ARCHIVE_INTERVAL,
+        'options': {'expires': ARCHIVE_INTERVAL},
+    },
+    'send-queued-emails': {
+        'task': 'core.tasks.send_queued_emails',
+        'schedule': EMAIL_QUEUE_DRAIN_INTERVAL,
+        'options': {'expires': EMAIL_QUEUE_DRAIN_INTERVAL},
+    },
+}
 
 
 # Channels Configurations
 
+CHANNEL_LAYER_BACKEND = env.str('CHANNEL_LAYER_BACKEND', default='channels_redis.core.RedisChannelLayer') # channels.layers.InMemoryChannelLayer for tests
+
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'BACKEND': CHANNEL_LAYER_BACKEND,
         'CONFIG': {
-            'hosts': [(REDIS_HOST, REDIS_PORT)],
             'capacity': env.int('REDIS_CHANNEL_CAPACITY', default=100),
             'expiry': env.int('REDIS_CHANNEL_EXPIRY', default=60),
         },
     }
 }
+
+if CHANNEL_LAYER_BACKEND.startswith('channels_redis.'):
+    CHANNEL_LAYERS['default']['CONFIG']['hosts'] = [(REDIS_HOST, REDIS_PORT)]
+
+WEBSOCKET_EVENTS_ENABLED = env.bool('WEBSOCKET_EVENTS_ENABLED', default=True) # Push loan, payment and applicant changes (core.events)
+WEBSOCKET_ALLOWED_ORIGINS = env.list('WEBSOCKET_ALLOWED_ORIGINS', default=CORS_ALLOWED_ORIGINS) # Full origins (scheme, host, port), not ALLOWED_HOSTS which may be *
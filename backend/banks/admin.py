@@ -1,12 +1,35 @@
 from django.contrib import admin
 from core.admin import BaseBankAdmin
-from banks.models import Bank, Branch
+from banks.funds import FUNDS_FIELDS, get_bank_funds
+from banks.models import Bank, Branch, BankFundsShard, FundsLedgerEntry, FundsSnapshot
 
 
 @admin.register(Bank)
 class BankAdmin(BaseBankAdmin):
     list_display = BaseBankAdmin.list_display + ['name_en', 'name_ar']
     search_fields = ['name_en', 'name_ar',]
+    readonly_fields = BaseBankAdmin.readonly_fields + ['current_total_funds', 'current_available_funds', 'current_total_loans']
+    exclude = FUNDS_FIELDS # Balances move through the ledger (banks.funds), not the form
+
+    def get_current_funds(self, obj, field):
+        # With BANK_FUNDS_SHARDS the Bank row lags behind until compaction, the pending deltas are added here
+        if obj is None or obj.pk is None:
+            return None
+        if not hasattr(obj, '_current_funds'):
+            obj._current_funds = get_bank_funds(obj.pk)
+        return obj._current_funds[field]
+
+    @admin.display(description='Total funds')
+    def current_total_funds(self, obj):
+        return self.get_current_funds(obj, 'total_funds')
+
+    @admin.display(description='Available funds')
+    def current_available_funds(self, obj):
+        return self.get_current_funds(obj, 'available_funds')
+
+    @admin.display(description='Total loans')
+    def current_total_loans(self, obj):
+        return self.get_current_funds(obj, 'total_loans')
 
 
 @admin.register(Branch)
@@ -14,3 +37,21 @@ class BranchAdmin(BaseBankAdmin):
     list_display = BaseBankAdmin.list_display + ['name_en', 'name_ar', 'code', 'bank']
     search_fields = ['name_en', 'name_ar', 'code',]
     list_filter = ['bank']
+
+
+@admin.register(BankFundsShard)
+class BankFundsShardAdmin(admin.ModelAdmin):
+    list_display = ['bank', 'shard', 'total_funds', 'available_funds', 'total_loans']
+    list_filter = ['bank']
+
+
+@admin.register(FundsLedgerEntry)
+class FundsLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'movement', 'bank', 'provider', 'loan', 'total_funds', 'available_funds', 'total_loans', 'provider_funds', 'created_at']
+    list_filter = ['movement', 'bank']
+
+
+@admin.register(FundsSnapshot)
+class FundsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['bank', 'provider', 'as_of', 'total_funds', 'available_funds', 'total_loans', 'provider_funds']
+    list_filter = ['bank']
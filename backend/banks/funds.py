@@ -0,0 +1,170 @@
+import random
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from authentication.models import LoanProvider
+from banks.models import Bank, BankFundsShard, FundsLedgerEntry, FundsSnapshot
+
+FUNDS_FIELDS = ('total_funds', 'available_funds', 'total_loans')
+LEDGER_FIELDS = FUNDS_FIELDS + ('provider_funds',)
+
+
+def add_to_bank_funds(bank_id, total_funds=0, available_funds=0, total_loans=0):
+    # Every money movement goes through here, deltas are signed
+    deltas = {
+        field: value for field, value in zip(FUNDS_FIELDS, (total_funds, available_funds, total_loans)) if value
+    }
+    if not deltas:
+        return
+
+    if settings.BANK_FUNDS_SHARDS <= 0:
+        Bank.objects.filter(pk=bank_id).update(**{field: F(field) + value for field, value in deltas.items()})
+        return
+
+    shard = random.randrange(settings.BANK_FUNDS_SHARDS)
+    changes = {field: F(field) + value for field, value in deltas.items()}
+    if not BankFundsShard.objects.filter(bank_id=bank_id, shard=shard).update(**changes):
+        BankFundsShard.objects.bulk_create([BankFundsShard(bank_id=bank_id, shard=shard)], ignore_conflicts=True)
+        BankFundsShard.objects.filter(bank_id=bank_id, shard=shard).update(**changes)
+
+
+def get_bank_funds(bank_id):
+    # Balances as of now: the compacted values on Bank plus whatever is still pending in the shards
+    funds = Bank._base_manager.filter(pk=bank_id).values(*FUNDS_FIELDS).first()
+    if funds is None:
+        return None
+    pending = BankFundsShard.objects.filter(bank_id=bank_id).aggregate(
+        **{field: Sum(field) for field in FUNDS_FIELDS}
+    )
+    return {field: funds[field] + (pending[field] or Decimal(0)) for field in FUNDS_FIELDS}
+
+
+def compact_bank_funds(bank_id):
+    # The shards stay locked until the deltas are on the Bank row, writers just wait for the commit
+    with transaction.atomic():
+        shards = list(BankFundsShard.objects.select_for_update().filter(bank_id=bank_id))
+        totals = {field: sum((getattr(shard, field) for shard in shards), Decimal(0)) for field in FUNDS_FIELDS}
+        if not any(totals.values()):
+            return False
+        Bank.all_objects.filter(pk=bank_id).update(**{field: F(field) + value for field, value in totals.items()})
+        BankFundsShard.objects.filter(pk__in=[shard.pk for shard in shards]).update(
+            **{field: Decimal(0) for field in FUNDS_FIELDS}
+        )
+    return True
+
+
+def compact_all_bank_funds(bank_ids=None):
+    # Every bank with shards, one transaction each, returns how many had pending deltas
+    bank_ids = bank_ids or BankFundsShard.objects.values_list('bank_id', flat=True).distinct()
+    return sum(1 for bank_id in list(bank_ids) if compact_bank_funds(bank_id))
+
+
+def apply_funds_movements(entries):
+    # Appends the entries to the ledger, then applies them to the balances with one update per bank and per provider.
+    # The balances stay current in the same transaction: releases check the provider's funds under its row lock,
+    # so provider writers still serialize on it. Bank writers only do with BANK_FUNDS_SHARDS at 0.
+    bank_deltas = defaultdict(lambda: dict.fromkeys(FUNDS_FIELDS, Decimal(0)))
+    provider_deltas = defaultdict(Decimal)
+    for entry in entries:
+        for field in FUNDS_FIELDS:
+            bank_deltas[entry.bank_id][field] += getattr(entry, field)
+        if entry.provider_id is not None and entry.provider_funds:
+            provider_deltas[entry.provider_id] += entry.provider_funds
+
+    with transaction.atomic():
+        FundsLedgerEntry.objects.bulk_create(entries, batch_size=settings.LOAN_SCHEDULE_BATCH_SIZE)
+        for provider_id, provider_funds in provider_deltas.items():
+            LoanProvider.objects.filter(pk=provider_id).update(total_funds=F('total_funds') + provider_funds)
+        for bank_id, deltas in bank_deltas.items():
+            add_to_bank_funds(bank_id, **deltas)
+
+
+def get_funds_as_of(as_of, bank_id=None, provider_id=None):
+    # One snapshot lookup plus a range scan over the ledger entries recorded after it
+    if provider_id is not None:
+        snapshots = FundsSnapshot.objects.filter(provider_id=provider_id)
+        entries = FundsLedgerEntry.objects.filter(provider_id=provider_id)
+    else:
+        snapshots = FundsSnapshot.objects.filter(bank_id=bank_id, provider__isnull=True)
+        entries = FundsLedgerEntry.objects.filter(bank_id=bank_id)
+
+    snapshot = snapshots.filter(as_of__lte=as_of).order_by('-as_of').first()
+    entries = entries.filter(created_at__lte=as_of)
+    if snapshot is not None:
+        entries = entries.filter(created_at__gt=snapshot.as_of)
+
+    tail = entries.aggregate(**{field: Sum(field) for field in LEDGER_FIELDS})
+    return {
+        field: (getattr(snapshot, field) if snapshot else Decimal(0)) + (tail[field] or Decimal(0))
+        for field in LEDGER_FIELDS
+    }
+
+
+def take_funds_snapshots(as_of=None):
+    # Entries still being committed may carry a created_at slightly in the past, so snapshots lag behind now
+    as_of = as_of or timezone.now() - timezone.timedelta(seconds=settings.FUNDS_SNAPSHOT_LAG)
+    snapshots = [
+        FundsSnapshot(bank_id=bank_id, as_of=as_of, **get_funds_as_of(as_of, bank_id=bank_id))
+        for bank_id in FundsLedgerEntry.objects.values_list('bank_id', flat=True).distinct()
+    ]
+    snapshots += [
+        FundsSnapshot(bank_id=bank_id, provider_id=provider_id, as_of=as_of, **get_funds_as_of(as_of, provider_id=provider_id))
+        for provider_id, bank_id in (
+            FundsLedgerEntry.objects.filter(provider__isnull=False).values_list('provider_id', 'bank_id').distinct()
+        )
+    ]
+    FundsSnapshot.objects.bulk_create(snapshots)
+    return snapshots
+
+
+def set_bank_funds(bank_id, total_funds, available_funds, total_loans):
+    # Overwrites the balances, pending shard deltas are dropped under the same locks compaction takes
+    with transaction.atomic():
+        shards = list(BankFundsShard.objects.select_for_update().filter(bank_id=bank_id).values_list('pk', flat=True))
+        BankFundsShard.objects.filter(pk__in=shards).update(**{field: Decimal(0) for field in FUNDS_FIELDS})
+        Bank.all_objects.filter(pk=bank_id).update(
+            total_funds=total_funds, available_funds=available_funds, total_loans=total_loans
+        )
+
+
+def rebuild_funds_snapshots(interval, batch_size=1000):
+    # Replays the whole ledger once in created_at order, emitting a snapshot of every running balance
+    # at each interval boundary it crosses. Returns the final balances per bank and per provider.
+    bank_totals = defaultdict(lambda: dict.fromkeys(LEDGER_FIELDS, Decimal(0)))
+    provider_totals = defaultdict(lambda: dict.fromkeys(LEDGER_FIELDS, Decimal(0)))
+    provider_banks = {}
+    snapshots = []
+    boundary = None
+
+    def flush(as_of):
+        snapshots.extend(FundsSnapshot(bank_id=bank_id, as_of=as_of, **totals) for bank_id, totals in bank_totals.items())
+        snapshots.extend(
+            FundsSnapshot(bank_id=provider_banks[provider_id], provider_id=provider_id, as_of=as_of, **totals)
+            for provider_id, totals in provider_totals.items()
+        )
+        if len(snapshots) >= batch_size:
+            FundsSnapshot.objects.bulk_create(snapshots, batch_size=batch_size)
+            snapshots.clear()
+
+    with transaction.atomic():
+        FundsSnapshot.objects.all().delete()
+        for entry in FundsLedgerEntry.objects.order_by('created_at', 'id').iterator(chunk_size=batch_size):
+            if boundary is None:
+                boundary = entry.created_at + interval
+            while entry.created_at > boundary:
+                flush(boundary)
+                boundary += interval
+
+            for field in LEDGER_FIELDS:
+                bank_totals[entry.bank_id][field] += getattr(entry, field)
+                if entry.provider_id is not None:
+                    provider_totals[entry.provider_id][field] += getattr(entry, field)
+            if entry.provider_id is not None:
+                provider_banks[entry.provider_id] = entry.bank_id
+
+        FundsSnapshot.objects.bulk_create(snapshots, batch_size=batch_size)
+
+    return bank_totals, provider_totals
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from banks.funds import compact_all_bank_funds
+
+
+class Command(BaseCommand):
+    help = 'Fold the pending balance deltas of the bank funds shards back into the Bank rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bank', action='append', default=None, help='Only compact this bank (repeatable)')
+
+    def handle(self, *args, **options):
+        compacted = compact_all_bank_funds(options['bank'])
+        self.stdout.write(self.style.SUCCESS(f'[+] Compacted the funds of {compacted} bank(s).'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from authentication.models import LoanProvider
+from banks.funds import FUNDS_FIELDS, rebuild_funds_snapshots, set_bank_funds
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the funds snapshots by replaying the funds ledger, optionally resetting the stored balances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval-hours', type=int, default=24, help='Hours between two rebuilt snapshots')
+        parser.add_argument('--apply-balances', action='store_true', help='Overwrite the bank and provider balances with the replayed ones')
+
+    def handle(self, *args, **options):
+        interval = timezone.timedelta(hours=options['interval_hours'])
+        bank_totals, provider_totals = rebuild_funds_snapshots(interval)
+        self.stdout.write(self.style.SUCCESS(
+            f'[+] Replayed the ledger of {len(bank_totals)} bank(s) and {len(provider_totals)} provider(s).'
+        ))
+
+        if options['apply_balances']:
+            with transaction.atomic():
+                for bank_id, totals in bank_totals.items():
+                    set_bank_funds(bank_id, *[totals[field] for field in FUNDS_FIELDS])
+                for provider_id, totals in provider_totals.items():
+                    LoanProvider.all_objects.filter(pk=provider_id).update(total_funds=totals['provider_funds'])
+            self.stdout.write(self.style.SUCCESS('[+] Applied the replayed balances.'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from banks.funds import take_funds_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Snapshot the balances of every bank and loan provider from the funds ledger'
+
+    def handle(self, *args, **options):
+        snapshots = take_funds_snapshots()
+        self.stdout.write(self.style.SUCCESS(f'[+] Took {len(snapshots)} funds snapshot(s).'))
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banks', '0005_bank_total_loans_alter_bank_available_funds_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankFundsShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('total_funds', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('available_funds', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_loans', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('bank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='funds_shards', to='banks.bank')),
+            ],
+            options={
+                'managed': True,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='bankfundsshard',
+            constraint=models.UniqueConstraint(fields=('bank', 'shard'), name='banks_bankfundsshard_unique_shard'),
+        ),
+    ]
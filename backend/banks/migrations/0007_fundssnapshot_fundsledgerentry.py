@@ -0,0 +1,77 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def record_opening_balances(apps, schema_editor):
+    # Seeds the ledger with the balances as they stand, so replaying it gives back the stored values
+    Bank = apps.get_model('banks', 'Bank')
+    BankFundsShard = apps.get_model('banks', 'BankFundsShard')
+    LoanProvider = apps.get_model('authentication', 'LoanProvider')
+    FundsLedgerEntry = apps.get_model('banks', 'FundsLedgerEntry')
+    fields = ('total_funds', 'available_funds', 'total_loans')
+
+    entries = {
+        bank.pk: FundsLedgerEntry(movement='opening', bank_id=bank.pk, **{field: getattr(bank, field) for field in fields})
+        for bank in Bank.objects.all()
+    }
+    for shard in BankFundsShard.objects.all():
+        for field in fields:
+            setattr(entries[shard.bank_id], field, getattr(entries[shard.bank_id], field) + getattr(shard, field))
+    entries = list(entries.values())
+    entries += [
+        FundsLedgerEntry(movement='opening', bank_id=provider.bank_id, provider_id=provider.pk, provider_funds=provider.total_funds)
+        for provider in LoanProvider.objects.all()
+    ]
+    FundsLedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0013_alter_bankpersonnel_options'),
+        ('loans', '0016_alter_loanpayment_options'),
+        ('banks', '0006_bankfundsshard_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FundsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateTimeField()),
+                ('total_funds', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('available_funds', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_loans', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('provider_funds', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('bank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='funds_snapshots', to='banks.bank')),
+                ('provider', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='funds_snapshots', to='authentication.loanprovider')),
+            ],
+            options={
+                'managed': True,
+                'indexes': [models.Index(fields=['bank', 'provider', 'as_of'], name='banks_funds_bank_id_2768ef_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FundsLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('movement', models.CharField(choices=[('opening', 'Opening balance'), ('adjustment', 'Adjustment'), ('release', 'Release'), ('disbursement', 'Disbursement'), ('repayment', 'Repayment')], max_length=20)),
+                ('total_funds', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('available_funds', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_loans', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('provider_funds', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('bank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='banks.bank')),
+                ('loan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='loans.loan')),
+                ('provider', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='authentication.loanprovider')),
+            ],
+            options={
+                'managed': True,
+                'indexes': [models.Index(fields=['bank', 'created_at'], name='banks_funds_bank_id_71e29e_idx'), models.Index(fields=['provider', 'created_at'], name='banks_funds_provide_91dea4_idx')],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
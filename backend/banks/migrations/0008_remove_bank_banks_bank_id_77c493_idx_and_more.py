@@ -0,0 +1,25 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:48
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banks', '0007_fundssnapshot_fundsledgerentry'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bank',
+            name='banks_bank_id_77c493_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='branch',
+            name='banks_branc_id_d7041e_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='branch',
+            name='banks_branc_bank_id_927e0d_idx',
+        ),
+    ]
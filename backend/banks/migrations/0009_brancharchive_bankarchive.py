@@ -0,0 +1,66 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('banks', '0008_remove_bank_banks_bank_id_77c493_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BranchArchive',
+            fields=[
+                ('created_at', models.DateTimeField(verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(blank=True, null=True, verbose_name='Updated at')),
+                ('deleted_at', models.DateTimeField(blank=True, null=True, verbose_name='Deleted at')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name_en', models.CharField(max_length=150)),
+                ('name_ar', models.CharField(max_length=150)),
+                ('code', models.CharField(max_length=20)),
+                ('address', models.CharField(max_length=255)),
+                ('phone_number', models.CharField(max_length=20)),
+                ('archived_at', models.DateTimeField(db_index=True, verbose_name='Archived at')),
+                ('bank', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='banks.bank', verbose_name='bank')),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+                ('deleted_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Deleted by')),
+                ('updated_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Updated by')),
+            ],
+            options={
+                'verbose_name': 'archived branch',
+                'verbose_name_plural': 'archived branchs',
+                'db_table': 'banks_branch_archive',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='BankArchive',
+            fields=[
+                ('created_at', models.DateTimeField(verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(blank=True, null=True, verbose_name='Updated at')),
+                ('deleted_at', models.DateTimeField(blank=True, null=True, verbose_name='Deleted at')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name_en', models.CharField(max_length=150)),
+                ('name_ar', models.CharField(max_length=150)),
+                ('total_funds', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('available_funds', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_loans', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('archived_at', models.DateTimeField(db_index=True, verbose_name='Archived at')),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+                ('deleted_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Deleted by')),
+                ('updated_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Updated by')),
+            ],
+            options={
+                'verbose_name': 'archived bank',
+                'verbose_name_plural': 'archived banks',
+                'db_table': 'banks_bank_archive',
+                'managed': True,
+            },
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
-from core.models import BaseBankModel
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from core.models import BaseBankModel, create_archive_model
 
 
 class Bank(BaseBankModel):
@@ -11,9 +13,6 @@ class Bank(BaseBankModel):
 
     class Meta:
         managed = True
-        indexes = [
-            models.Index(fields=['id']),
-        ]
 
     def __str__(self) -> str:
         return f'{self.name_en} ({self.name_ar})'
@@ -27,12 +26,84 @@ class Branch(BaseBankModel):
     phone_number = models.CharField(max_length=20)
     bank = models.ForeignKey('banks.Bank', on_delete=models.CASCADE, related_name='branches')
 
+    class Meta:
+        managed = True
+
+    def __str__(self) -> str:
+        return f'{self.name_en} ({self.name_ar}) - {self.bank}'
+
+
+class BankFundsShard(models.Model):
+    # Pending deltas of a bank's balances, spread over BANK_FUNDS_SHARDS rows so that concurrent
+    # money movements don't all queue on the Bank row lock. Folded back into Bank by compact_bank_funds.
+    bank = models.ForeignKey('banks.Bank', on_delete=models.CASCADE, related_name='funds_shards')
+    shard = models.PositiveSmallIntegerField()
+    total_funds = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    available_funds = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    total_loans = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        managed = True
+        constraints = [
+            models.UniqueConstraint(fields=['bank', 'shard'], name='banks_bankfundsshard_unique_shard'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.bank} #{self.shard}'
+
+
+class FundsMovement(models.TextChoices):
+    OPENING = ('opening', _('Opening balance'))
+    ADJUSTMENT = ('adjustment', _('Adjustment'))
+    RELEASE = ('release', _('Release'))
+    DISBURSEMENT = ('disbursement', _('Disbursement'))
+    REPAYMENT = ('repayment', _('Repayment'))
+
+
+class FundsLedgerEntry(models.Model):
+    # Append-only, rows are inserted by banks.funds.apply_funds_movements and never updated
+    id = models.BigAutoField(primary_key=True)
+    movement = models.CharField(max_length=20, choices=FundsMovement.choices)
+    bank = models.ForeignKey('banks.Bank', on_delete=models.CASCADE, related_name='ledger_entries')
+    provider = models.ForeignKey('authentication.LoanProvider', on_delete=models.CASCADE, null=True, blank=True, related_name='ledger_entries')
+    loan = models.ForeignKey('loans.Loan', on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    total_funds = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    available_funds = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    total_loans = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    provider_funds = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
     class Meta:
         managed = True
         indexes = [
-            models.Index(fields=['id']),
-            models.Index(fields=['bank']),
+            models.Index(fields=['bank', 'created_at']),
+            models.Index(fields=['provider', 'created_at']),
         ]
 
     def __str__(self) -> str:
-        return f'{self.name_en} ({self.name_ar}) - {self.bank}'
+        return f'{self.get_movement_display()} ({self.bank_id}) at {self.created_at}'
+
+
+class FundsSnapshot(models.Model):
+    # Balances of a bank (provider is null) or of a loan provider, including every ledger entry up to as_of
+    bank = models.ForeignKey('banks.Bank', on_delete=models.CASCADE, related_name='funds_snapshots')
+    provider = models.ForeignKey('authentication.LoanProvider', on_delete=models.CASCADE, null=True, blank=True, related_name='funds_snapshots')
+    as_of = models.DateTimeField()
+    total_funds = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    available_funds = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    total_loans = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    provider_funds = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        managed = True
+        indexes = [
+            models.Index(fields=['bank', 'provider', 'as_of']),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.provider_id or self.bank_id} as of {self.as_of}'
+
+
+# Mirror tables of the soft deleted rows moved out by archive_deleted_rows
+BankArchive = create_archive_model(Bank)
+BranchArchive = create_archive_model(Branch)
@@ -0,0 +1,14 @@
+from celery import shared_task
+from banks import funds
+
+
+@shared_task
+def compact_bank_funds():
+    # Scheduled by CELERY_BEAT_SCHEDULE, keeps the shards' pending deltas short
+    return funds.compact_all_bank_funds()
+
+
+@shared_task
+def take_funds_snapshots():
+    # Scheduled by CELERY_BEAT_SCHEDULE, bounds the ledger tail get_funds_as_of has to sum
+    return len(funds.take_funds_snapshots())
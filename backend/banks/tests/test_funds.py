@@ -0,0 +1,61 @@
+import pytest
+from decimal import Decimal
+from django.contrib.admin import site
+from banks.admin import BankAdmin
+from banks.funds import add_to_bank_funds, compact_bank_funds, get_bank_funds, set_bank_funds
+from banks.models import Bank, BankFundsShard
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def shards(settings, monkeypatch):
+    settings.BANK_FUNDS_SHARDS = 4
+    picks = iter([0, 0, 1])
+    monkeypatch.setattr('banks.funds.random.randrange', lambda stop: next(picks))
+
+
+def get_balances(bank):
+    bank.refresh_from_db()
+    return bank.total_funds, bank.available_funds, bank.total_loans
+
+
+def test_deltas_are_upserted_into_shards(bank, shards):
+    add_to_bank_funds(bank.pk, available_funds=Decimal('100.00'))
+    add_to_bank_funds(bank.pk, available_funds=Decimal('-30.00'), total_loans=Decimal('30.00'))
+    add_to_bank_funds(bank.pk, total_funds=Decimal('5.00'))
+
+    assert list(BankFundsShard.objects.filter(bank=bank).order_by('shard').values_list('shard', 'total_funds', 'available_funds', 'total_loans')) == [
+        (0, Decimal('0.00'), Decimal('70.00'), Decimal('30.00')), (1, Decimal('5.00'), Decimal('0.00'), Decimal('0.00')),
+    ]
+    assert get_balances(bank) == (0, 0, 0) # Only compaction writes the Bank row
+    assert get_bank_funds(bank.pk) == {'total_funds': Decimal('5.00'), 'available_funds': Decimal('70.00'), 'total_loans': Decimal('30.00')}
+    assert BankAdmin(Bank, site).current_available_funds(bank) == Decimal('70.00')
+
+
+def test_compaction_folds_the_shards_into_the_bank(bank, shards):
+    add_to_bank_funds(bank.pk, available_funds=Decimal('100.00'))
+    add_to_bank_funds(bank.pk, total_loans=Decimal('30.00'))
+    add_to_bank_funds(bank.pk, total_funds=Decimal('5.00'))
+
+    assert compact_bank_funds(bank.pk) is True
+    assert get_balances(bank) == (Decimal('5.00'), Decimal('100.00'), Decimal('30.00'))
+    assert not BankFundsShard.objects.exclude(total_funds=0, available_funds=0, total_loans=0).exists()
+    assert compact_bank_funds(bank.pk) is False
+    assert get_bank_funds(bank.pk) == {'total_funds': Decimal('5.00'), 'available_funds': Decimal('100.00'), 'total_loans': Decimal('30.00')}
+
+
+def test_set_bank_funds_drops_pending_deltas(bank, shards):
+    add_to_bank_funds(bank.pk, available_funds=Decimal('100.00'))
+
+    set_bank_funds(bank.pk, Decimal('10.00'), Decimal('20.00'), Decimal('30.00'))
+    assert get_balances(bank) == (Decimal('10.00'), Decimal('20.00'), Decimal('30.00'))
+    assert compact_bank_funds(bank.pk) is False
+    assert get_bank_funds(bank.pk) == {'total_funds': Decimal('10.00'), 'available_funds': Decimal('20.00'), 'total_loans': Decimal('30.00')}
+
+
+def test_bank_row_is_updated_directly_without_shards(settings, bank):
+    settings.BANK_FUNDS_SHARDS = 0
+    add_to_bank_funds(bank.pk, available_funds=Decimal('100.00'))
+    assert get_balances(bank) == (0, Decimal('100.00'), 0)
+    assert not BankFundsShard.objects.exists()
@@ -2,6 +2,8 @@ from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils.translation import gettext_lazy as _
+from core.idempotency import idempotent
+from core.events import get_bank_group, get_provider_group, get_customer_group, publish_events
 from core.views import BaseBankViewSet, NonCreatableViewSet, NonUpdatableViewSet, NonDeletableViewSet
 from authentication.models import ApplicantStatus, LoanProvider, LoanCustomer
 from authentication.serializers import LoanProviderSerializer, LoanCustomerSerializer
@@ -10,6 +12,10 @@ from banks.permissions import ApproveApplicantPermissions, RejectApplicantPermis
 
 class ApplicationViewSet(NonCreatableViewSet, NonUpdatableViewSet, NonDeletableViewSet, BaseBankViewSet):
     model = None
+    event = None
+
+    def get_applicant_group(self, instance):
+        raise NotImplementedError(_('ApplicationViewSet must be subclassed with an applicant group'))
 
     def get_queryset(self):
         if self.model is None:
@@ -22,18 +28,29 @@ class ApplicationViewSet(NonCreatableViewSet, NonUpdatableViewSet, NonDeletableV
             .select_related('user')
         )
     
-    @action(detail=True, methods=['get',], url_path='approve', url_name='approve', permission_classes=[ApproveApplicantPermissions])
+    def publish_status_change(self, instance):
+        data = {'id': str(instance.pk), 'status': instance.status}
+        publish_events([
+            (get_bank_group(instance.bank_id), self.event, data),
+            (self.get_applicant_group(instance), self.event, data),
+        ])
+
+    @action(detail=True, methods=['get',], url_path='approve', url_name='approve', permission_classes=[ApproveApplicantPermissions], rate_limit_scope='transitions')
+    @idempotent
     def approve(self, request, pk=None):
         instance = self.get_object()
         instance.status = ApplicantStatus.APPROVED.value
         instance.save(update_fields=['status'])
+        self.publish_status_change(instance)
         return Response({'message': _('Application approved')}, status=status.HTTP_200_OK)
     
-    @action(detail=True, methods=['get',], url_path='reject', url_name='reject', permission_classes=[RejectApplicantPermissions])
+    @action(detail=True, methods=['get',], url_path='reject', url_name='reject', permission_classes=[RejectApplicantPermissions], rate_limit_scope='transitions')
+    @idempotent
     def reject(self, request, pk=None):
         instance = self.get_object()
         instance.status = ApplicantStatus.REJECTED.value
         instance.save(update_fields=['status'])
+        self.publish_status_change(instance)
         return Response({'message': _('Application rejected')}, status=status.HTTP_200_OK)
 
 
@@ -41,9 +58,17 @@ class LoanProviderApplicationViewSet(ApplicationViewSet):
     model = LoanProvider
     queryset = model.objects.all()
     serializer_class = LoanProviderSerializer
+    event = 'providers.status_changed'
+
+    def get_applicant_group(self, instance):
+        return get_provider_group(instance.pk)
 
 
 class LoanCustomerApplicationViewSet(ApplicationViewSet):
     model = LoanCustomer
     queryset = model.objects.all()
     serializer_class = LoanCustomerSerializer
+    event = 'customers.status_changed'
+
+    def get_applicant_group(self, instance):
+        return get_customer_group(instance.pk)
@@ -0,0 +1,91 @@
+import pytest
+from decimal import Decimal
+from django.contrib.auth.models import Group
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework.test import APIClient
+from backend.celery import app as celery_app
+from authentication.models import User, UserRole, BankPersonnel, LoanProvider, LoanCustomer, ApplicantStatus
+from banks.models import Bank, Branch
+from core.throttling import get_rate_limit_backend
+from loans.models import LoanPlan
+
+
+@pytest.fixture(autouse=True)
+def test_settings(settings):
+    # No Redis nor worker in tests: in memory channel layer, tasks run inline, no limits unless a test sets them
+    settings.CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+    settings.RATE_LIMIT_ENABLED = False
+    celery_app.conf.update(CELERY_TASK_ALWAYS_EAGER=True) # CELERY_ namespaced, like the settings it's loaded from
+    get_rate_limit_backend.cache_clear()
+    for cache in caches.all():
+        cache.clear()
+    yield settings
+    celery_app.conf.update(CELERY_TASK_ALWAYS_EAGER=False)
+
+
+@pytest.fixture
+def bank(db):
+    return Bank.objects.create(name_en='Bank', name_ar='Bank', created_at=timezone.now())
+
+
+@pytest.fixture
+def plan(bank):
+    return LoanPlan.objects.create(
+        bank=bank, annual_interest_rate=Decimal('12.00'), minimum_amount=Decimal('1000.00'),
+        maximum_amount=Decimal('1000000.00'), duration_in_months=12, created_at=timezone.now(),
+    )
+
+
+def create_user(username, role):
+    user = User.objects.create_user(f'{username}@example.com', username, 'password')
+    user.role = role
+    user.save()
+    user.groups.add(Group.objects.get(name=role))
+    return user
+
+
+@pytest.fixture
+def make_personnel(db):
+    # make_personnel(bank, username), for the tests involving more than one bank
+    def create_personnel(bank, username='personnel'):
+        branch = Branch.objects.create(
+            bank=bank, name_en='Branch', name_ar='Branch', code='1', address='Address', phone_number='1', created_at=timezone.now(),
+        )
+        user = create_user(username, UserRole.BANK_PERSONNEL.value)
+        return BankPersonnel.objects.create(user=user, branch=branch, created_at=timezone.now())
+    return create_personnel
+
+
+@pytest.fixture
+def personnel(bank, make_personnel):
+    return make_personnel(bank)
+
+
+@pytest.fixture
+def provider(bank):
+    user = create_user('provider', UserRole.LOAN_PROVIDER.value)
+    return LoanProvider.objects.create(
+        user=user, bank=bank, status=ApplicantStatus.APPROVED.value, name_en='Provider', name_ar='Provider',
+        total_funds=Decimal('1000000.00'), registration_number='1', vat_number='1', created_at=timezone.now(),
+    )
+
+
+@pytest.fixture
+def customer(bank):
+    user = create_user('customer', UserRole.LOAN_CUSTOMER.value)
+    return LoanCustomer.objects.create(
+        user=user, bank=bank, status=ApplicantStatus.APPROVED.value, ssn='1', credit_score=700,
+        monthly_income=Decimal('5000.00'), created_at=timezone.now(),
+    )
+
+
+@pytest.fixture
+def api_client():
+    # api_client(user) is authenticated as the user
+    def get_client(user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+    return get_client
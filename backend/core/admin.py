@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.conf import settings
 from django.utils import timezone
+from core.models import QueuedEmail
+from core.versions import bump_versions
 
 
 class BaseBankAdmin(admin.ModelAdmin):
@@ -18,11 +20,23 @@ class BaseBankAdmin(admin.ModelAdmin):
             obj.updated_at = timezone.now()
             obj.updated_by = request.user
         obj.save()
+        bump_versions(obj.__class__) # Conditional GETs of the model's views (core.versions)
 
     def soft_delete_selected(self, request, queryset):
         deleted_by = request.user
         deleted_at = timezone.now()
         queryset.update(deleted_by=deleted_by, deleted_at=deleted_at)
+        bump_versions(queryset.model)
     
     soft_delete_selected.allowed_permissions = ('delete',)
     soft_delete_selected.short_description = 'Soft delete selected %(verbose_name_plural)s'
+
+
+@admin.register(QueuedEmail)
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'subject', 'to', 'status', 'attempts', 'created_at', 'sent_at']
+    search_fields = ['subject', 'to']
+    list_filter = ['status',]
+    ordering = ['-created_at']
+    readonly_fields = ['attempts', 'last_error', 'created_at', 'sent_at']
+    list_per_page = settings.PAGINATION_ADMIN_PAGE_SIZE
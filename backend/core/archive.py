@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from core.models import ARCHIVE_MODELS
+
+
+def get_archive_order():
+    # Referencing models first, so parents freed by their archived children go in the same run.
+    # Cycles (the audit columns pointing at User) are broken in registration order.
+    remaining = list(ARCHIVE_MODELS)
+    ordered = []
+    while remaining:
+        model = next((
+            model for model in remaining
+            if not any(relation.related_model in remaining and relation.related_model is not model for relation in model._meta.related_objects)
+        ), remaining[0])
+        remaining.remove(model)
+        ordered.append(model)
+    return ordered
+
+
+def get_archivable_queryset(model, cutoff):
+    # Soft deleted before the cutoff and no longer referenced by any row of the hot tables,
+    # those stay in place: deleting them would cascade to (or null out) live rows
+    queryset = model._base_manager.filter(deleted_at__lt=cutoff)
+    for relation in model._meta.related_objects:
+        referencing = relation.related_model._base_manager.filter(**{relation.field.name: OuterRef('pk')})
+        if relation.related_model is model:
+            referencing = referencing.exclude(pk=OuterRef('pk'))
+        queryset = queryset.filter(~Exists(referencing))
+    return queryset
+
+
+def archive_batch(model, cutoff, batch_size):
+    # One short transaction per batch: rows are locked (skipping those another transaction holds),
+    # copied to the archive table and deleted from the hot one
+    archive_model = ARCHIVE_MODELS[model]
+    fields = [field.attname for field in model._meta.concrete_fields]
+    with transaction.atomic():
+        rows = list(
+            get_archivable_queryset(model, cutoff).order_by('deleted_at')
+            .select_for_update(skip_locked=True, of=('self',)).values(*fields)[:batch_size]
+        )
+        if not rows:
+            return 0
+        archived_at = timezone.now()
+        archive_model._base_manager.bulk_create([archive_model(archived_at=archived_at, **row) for row in rows])
+        model._base_manager.filter(pk__in=[row[model._meta.pk.attname] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_deleted_rows(retention_days=None, batch_size=None, max_batches=None):
+    retention_days = settings.ARCHIVE_RETENTION_DAYS if retention_days is None else retention_days
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = timezone.now() - timezone.timedelta(days=retention_days)
+
+    archived = {}
+    for model in get_archive_order():
+        archived[model._meta.label] = batches = 0
+        while max_batches is None or batches < max_batches:
+            count = archive_batch(model, cutoff, batch_size)
+            archived[model._meta.label] += count
+            batches += 1
+            if count < batch_size:
+                break
+    return archived
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.checks import Error, Tags, register
+
+PER_PROCESS_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def get_shared_cache_settings():
+    # The caches whose writes every worker has to see, by the setting that names them
+    names = ['PERMISSIONS_CACHE', 'IDEMPOTENCY_CACHE', 'VERSIONS_CACHE']
+    if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_BACKEND == 'core.throttling.CacheRateLimitBackend':
+        names.append('RATE_LIMIT_CACHE')
+    return names
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    errors = []
+    for name in get_shared_cache_settings():
+        alias = getattr(settings, name)
+        if settings.CACHES.get(alias, {}).get('BACKEND') in PER_PROCESS_CACHE_BACKENDS:
+            errors.append(Error(
+                f'{name} ("{alias}") is local to each process.',
+                hint='Set CACHE_URL to a shared cache, e.g. redis://redis:6379/1.',
+                id='core.E001',
+            ))
+    return errors
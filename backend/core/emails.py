@@ -1,17 +1,102 @@
+import logging
+import time
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.html import strip_tags
+from core.models import EmailStatus, QueuedEmail
+
+logger = logging.getLogger(__name__)
 
 
 def send_email(subject, template, context, to):
+    # Rendered now, delivered by send_queued_emails once the current transaction commits
     html_content = render_to_string(template, context)
-    text_content = strip_tags(html_content)
-    email = EmailMultiAlternatives(
-        subject,
-        text_content,
-        f"{settings.EMAIL_HOST_NAME} <{settings.EMAIL_HOST_USER}>",
-        [to,]
+    email = QueuedEmail.objects.create(
+        subject=subject,
+        from_email=f"{settings.EMAIL_HOST_NAME} <{settings.EMAIL_HOST_USER}>",
+        to=to,
+        text_content=strip_tags(html_content),
+        html_content=html_content,
     )
-    email.attach_alternative(html_content, "text/html")
-    return email.send(fail_silently=True)
+    transaction.on_commit(enqueue_email_delivery)
+    return email
+
+
+def enqueue_email_delivery():
+    from core.tasks import send_queued_emails # Deferred, core.tasks imports this module
+    send_queued_emails.delay()
+
+
+def get_message(email, connection):
+    message = EmailMultiAlternatives(email.subject, email.text_content, email.from_email, [email.to], connection=connection)
+    if email.html_content:
+        message.attach_alternative(email.html_content, 'text/html')
+    return message
+
+
+def get_retry_delay(attempts):
+    return timezone.timedelta(seconds=settings.EMAIL_RETRY_BACKOFF * 2 ** (attempts - 1))
+
+
+def send_queued_emails(batch_size=None, max_batches=None):
+    """
+    Delivers the queued emails that are due, batch by batch over a single SMTP connection.
+
+    Each batch is locked (skipping rows another worker holds) for the time it takes to send it.
+    Failed messages are retried with exponential backoff, up to EMAIL_MAX_ATTEMPTS. The connection
+    is dropped after an error and reopened for the next message.
+    """
+    batch_size = batch_size or settings.EMAIL_QUEUE_BATCH_SIZE
+    summary = {'batches': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+    latencies = []
+    started = time.monotonic()
+    connection = None
+
+    try:
+        while max_batches is None or summary['batches'] < max_batches:
+            with transaction.atomic():
+                emails = list(
+                    QueuedEmail.objects.select_for_update(skip_locked=True)
+                    .filter(status=EmailStatus.QUEUED.value, next_attempt_at__lte=timezone.now())
+                    .order_by('next_attempt_at')[:batch_size]
+                )
+                if not emails:
+                    break
+
+                for email in emails:
+                    email.attempts += 1
+                    try:
+                        if connection is None:
+                            connection = get_connection(fail_silently=False)
+                            connection.open()
+                        get_message(email, connection).send()
+                    except Exception as e: # Anything SMTP, socket or backend related
+                        email.last_error = f'{e.__class__.__name__}: {e}'[:1000]
+                        if email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+                            email.status = EmailStatus.FAILED.value
+                            summary['failed'] += 1
+                        else:
+                            email.next_attempt_at = timezone.now() + get_retry_delay(email.attempts)
+                            summary['retried'] += 1
+                        if connection is not None:
+                            connection.close()
+                            connection = None
+                    else:
+                        email.status, email.sent_at, email.last_error = EmailStatus.SENT.value, timezone.now(), ''
+                        latencies.append((email.sent_at - email.created_at).total_seconds())
+                        summary['sent'] += 1
+
+                QueuedEmail.objects.bulk_update(emails, ['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at'])
+                summary['batches'] += 1
+    finally:
+        if connection is not None:
+            connection.close()
+
+    summary['duration'] = round(time.monotonic() - started, 3)
+    summary['average_latency'] = round(sum(latencies) / len(latencies), 3) if latencies else None
+    if summary['batches']:
+        logger.info('Email delivery took %ss: %s', summary['duration'], summary)
+    return summary
@@ -0,0 +1,46 @@
+import logging
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Events pushed over the channel layer to the WebSocket connections (authentication.consumers).
+# Bank personnel listen on their bank's group, providers and customers on their own, so every
+# event is sent to each group allowed to see it. Events only carry ids and the new state,
+# clients refetch whatever else they display instead of polling for it.
+
+
+def get_bank_group(bank_id):
+    return f'bank.{bank_id}'
+
+
+def get_provider_group(provider_id):
+    return f'provider.{provider_id}'
+
+
+def get_customer_group(customer_id):
+    return f'customer.{customer_id}'
+
+
+def send_events(events):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    async def send():
+        for group, event, data in events:
+            await channel_layer.group_send(group, {'type': 'push.event', 'event': event, 'data': data})
+
+    try:
+        async_to_sync(send)()
+    except Exception: # The change is committed either way, clients catch up on their next read
+        logger.exception('Failed to push %s event(s)', len(events))
+
+
+def publish_events(events):
+    # events is a list of (group, event, data), sent once the transaction commits so that
+    # clients reacting to them read the new state
+    if events and settings.WEBSOCKET_EVENTS_ENABLED:
+        transaction.on_commit(lambda: send_events(events))
@@ -0,0 +1,56 @@
+import csv
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+class ExportFormat:
+    CSV = 'csv'
+    NDJSON = 'ndjson'
+    choices = (CSV, NDJSON)
+    content_types = {
+        CSV: 'text/csv',
+        NDJSON: 'application/x-ndjson',
+    }
+
+
+class Echo:
+    # File-like object handing back what csv.writer writes, so each row can be yielded as soon as it's formatted
+    def write(self, value):
+        return value
+
+
+def iter_export_rows(queryset, fields, chunk_size=None):
+    # values_list skips model instantiation, iterator() reads through a server-side cursor on PostgreSQL
+    return queryset.values_list(*fields).iterator(chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE)
+
+
+def iter_csv(rows, fields):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(rows, fields):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+def iter_export(queryset, fields, file_format, chunk_size=None):
+    rows = iter_export_rows(queryset, fields, chunk_size)
+    if file_format == ExportFormat.CSV:
+        return iter_csv(rows, fields)
+    if file_format == ExportFormat.NDJSON:
+        return iter_ndjson(rows, fields)
+    raise ValueError(f'Unsupported export format: {file_format}')
+
+
+def get_export_response(queryset, fields, file_format, filename):
+    response = StreamingHttpResponse(
+        iter_export(queryset, fields, file_format), content_type=ExportFormat.content_types[file_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
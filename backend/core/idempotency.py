@@ -0,0 +1,76 @@
+import hashlib
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.response import Response
+
+# State changing actions are plain GETs that proxies and clients retry. The first successful response
+# is kept for IDEMPOTENCY_TTL and replayed to the retries, which never reach get_object or the
+# transaction. The key is the Idempotency-Key header, or the action and its object when there's none,
+# always scoped to the user. Refused attempts (4xx, 5xx) aren't kept, the next one runs again.
+# A key sent again with another request (query string or body) is refused rather than replayed.
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+def get_idempotency_key(view, request, kwargs):
+    key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+    if key:
+        # The path is part of it, a key reused on another action or object doesn't replay the wrong response
+        scope = f'key:{key}:{request.path}'
+    else:
+        scope = f'action:{view.basename}.{view.action}:' + ','.join(f'{name}={value}' for name, value in sorted(kwargs.items()))
+    return f'idempotency:{request.user.pk}:{hashlib.sha256(scope.encode()).hexdigest()}'
+
+
+def get_request_fingerprint(request):
+    # Read before the view parses the body, DRF then parses it from the cached copy
+    return hashlib.sha256(b'|'.join([request.method.encode(), request.get_full_path().encode(), request._request.body])).hexdigest()
+
+
+def replay(request, stored, fingerprint):
+    if request.headers.get(IDEMPOTENCY_KEY_HEADER) and stored['fingerprint'] != fingerprint:
+        return Response(
+            {'detail': _('The idempotency key was already used for a different request')},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(stored['data'], status=stored['status'], headers={REPLAYED_HEADER: 'true'})
+
+
+def idempotent(func):
+    # Goes under @action, which then keeps the attributes it sets on the wrapper
+    @wraps(func)
+    def wrapper(self, request, *args, **kwargs):
+        if not settings.IDEMPOTENCY_ENABLED or not request.user.is_authenticated:
+            return func(self, request, *args, **kwargs)
+
+        cache = caches[settings.IDEMPOTENCY_CACHE]
+        key = get_idempotency_key(self, request, kwargs)
+        fingerprint = get_request_fingerprint(request)
+        stored = cache.get(key)
+        if stored is not None:
+            return replay(request, stored, fingerprint)
+
+        # Concurrent duplicates wait for the first one's outcome instead of racing it on the row locks
+        lock_key = f'{key}:lock'
+        if not cache.add(lock_key, 1, timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT):
+            return Response(
+                {'detail': _('A request with the same idempotency key is in progress')},
+                status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'},
+            )
+        try:
+            # The first one may have stored its response and released the lock since the lookup above
+            stored = cache.get(key)
+            if stored is not None:
+                return replay(request, stored, fingerprint)
+            response = func(self, request, *args, **kwargs)
+            if status.is_success(response.status_code):
+                cache.set(key, {'status': response.status_code, 'data': response.data, 'fingerprint': fingerprint}, timeout=settings.IDEMPOTENCY_TTL)
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    return wrapper
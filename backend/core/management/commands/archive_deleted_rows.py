@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from core.archive import archive_deleted_rows
+
+
+class Command(BaseCommand):
+    help = 'Move rows soft deleted for longer than the retention window to the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=None, help='Defaults to ARCHIVE_RETENTION_DAYS')
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows moved per transaction, defaults to ARCHIVE_BATCH_SIZE')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches per model')
+
+    def handle(self, *args, **options):
+        archived = archive_deleted_rows(options['retention_days'], options['batch_size'], options['max_batches'])
+        for label, count in archived.items():
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'[+] Archived {sum(archived.values())} row(s).'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from core.emails import send_queued_emails
+
+
+class Command(BaseCommand):
+    help = 'Deliver the queued emails that are due'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Emails per batch, defaults to EMAIL_QUEUE_BATCH_SIZE')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+
+    def handle(self, *args, **options):
+        summary = send_queued_emails(options['batch_size'], options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(
+            f'[+] {summary["sent"]} email(s) sent, {summary["retried"]} to retry and {summary["failed"]} failed '
+            f'in {summary["duration"]}s.'
+        ))
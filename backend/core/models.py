@@ -1,6 +1,6 @@
 import uuid
 from django.utils import timezone
-from django.db import models
+from django.db import models, NotSupportedError
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 
@@ -17,6 +17,128 @@ class BankManager(models.Manager):
         return BankQuerySet(self.model, using=self._db).not_deleted()
 
 
+ARCHIVE_MODELS = {} # Model -> archive model, filled by create_archive_model
+
+
+class ArchiveUnionQuerySet(BankQuerySet):
+    """
+    Reads the hot table and its archive table together, as a UNION ALL. Lookups are replayed on
+    the archive side, so only lookups through forward relations are supported there; ordering and
+    slicing apply to the union, aggregates are not supported. Writes (update, delete) only reach the hot
+    table, archived rows are read only.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._archive_lookups = []
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._archive_lookups = self._archive_lookups[:]
+        return clone
+
+    def _filter_or_exclude_inplace(self, negate, args, kwargs):
+        super()._filter_or_exclude_inplace(negate, args, kwargs)
+        self._archive_lookups.append((negate, args, kwargs))
+
+    def get_live_queryset(self):
+        queryset = BankQuerySet(self.model, query=self.query.chain(), using=self._db, hints=self._hints)
+        queryset._iterable_class, queryset._fields = self._iterable_class, self._fields
+        return queryset
+
+    def get_archive_queryset(self):
+        queryset = ARCHIVE_MODELS[self.model]._base_manager.using(self.db).all()
+        for negate, args, kwargs in self._archive_lookups:
+            queryset = queryset.exclude(*args, **kwargs) if negate else queryset.filter(*args, **kwargs)
+        if self._fields is not None: # values() and values_list(), same columns on both sides
+            return queryset.values_list(*(self._fields or [field.attname for field in self.model._meta.concrete_fields]))
+        names, defer = self.query.deferred_loading
+        return queryset.defer(*names, 'archived_at') if defer else queryset.only(*names)
+
+    def get_union_queryset(self):
+        query = self.query
+        if self.model not in ARCHIVE_MODELS:
+            return self.get_live_queryset()
+        ordering = query.order_by or (self.model._meta.ordering if query.default_ordering else ())
+        pk_name = self.model._meta.pk.attname
+
+        live = self.get_live_queryset()
+        live.query.clear_ordering(force=True)
+        live.query.clear_limits()
+        live.query.select_related = False
+        queryset = live.union(self.get_archive_queryset(), all=True)
+        if ordering: # Columns of the union, so pk has to be spelled out
+            queryset = queryset.order_by(*[
+                field.replace('pk', pk_name) if field.lstrip('-') == 'pk' else field for field in ordering
+            ])
+        queryset.query.set_limits(query.low_mark, query.high_mark)
+        return queryset
+
+    def _fetch_all(self):
+        if self._result_cache is None:
+            self._result_cache = list(self.get_union_queryset())
+        if self._prefetch_related_lookups and not self._prefetch_done:
+            self._prefetch_related_objects()
+
+    def iterator(self, chunk_size=None):
+        return self.get_union_queryset().iterator(chunk_size=chunk_size)
+
+    def count(self):
+        if self._result_cache is not None:
+            return len(self._result_cache)
+        return self.get_union_queryset().count()
+
+    def exists(self):
+        if self._result_cache is not None:
+            return bool(self._result_cache)
+        return self.get_union_queryset().exists()
+
+    def aggregate(self, *args, **kwargs):
+        # Django can't aggregate over a UNION, aggregate the hot and archive querysets separately instead
+        raise NotSupportedError('aggregate() is not supported on rows including the archived ones')
+
+    def delete(self):
+        return self.get_live_queryset().delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class ArchiveUnionManager(models.Manager.from_queryset(ArchiveUnionQuerySet)):
+    pass
+
+
+def create_archive_model(model):
+    """
+    Declares the mirror archive table of a BaseAuditModel subclass, core.archive moves rows there once
+    they have been soft deleted for longer than the retention window. Relations keep their columns but
+    lose their database constraints, the rows they point at may be archived (or deleted) afterwards.
+    """
+    attrs = {'__module__': model.__module__}
+    for field in model._meta.concrete_fields:
+        if field.is_relation: # Built by hand, deconstruct() can't resolve swappable models while models are loading
+            attrs[field.name] = models.ForeignKey(
+                field.remote_field.model, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+',
+                to_field=field.to_fields[0], null=field.null, blank=field.blank, verbose_name=field.verbose_name,
+            )
+            continue
+        name, path, args, kwargs = field.deconstruct()
+        if kwargs.pop('unique', False) and not field.primary_key: # The same value may be archived more than once
+            kwargs['db_index'] = True
+        attrs[name] = field.__class__(*args, **kwargs)
+    attrs['archived_at'] = models.DateTimeField(db_index=True, verbose_name=_('Archived at'))
+    attrs['Meta'] = type('Meta', (), {
+        'managed': True,
+        'app_label': model._meta.app_label,
+        'db_table': f'{model._meta.db_table}_archive',
+        'verbose_name': f'archived {model._meta.verbose_name}',
+        'verbose_name_plural': f'archived {model._meta.verbose_name_plural}',
+    })
+    archive_model = type(f'{model.__name__}Archive', (models.Model,), attrs)
+    ARCHIVE_MODELS[model] = archive_model
+    return archive_model
+
+
 class BaseAuditModel(models.Model):
     created_at = models.DateTimeField(verbose_name=_('Created at'))
     updated_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Updated at'))
@@ -26,7 +148,7 @@ class BaseAuditModel(models.Model):
     deleted_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='%(class)s_deleted_by', verbose_name=_('Deleted by'))
 
     objects = BankManager()
-    all_objects = models.Manager()
+    all_objects = ArchiveUnionManager() # Soft deleted and archived rows included
 
     class Meta:
         abstract = True
@@ -37,3 +159,34 @@ class BaseBankModel(BaseAuditModel):
 
     class Meta:
         abstract = True
+
+
+class EmailStatus(models.TextChoices):
+    QUEUED = ('queued', _('Queued'))
+    SENT = ('sent', _('Sent'))
+    FAILED = ('failed', _('Failed'))
+
+
+class QueuedEmail(models.Model):
+    # Outbox of core.emails: requests only insert rows, send_queued_emails delivers them in batches.
+    # attempts, sent_at and last_error are the delivery record of each message.
+    subject = models.CharField(max_length=255)
+    from_email = models.CharField(max_length=255)
+    to = models.EmailField(max_length=254)
+    text_content = models.TextField()
+    html_content = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=EmailStatus.choices, default=EmailStatus.QUEUED.value)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        managed = True
+        indexes = [
+            models.Index(fields=['next_attempt_at'], name='core_queuedemail_due', condition=models.Q(status='queued')),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.subject} ({self.to})'
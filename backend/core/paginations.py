@@ -1,7 +1,54 @@
+import hashlib
+import json
 from collections import OrderedDict
+from urllib import parse
 from rest_framework import pagination
 from rest_framework.response import Response
 from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+class BankPaginator(Paginator):
+    """
+    Paginator with a count strategy for querysets:
+    above PAGINATION_ESTIMATED_COUNT_THRESHOLD rows the PostgreSQL planner estimate is used,
+    otherwise the exact count is cached for PAGINATION_COUNT_CACHE_TIMEOUT seconds.
+    """
+
+    def __init__(self, object_list, per_page, count_cache_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_cache_key = count_cache_key
+        self.count_is_exact = True
+
+    def estimate_count(self):
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return None
+        sql, params = self.object_list.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return len(self.object_list)
+
+        estimate = self.estimate_count()
+        if estimate is not None and estimate >= settings.PAGINATION_ESTIMATED_COUNT_THRESHOLD:
+            self.count_is_exact = False
+            return estimate
+
+        if self.count_cache_key is None:
+            return self.object_list.count()
+        return cache.get_or_set(self.count_cache_key, self.object_list.count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
 
 
 class BankPagination(pagination.PageNumberPagination):
@@ -9,12 +56,59 @@ class BankPagination(pagination.PageNumberPagination):
     max_page_size = settings.PAGINATION_MAX_PAGE_SIZE
     page_size = settings.PAGINATION_PAGE_SIZE
 
+    def get_count_cache_key(self, queryset, request):
+        if not isinstance(queryset, QuerySet):
+            return None
+        role_object = getattr(request.user, 'role_object', None)
+        # The compiled query carries the role scoping and every filter, so equal keys always mean equal counts
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.sha1(f'{sql}{params}'.encode()).hexdigest()
+        return ':'.join([
+            'pagination', 'count', queryset.model._meta.label_lower,
+            str(getattr(role_object, 'bank_id', None)), str(getattr(request.user, 'role', None)), digest,
+        ])
+
+    def django_paginator_class(self, object_list, per_page):
+        # Called by paginate_queryset in place of a Paginator class
+        return BankPaginator(object_list, per_page, count_cache_key=self.count_cache_key)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_cache_key = self.get_count_cache_key(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
     def get_paginated_response(self, data):
         return Response({
             'pagination': OrderedDict([
                 ('count', self.page.paginator.count),
+                ('count_is_exact', self.page.paginator.count_is_exact),
                 ('next', self.page.next_page_number() if self.page.has_next() else None),
                 ('previous', self.page.previous_page_number() if self.page.has_previous() else None),
             ]),
             'data': data,
         })
+
+
+class BankCursorPagination(pagination.CursorPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = settings.PAGINATION_MAX_PAGE_SIZE
+    page_size = settings.PAGINATION_PAGE_SIZE
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        # Always page on the view's keyset ordering, a client supplied ordering is not guaranteed to be unique or indexed
+        ordering = getattr(view, 'cursor_ordering', None) or self.ordering
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+    def encode_cursor(self, cursor):
+        # Return the opaque cursor itself instead of a full url, like page numbers in BankPagination
+        url = super().encode_cursor(cursor)
+        return parse.parse_qs(parse.urlparse(url).query)[self.cursor_query_param][0]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'pagination': OrderedDict([
+                ('next', self.get_next_link()),
+                ('previous', self.get_previous_link()),
+            ]),
+            'data': data,
+        })
@@ -1,6 +1,38 @@
 from rest_framework.renderers import JSONRenderer
 from rest_framework import status
 from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+try:
+    import orjson
+except ImportError: # Optional, the stdlib encoder is used without it
+    orjson = None
+
+
+class BankJSONEncoder:
+    """
+    Compact JSON encoding returning bytes, with orjson when it's installed and enabled.
+    Types orjson doesn't handle the way DRF does (datetimes, decimals, lazy strings...)
+    are passed through to DRF's JSONEncoder, so both produce the same values.
+    """
+
+    def __init__(self, ensure_ascii=False):
+        self.ensure_ascii = ensure_ascii
+        self.encoder = encoders.JSONEncoder(ensure_ascii=ensure_ascii, separators=(',', ':'), allow_nan=not api_settings.STRICT_JSON)
+        self.use_orjson = orjson is not None and settings.JSON_RENDERER_USE_ORJSON and not ensure_ascii
+
+    def encode(self, obj):
+        if self.use_orjson:
+            ret = orjson.dumps(
+                obj, default=self.encoder.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_SUBCLASS | orjson.OPT_NON_STR_KEYS,
+            )
+        else:
+            ret = self.encoder.encode(obj).encode('utf-8')
+        # Escaped like JSONRenderer does, they are valid JSON but not valid JavaScript
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
 
 
 class BankJSONRenderer(JSONRenderer):
@@ -29,3 +61,35 @@ class BankJSONRenderer(JSONRenderer):
             response['error'] = data if data and isinstance(data, dict) or isinstance(data, list) else None
 
         return super(BankJSONRenderer, self).render(response, accepted_media_type, renderer_context)
+
+    def iter_render(self, data):
+        # Same envelope as render(), written piece by piece: data rows are encoded one at a time
+        # as the iterable produces them, so the full list never exists in memory, in Python or as JSON.
+        encoder = BankJSONEncoder(ensure_ascii=self.ensure_ascii)
+        message = data.pop('message', None) if isinstance(data, dict) else None
+        pagination = data.pop('pagination', None) if isinstance(data, dict) else None
+        rows = data.get('data') if isinstance(data, dict) else data
+
+        yield b'{"status":true,"message":' + encoder.encode(message)
+        yield b',"pagination":' + encoder.encode(pagination) + b',"data":'
+
+        rows = iter(rows) if rows is not None else iter(())
+        first = next(rows, None)
+        if first is None: # Empty data renders as null, like render() does
+            yield b'null'
+        else:
+            yield b'[' + encoder.encode(first)
+            for row in rows:
+                yield b',' + encoder.encode(row)
+            yield b']'
+        yield b',"error":null}'
+
+    def get_streaming_response(self, response):
+        streaming_response = StreamingHttpResponse(
+            self.iter_render(response.data), status=response.status_code, content_type=self.media_type,
+        )
+        for header, value in response.items():
+            if header.lower() != 'content-type':
+                streaming_response[header] = value
+        streaming_response.cookies = response.cookies
+        return streaming_response
@@ -1,4 +1,8 @@
+import operator
+from collections import OrderedDict
 from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
 
 
 class BaseBankSerializer(serializers.ModelSerializer):
@@ -16,3 +20,47 @@ class BaseBankSerializer(serializers.ModelSerializer):
         if self.Meta.model is None:
             raise NotImplementedError(_('BaseBankSerializer must be subclassed with a model'))
         return super().update(instance, validated_data)
+
+
+class CompiledRepresentationMixin:
+    """
+    Read path producing the same output as Serializer.to_representation, with the readable fields
+    compiled once per serializer instance into (name, accessor, to_representation) triples. Plain
+    model columns are read with attrgetter instead of Field.get_attribute, and nested serializers
+    built through get_nested_serializer are instantiated once and reused for every row.
+    """
+
+    def get_compiled_fields(self):
+        if getattr(self, '_compiled_fields', None) is None:
+            model_fields = {
+                field.name for field in self.Meta.model._meta.concrete_fields if not field.is_relation
+            }
+            self._compiled_fields = [
+                (
+                    field.field_name,
+                    operator.attrgetter(field.source_attrs[0])
+                    if len(field.source_attrs) == 1 and field.source_attrs[0] in model_fields
+                    else field.get_attribute,
+                    field.to_representation,
+                )
+                for field in self._readable_fields
+            ]
+        return self._compiled_fields
+
+    def get_nested_serializer(self, serializer_class):
+        if getattr(self, '_nested_serializers', None) is None:
+            self._nested_serializers = {}
+        if serializer_class not in self._nested_serializers:
+            self._nested_serializers[serializer_class] = serializer_class(context=self.context)
+        return self._nested_serializers[serializer_class]
+
+    def to_representation(self, instance):
+        ret = OrderedDict()
+        for field_name, accessor, to_representation in self.get_compiled_fields():
+            try:
+                attribute = accessor(instance)
+            except SkipField:
+                continue
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            ret[field_name] = None if check_for_none is None else to_representation(attribute)
+        return ret
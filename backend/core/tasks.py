@@ -0,0 +1,14 @@
+from celery import shared_task
+from core import archive, emails
+
+
+@shared_task
+def send_queued_emails():
+    # Enqueued after every send_email, and run by CELERY_BEAT_SCHEDULE to pick up the retries
+    return emails.send_queued_emails()
+
+
+@shared_task
+def archive_deleted_rows():
+    # Scheduled by CELERY_BEAT_SCHEDULE, with the retention and batch size from the settings
+    return sum(archive.archive_deleted_rows().values())
@@ -0,0 +1,102 @@
+import pytest
+from decimal import Decimal
+from django.contrib import admin
+from django.test import RequestFactory
+from django.utils import timezone
+from banks.models import Bank
+from loans.models import Loan, LoanPayment, LoanPlan, LoanStatus
+
+pytestmark = pytest.mark.django_db
+
+PLANS_URL = '/api/v1/loan-plans'
+
+
+def test_unchanged_plans_are_not_modified(api_client, plan, personnel, django_assert_num_queries):
+    client = api_client(personnel.user)
+    response = client.get(PLANS_URL)
+    assert response.status_code == 200
+    etag, last_modified = response['ETag'], response['Last-Modified']
+
+    with django_assert_num_queries(0):
+        not_modified = client.get(PLANS_URL, HTTP_IF_NONE_MATCH=etag)
+    assert not_modified.status_code == 304
+    assert not_modified.content == b''
+    assert not_modified['ETag'] == etag
+    assert client.get(PLANS_URL, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+    assert client.get(f'{PLANS_URL}?page=1', HTTP_IF_NONE_MATCH=etag).status_code == 200 # Another response
+
+
+def test_plans_are_served_from_the_response_cache(api_client, plan, personnel, django_assert_num_queries):
+    client = api_client(personnel.user)
+    response = client.get(PLANS_URL)
+
+    with django_assert_num_queries(0):
+        cached = client.get(PLANS_URL)
+    assert cached.status_code == 200
+    assert cached.json() == response.json()
+    assert cached['ETag'] == response['ETag']
+
+
+def test_created_plan_changes_the_etag(api_client, plan, personnel, django_capture_on_commit_callbacks):
+    client = api_client(personnel.user)
+    etag = client.get(PLANS_URL)['ETag']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(PLANS_URL, {
+            'annual_interest_rate': '7.00', 'minimum_amount': '1000.00', 'maximum_amount': '5000.00', 'duration_in_months': 6,
+        }, format='json')
+    assert response.status_code == 201
+
+    response = client.get(PLANS_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+def test_plan_updated_in_the_admin_changes_the_etag(api_client, plan, personnel, django_capture_on_commit_callbacks):
+    client = api_client(personnel.user)
+    etag = client.get(PLANS_URL)['ETag']
+
+    plan.annual_interest_rate = Decimal('9.00')
+    request = RequestFactory().post('/admin/')
+    request.user = personnel.user
+    with django_capture_on_commit_callbacks(execute=True):
+        admin.site._registry[LoanPlan].save_model(request, plan, None, change=True)
+
+    response = client.get(PLANS_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()['data'][0]['annual_interest_rate'] == '9.00'
+
+
+def test_plans_of_another_bank_keep_the_etag(api_client, plan, personnel, make_personnel, django_capture_on_commit_callbacks):
+    client = api_client(personnel.user)
+    etag = client.get(PLANS_URL)['ETag']
+
+    other_personnel = make_personnel(Bank.objects.create(name_en='Other', name_ar='Other', created_at=timezone.now()), 'other')
+    with django_capture_on_commit_callbacks(execute=True):
+        assert api_client(other_personnel.user).post(PLANS_URL, {
+            'annual_interest_rate': '7.00', 'minimum_amount': '1000.00', 'maximum_amount': '5000.00', 'duration_in_months': 6,
+        }, format='json').status_code == 201
+
+    assert client.get(PLANS_URL, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+
+def test_payment_changes_the_schedule_etag(api_client, plan, personnel, provider, customer, django_capture_on_commit_callbacks):
+    loan = Loan.objects.create(
+        purpose='Car', amount='12000.00', plan=plan, provider=provider, customer=customer, bank=plan.bank,
+        total_payable_amount='12794.23', monthly_payable_amount='1066.19', status=LoanStatus.RELEASED.value,
+        approved_at=timezone.now(), created_at=timezone.now(),
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        assert api_client(personnel.user).get(f'/api/v1/loans/applications/{loan.pk}/disburse').status_code == 200
+
+    client, url = api_client(personnel.user), f'/api/v1/loans/{loan.pk}/amortization-schedule'
+    etag = client.get(url)['ETag']
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    payment = LoanPayment.objects.get(loan=loan, installment_number=1)
+    with django_capture_on_commit_callbacks(execute=True):
+        assert api_client(customer.user).get(f'/api/v1/loans/{loan.pk}/payments/{payment.pk}/pay').status_code == 200
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
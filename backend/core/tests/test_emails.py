@@ -0,0 +1,99 @@
+import pytest
+from smtplib import SMTPException
+from unittest import mock
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.utils import timezone
+from core.emails import send_email, send_queued_emails
+from core.models import EmailStatus, QueuedEmail
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def locmem_email(settings):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    settings.EMAIL_MAX_ATTEMPTS = 3
+    settings.EMAIL_RETRY_BACKOFF = 60
+    mail.outbox = []
+
+
+def queue_email(index=0):
+    return QueuedEmail.objects.create(
+        subject=f'Subject {index}', from_email='Bank <bank@example.com>', to=f'{index}@example.com',
+        text_content='Hello', html_content='<p>Hello</p>',
+    )
+
+
+def make_due(email):
+    QueuedEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+
+
+def test_send_email_is_delivered_once_committed(django_capture_on_commit_callbacks):
+    with mock.patch('core.emails.render_to_string', return_value='<p>Welcome</p>'):
+        with django_capture_on_commit_callbacks() as callbacks:
+            email = send_email('Welcome', 'emails/welcome.html', {}, 'customer@example.com')
+        assert mail.outbox == []
+
+        for callback in callbacks: # The delivery task, run inline
+            callback()
+
+    assert len(mail.outbox) == 1
+    message = mail.outbox[0]
+    assert (message.subject, message.to, message.body) == ('Welcome', ['customer@example.com'], 'Welcome')
+    assert message.alternatives == [('<p>Welcome</p>', 'text/html')]
+    email.refresh_from_db()
+    assert (email.status, email.attempts, email.last_error) == (EmailStatus.SENT.value, 1, '')
+    assert email.sent_at is not None
+
+
+def test_emails_are_sent_in_batches():
+    for index in range(5):
+        queue_email(index)
+
+    summary = send_queued_emails(batch_size=2)
+
+    assert (summary['batches'], summary['sent'], summary['retried'], summary['failed']) == (3, 5, 0, 0)
+    assert summary['average_latency'] is not None
+    assert sorted(message.to[0] for message in mail.outbox) == [f'{index}@example.com' for index in range(5)]
+    assert not QueuedEmail.objects.exclude(status=EmailStatus.SENT.value).exists()
+
+
+def test_failed_email_is_retried_with_backoff():
+    email = queue_email()
+
+    with mock.patch.object(EmailBackend, 'send_messages', side_effect=SMTPException('Service unavailable')):
+        started = timezone.now()
+        summary = send_queued_emails()
+    assert (summary['sent'], summary['retried'], summary['failed']) == (0, 1, 0)
+    email.refresh_from_db()
+    assert (email.status, email.attempts) == (EmailStatus.QUEUED.value, 1)
+    assert email.last_error == 'SMTPException: Service unavailable'
+    assert email.next_attempt_at >= started + timezone.timedelta(seconds=60)
+
+    assert send_queued_emails()['batches'] == 0 # Not due yet
+    make_due(email)
+    assert send_queued_emails()['sent'] == 1
+    email.refresh_from_db()
+    assert (email.status, email.attempts, email.last_error) == (EmailStatus.SENT.value, 2, '')
+    assert len(mail.outbox) == 1
+
+
+def test_backoff_doubles_until_the_email_fails():
+    email = queue_email()
+
+    with mock.patch.object(EmailBackend, 'send_messages', side_effect=SMTPException('Service unavailable')):
+        delays = []
+        for attempt in range(3):
+            make_due(email)
+            started = timezone.now()
+            summary = send_queued_emails()
+            email.refresh_from_db()
+            delays.append(round((email.next_attempt_at - started).total_seconds()))
+
+    assert delays[:2] == [60, 120]
+    assert (summary['retried'], summary['failed']) == (0, 1)
+    assert (email.status, email.attempts) == (EmailStatus.FAILED.value, 3)
+    make_due(email)
+    assert send_queued_emails()['batches'] == 0 # Failed emails are left alone
+    assert mail.outbox == []
@@ -0,0 +1,113 @@
+import pytest
+from types import SimpleNamespace
+from django.core.cache import cache, caches
+from django.utils import timezone
+from core.idempotency import REPLAYED_HEADER, get_idempotency_key, get_request_fingerprint
+from loans.models import Loan, LoanStatus
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def pending_loans(plan, provider, customer):
+    return [
+        Loan.objects.create(
+            purpose='Car', amount='12000.00', plan=plan, provider=provider, customer=customer, bank=plan.bank,
+            total_payable_amount='12794.23', monthly_payable_amount='1066.19', created_at=timezone.now(),
+        )
+        for i in range(2)
+    ]
+
+
+def approve(client, loan, key=None, query=''):
+    headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+    return client.get(f'/api/v1/loans/applications/{loan.pk}/approve{query}', **headers)
+
+
+def test_retry_is_replayed_without_touching_the_loan(api_client, personnel, pending_loans, django_assert_num_queries):
+    client, loan = api_client(personnel.user), pending_loans[0]
+    first = approve(client, loan, 'key')
+    assert first.status_code == 200
+    assert REPLAYED_HEADER not in first
+    loan.refresh_from_db()
+    approved_at = loan.approved_at
+
+    with django_assert_num_queries(0):
+        retry = approve(client, loan, 'key')
+    assert retry.status_code == 200
+    assert retry[REPLAYED_HEADER] == 'true'
+    assert retry.json() == first.json()
+    loan.refresh_from_db()
+    assert loan.approved_at == approved_at
+
+
+def test_retry_without_a_key_is_replayed_per_action_and_object(api_client, personnel, pending_loans):
+    client = api_client(personnel.user)
+    assert REPLAYED_HEADER not in approve(client, pending_loans[0])
+    assert approve(client, pending_loans[0])[REPLAYED_HEADER] == 'true'
+    assert REPLAYED_HEADER not in approve(client, pending_loans[1])
+
+
+def test_key_reused_on_another_loan_is_not_replayed(api_client, personnel, pending_loans):
+    client = api_client(personnel.user)
+    assert approve(client, pending_loans[0], 'key').status_code == 200
+    response = approve(client, pending_loans[1], 'key')
+    assert response.status_code == 200
+    assert REPLAYED_HEADER not in response
+    assert Loan.objects.filter(status=LoanStatus.APPROVED.value).count() == 2
+
+
+def test_key_reused_with_a_different_request_is_refused(api_client, personnel, pending_loans):
+    client = api_client(personnel.user)
+    assert approve(client, pending_loans[0], 'key').status_code == 200
+    response = approve(client, pending_loans[0], 'key', query='?comment=other')
+    assert response.status_code == 422
+    assert REPLAYED_HEADER not in response
+
+
+def test_refused_attempts_are_not_replayed(api_client, personnel, pending_loans):
+    client, loan = api_client(personnel.user), pending_loans[0]
+    Loan.objects.filter(pk=loan.pk).update(status=LoanStatus.APPROVED.value)
+    assert approve(client, loan, 'key').status_code == 404 # Out of the personnel's applications
+
+    Loan.objects.filter(pk=loan.pk).update(status=LoanStatus.PENDING.value)
+    response = approve(client, loan, 'key')
+    assert response.status_code == 200
+    assert REPLAYED_HEADER not in response
+
+
+def test_concurrent_duplicate_is_refused(api_client, personnel, pending_loans):
+    client, loan = api_client(personnel.user), pending_loans[0]
+    path = f'/api/v1/loans/applications/{loan.pk}/approve'
+    request = SimpleNamespace(headers={'Idempotency-Key': 'key'}, path=path, user=personnel.user)
+    cache.add(f'{get_idempotency_key(None, request, {})}:lock', 1) # The first request, still running
+
+    response = approve(client, loan, 'key')
+    assert response.status_code == 409
+    assert response['Retry-After'] == '1'
+    loan.refresh_from_db()
+    assert loan.status == LoanStatus.PENDING.value
+
+
+def test_response_stored_while_taking_the_lock_is_replayed(api_client, personnel, pending_loans, monkeypatch):
+    client, loan = api_client(personnel.user), pending_loans[0]
+    path = f'/api/v1/loans/applications/{loan.pk}/approve'
+    request = SimpleNamespace(headers={'Idempotency-Key': 'key'}, path=path, user=personnel.user)
+    key = get_idempotency_key(None, request, {})
+    fingerprint = get_request_fingerprint(SimpleNamespace(method='GET', get_full_path=lambda: path, _request=SimpleNamespace(body=b'')))
+    store, get = caches['default'], caches['default'].get
+
+    def get_then_store(cache_key, *args, **kwargs):
+        # The first request stores its response and releases the lock right after the first lookup
+        value = get(cache_key, *args, **kwargs)
+        if cache_key == key and value is None:
+            store.set(key, {'status': 200, 'data': {'message': 'Loan approved'}, 'fingerprint': fingerprint})
+        return value
+    monkeypatch.setattr(store, 'get', get_then_store)
+
+    response = approve(client, loan, 'key')
+    assert response.status_code == 200
+    assert response[REPLAYED_HEADER] == 'true'
+    loan.refresh_from_db()
+    assert loan.status == LoanStatus.PENDING.value
+    assert store.get(f'{key}:lock') is None
@@ -0,0 +1,86 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from authentication.models import User
+from authentication.serializers import BankTokenObtainPairSerializer
+from core.throttling import BankRateThrottle, get_rate_limit_backend, parse_rate
+
+BACKENDS = ['core.throttling.LocalRateLimitBackend', 'core.throttling.CacheRateLimitBackend']
+WINDOW_START = 6000 # A multiple of every window used below
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, settings):
+    # The cache backend runs on the local memory cache, a per process stand-in for Redis
+    settings.RATE_LIMIT_BACKEND = request.param
+    settings.RATE_LIMIT_CACHE = 'default'
+    get_rate_limit_backend.cache_clear()
+    yield get_rate_limit_backend()
+    get_rate_limit_backend.cache_clear()
+
+
+def test_parse_rate():
+    assert parse_rate('100/min') == (100, 60)
+    assert parse_rate('5/second') == (5, 1)
+    assert parse_rate('1000/day') == (1000, 86400)
+
+
+def test_limit_within_a_window(backend):
+    assert [backend.hit('key', 3, 60, WINDOW_START + 10) for i in range(3)] == [None, None, None]
+    assert backend.hit('key', 3, 60, WINDOW_START + 10) == 50 # Until the next window
+    assert backend.hit('other', 3, 60, WINDOW_START + 10) is None
+
+
+def test_previous_window_is_weighted_by_its_overlap(backend):
+    for i in range(3):
+        backend.hit('key', 3, 60, WINDOW_START)
+    # Half way through the next window, the previous one still counts for 1.5
+    assert backend.hit('key', 3, 60, WINDOW_START + 90) is None
+    assert backend.hit('key', 3, 60, WINDOW_START + 90) == pytest.approx(10) # 1.5 + 2 - 3 over, 3 requests per 60s
+    # Once the previous window is out of the sliding one, only the current count is left
+    assert backend.hit('key', 3, 60, WINDOW_START + 150) is None
+
+
+def test_refused_and_released_hits_are_not_counted(backend):
+    for i in range(5):
+        backend.hit('key', 2, 60, WINDOW_START)
+    backend.release('key', 60, WINDOW_START)
+    assert backend.hit('key', 2, 60, WINDOW_START) is None
+    assert backend.hit('key', 2, 60, WINDOW_START) is not None
+
+
+def test_concurrent_hits_never_exceed_the_limit(backend):
+    def hit(index):
+        return backend.hit('key', 100, 60, WINDOW_START + 1)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(hit, range(400)))
+
+    assert results.count(None) == 100
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('rate_limit_backend', BACKENDS)
+def test_requests_over_the_limit_are_throttled(rate_limit_backend, settings, api_client, personnel):
+    settings.RATE_LIMIT_ENABLED = True
+    settings.RATE_LIMIT_BACKEND = rate_limit_backend
+    settings.RATE_LIMITS = {'api': {'user': '2/min'}}
+    get_rate_limit_backend.cache_clear()
+    client = api_client(personnel.user)
+
+    assert [client.get('/api/v1/loan-plans').status_code for i in range(3)] == [200, 200, 429]
+    response = client.get('/api/v1/loan-plans')
+    assert response.status_code == 429
+    assert 0 < int(response['Retry-After']) <= 60
+    assert api_client(personnel.user).get('/api/v1/loan-plans').status_code == 429 # Per user, not per client
+
+
+@pytest.mark.django_db
+def test_bank_identity_is_read_from_the_token(personnel, bank, django_assert_num_queries):
+    throttle = BankRateThrottle()
+    token = BankTokenObtainPairSerializer.get_token(personnel.user).access_token
+    user = User.objects.get(pk=personnel.user.pk) # Role object not loaded
+    with django_assert_num_queries(0):
+        assert throttle.get_identity('bank', SimpleNamespace(user=user, auth=token)) == str(bank.pk)
+    # Session users have no token, their role object is looked up
+    assert str(throttle.get_identity('bank', SimpleNamespace(user=user, auth=None))) == str(bank.pk)
@@ -0,0 +1,161 @@
+import threading
+import time
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+from rest_framework_simplejwt.tokens import Token
+
+# Sliding window counters: a request is allowed while the current window's count plus the previous
+# window's, weighted by how much of it still overlaps the last `window` seconds, stays under the limit.
+# Counts are only ever changed by atomic increments, so concurrent requests can't both take the last slot.
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    # '100/min' -> (100, 60), like DRF's rates: only the first letter of the period counts
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class RateLimitBackend:
+
+    def increment(self, key, window_index, window):
+        # Adds one to the window's count and returns (count, previous window's count)
+        raise NotImplementedError
+
+    def decrement(self, key, window_index):
+        raise NotImplementedError
+
+    def hit(self, key, limit, window, now):
+        # Counts the request and returns None if it's allowed, else the seconds to wait (the hit is undone)
+        window_index, elapsed = divmod(now, window)
+        count, previous = self.increment(key, int(window_index), window)
+        weight = 1 - elapsed / window
+        if previous * weight + count <= limit:
+            return None
+        self.decrement(key, int(window_index))
+        if count > limit or not previous: # Even without the previous window, wait for the next one
+            return window - elapsed
+        return (previous * weight + count - limit) * window / previous
+
+    def release(self, key, window, now):
+        # Undoes an allowed hit, when another limit of the same request refused it
+        self.decrement(key, int(now // window))
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """
+    Counters kept in the process memory, behind a lock. Each worker (and host) limits on its own,
+    for development or a single process deployment.
+    """
+    max_keys = 10000 # Stale keys are dropped past this many
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {} # key -> [window_index, count, previous count]
+
+    def prune(self, window_index):
+        for key in [key for key, counter in self.counters.items() if counter[0] < window_index - 1]:
+            del self.counters[key]
+
+    def increment(self, key, window_index, window):
+        with self.lock:
+            counter = self.counters.get(key)
+            if counter is None or counter[0] < window_index:
+                previous = counter[1] if counter is not None and counter[0] == window_index - 1 else 0
+                if counter is None and len(self.counters) >= self.max_keys:
+                    self.prune(window_index)
+                counter = self.counters[key] = [window_index, 0, previous]
+            counter[1] += 1
+            return counter[1], counter[2]
+
+    def decrement(self, key, window_index):
+        with self.lock:
+            counter = self.counters.get(key)
+            if counter is not None and counter[0] == window_index and counter[1] > 0:
+                counter[1] -= 1
+
+
+class CacheRateLimitBackend(RateLimitBackend):
+    """
+    Counters kept in RATE_LIMIT_CACHE, shared by every worker and host using it. Relies on the cache's
+    add and incr being atomic, as they are with Redis, Memcached and the local memory cache (the
+    latter being a per process stand-in, for tests), but not the database cache.
+    """
+
+    def __init__(self):
+        self.cache = caches[settings.RATE_LIMIT_CACHE]
+
+    def get_key(self, key, window_index):
+        return f'{key}:{window_index}'
+
+    def increment(self, key, window_index, window):
+        current_key = self.get_key(key, window_index)
+        try:
+            count = self.cache.incr(current_key)
+        except ValueError: # First hit of the window, unless another request just created it
+            count = 1 if self.cache.add(current_key, 1, timeout=window * 2) else self.cache.incr(current_key)
+        return count, self.cache.get(self.get_key(key, window_index - 1), 0)
+
+    def decrement(self, key, window_index):
+        try:
+            self.cache.decr(self.get_key(key, window_index))
+        except ValueError: # Expired meanwhile
+            pass
+
+
+@lru_cache(maxsize=None)
+def get_rate_limit_backend():
+    return import_string(settings.RATE_LIMIT_BACKEND)()
+
+
+class BankRateThrottle(BaseThrottle):
+    """
+    Limits requests per user, per bank and per IP, with the limits of the view's rate_limit_scope in
+    RATE_LIMITS, e.g. {'user': '30/min', 'ip': '100/min'}. Viewsets set the scope, and actions through
+    their @action kwargs. Each scope has its own counters, a request is refused as soon as one is full.
+    """
+    wait_time = None
+
+    def get_identity(self, kind, request):
+        user = request.user
+        if kind == 'ip':
+            return self.get_ident(request)
+        if user is None or not user.is_authenticated:
+            return None
+        if kind == 'user':
+            return user.pk
+        if kind == 'bank':
+            # Tokens carry it (authentication.jwt_auth.add_user_claims), only session users are looked up
+            if isinstance(request.auth, Token) and 'bank_id' in request.auth:
+                return request.auth['bank_id']
+            return getattr(user.role_object, 'bank_id', None)
+        raise ValueError(f'Unknown rate limit kind: {kind}')
+
+    def allow_request(self, request, view):
+        if not settings.RATE_LIMIT_ENABLED:
+            return True
+        backend = get_rate_limit_backend()
+        scope = getattr(view, 'rate_limit_scope', None) or settings.RATE_LIMIT_DEFAULT_SCOPE
+        now = time.time()
+        allowed = []
+        for kind, rate in settings.RATE_LIMITS.get(scope, {}).items():
+            identity = self.get_identity(kind, request)
+            if identity is None:
+                continue
+            limit, window = parse_rate(rate)
+            key = f'ratelimit:{scope}:{kind}:{identity}'
+            wait = backend.hit(key, limit, window, now)
+            if wait is not None:
+                for allowed_key, allowed_window in allowed:
+                    backend.release(allowed_key, allowed_window, now)
+                self.wait_time = wait
+                return False
+            allowed.append((key, window))
+        return True
+
+    def wait(self):
+        return self.wait_time
@@ -0,0 +1,50 @@
+import hashlib
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+# Versions of the rows a view reads, for conditional GETs (ETag, Last-Modified) and the response cache
+# of BaseBankViewSet. A model has a version of its own, bumped by bulk writers that can't tell which
+# scopes they touched, and one per scope (e.g. the plans of one bank), bumped by the targeted writes.
+# Like the permissions version, a bump is a fresh random value, never a counter an evicted key could reuse.
+
+
+def get_cache():
+    return caches[settings.VERSIONS_CACHE]
+
+
+def get_version_key(model, scope=None):
+    key = f'versions:{model._meta.label_lower}'
+    return f'{key}:{scope}' if scope is not None else key
+
+
+def new_version():
+    return uuid.uuid4().hex, int(time.time())
+
+
+def get_versions(keys):
+    # (version, last modified timestamp) per key, created on first read
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        for key, version in missing.items():
+            cache.add(key, version, None)
+        versions.update(cache.get_many(list(missing)))
+    return [versions.get(key) or missing[key] for key in keys]
+
+
+def get_validators(keys, *variants):
+    # ETag and Last-Modified of a response built from the rows behind keys, variants being whatever else
+    # it depends on (path and query string, format, language)
+    versions = get_versions(keys)
+    digest = hashlib.sha256('|'.join([version for version, modified in versions] + [str(variant) for variant in variants]).encode())
+    return digest.hexdigest()[:32], max(modified for version, modified in versions)
+
+
+def bump_versions(model, scopes=(None,)):
+    # After the commit, a read in between would otherwise cache the old rows under the new version
+    keys = [get_version_key(model, scope) for scope in scopes]
+    transaction.on_commit(lambda: get_cache().set_many({key: new_version() for key in keys}, None))
@@ -3,36 +3,141 @@ from rest_framework.response import Response
 from rest_framework.filters import OrderingFilter
 from rest_framework.renderers import BrowsableAPIRenderer
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.core.cache import caches
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
 from django.utils.translation import gettext_lazy as _
-from core.paginations import BankPagination
+from core.paginations import BankPagination, BankCursorPagination
 from core.permissions import BaseBankPermissions
 from core.renderers import BankJSONRenderer
+from core.versions import get_version_key, get_validators, bump_versions
 
 
-# TODO: Implement rate limiting for all views (Must be concurrency safe)
 class BaseBankViewSet(viewsets.ModelViewSet):
     model = None
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     pagination_class = BankPagination
+    cursor_pagination_class = BankCursorPagination
+    cursor_ordering = ('-created_at', '-id')
+    pagination_mode_query_param = 'pagination'
     permission_classes = [BaseBankPermissions,]
     renderer_classes = [BankJSONRenderer, BrowsableAPIRenderer]
+    streaming_list = False # Opt in to stream list responses row by row
+    rate_limit_scope = None # RATE_LIMITS scope (core.throttling), RATE_LIMIT_DEFAULT_SCOPE if not set
+    cache_list_responses = False # Keep list responses in the cache, keyed by their ETag (needs get_version_scope)
+
+    @property
+    def paginator(self):
+        # ?pagination=cursor switches any list endpoint to keyset pagination (no COUNT, no OFFSET)
+        if not hasattr(self, '_paginator') and self.cursor_pagination_class is not None and self.request is not None:
+            if self.request.query_params.get(self.pagination_mode_query_param) == 'cursor':
+                self._paginator = self.cursor_pagination_class()
+        return super().paginator
 
     def get_queryset(self):
         if self.model is None:
             raise NotImplementedError(_('BaseBankViewSet must be subclassed with a model'))
         return self.model.objects.all()
 
+    def get_version_scope(self):
+        # The scope of the rows the view reads (core.versions), e.g. 'bank:<id>'. Enables conditional GETs when set.
+        return None
+
+    def get_version_keys(self):
+        scope = self.get_version_scope()
+        if scope is None:
+            return None
+        return [get_version_key(self.model), get_version_key(self.model, scope)]
+
+    def get_response_validators(self):
+        # (ETag, Last-Modified), computed once per request
+        if not hasattr(self, '_response_validators'):
+            keys = self.get_version_keys() if settings.CONDITIONAL_GET_ENABLED and self.request.method in ('GET', 'HEAD') else None
+            self._response_validators = keys and get_validators(
+                keys, self.request.get_full_path(), self.request.accepted_renderer.format,
+                self.request.headers.get('Accept-Language', ''),
+            )
+        return self._response_validators
+
+    def get_not_modified_response(self, request):
+        # 304 for If-None-Match or If-Modified-Since, before anything is queried or serialized
+        validators = self.get_response_validators()
+        if validators is None:
+            return None
+        etag, last_modified = validators
+        return get_conditional_response(request, etag=quote_etag(etag), last_modified=last_modified)
+
+    def bump_version(self):
+        scope = self.get_version_scope()
+        if scope is not None:
+            bump_versions(self.model, [scope])
+
+    def is_streaming(self):
+        # Only the JSON renderer knows how to stream, the browsable API still gets a regular response
+        return (
+            self.streaming_list and self.action == 'list'
+            and isinstance(getattr(self.request, 'accepted_renderer', None), BankJSONRenderer)
+        )
+
+    def list(self, request, *args, **kwargs):
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+
+        if self.cache_list_responses and self.get_response_validators() is not None and not self.is_streaming():
+            cache = caches[settings.VERSIONS_CACHE]
+            cache_key = f'responses:{self.get_response_validators()[0]}'
+            data = cache.get(cache_key)
+            if data is None:
+                response = super().list(request, *args, **kwargs)
+                cache.set(cache_key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+                return response
+            return Response(data)
+
+        if not self.is_streaming():
+            return super().list(request, *args, **kwargs)
+
+        # Rows are serialized lazily, while the renderer writes them out
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = page if page is not None else queryset.iterator(chunk_size=settings.STREAMING_CHUNK_SIZE)
+        serializer = self.get_serializer(many=True)
+        rows = (serializer.child.to_representation(instance) for instance in objects)
+        if page is not None:
+            return self.get_paginated_response(rows)
+        return Response(rows)
+
+    def retrieve(self, request, *args, **kwargs):
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+        return super().retrieve(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED) and self.get_response_validators() is not None:
+            etag, last_modified = self.get_response_validators()
+            response.headers['ETag'] = quote_etag(etag)
+            response.headers['Last-Modified'] = http_date(last_modified)
+        if self.is_streaming() and isinstance(response, Response) and status.is_success(response.status_code):
+            return response.accepted_renderer.get_streaming_response(response)
+        return response
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user, created_at=timezone.now())
+        self.bump_version()
     
     def perform_update(self, serializer):
         serializer.save(updated_by=self.request.user, updated_at=timezone.now())
+        self.bump_version()
     
     def perform_destroy(self, instance):
         instance.deleted_by = self.request.user
         instance.deleted_at = timezone.now()
         instance.save(update_fields=['deleted_by', 'deleted_at'])
+        self.bump_version()
 
 
 class NonCreatableViewSet(viewsets.ModelViewSet):
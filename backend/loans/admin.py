@@ -1,6 +1,6 @@
 from django.contrib import admin
 from core.admin import BaseBankAdmin
-from loans.models import LoanPlan, Loan, LoanPayment
+from loans.models import LoanPlan, Loan, LoanPayment, LoanPortfolioSummary
 
 
 @admin.register(LoanPlan)
@@ -12,13 +12,19 @@ class LoanPlanAdmin(BaseBankAdmin):
 
 @admin.register(Loan)
 class LoanAdmin(BaseBankAdmin):
-    list_display = BaseBankAdmin.list_display + ['purpose', 'amount', 'plan', 'status', 'is_active', 'is_amortized']
+    list_display = BaseBankAdmin.list_display + ['purpose', 'amount', 'plan', 'status', 'is_active', 'is_amortized', 'is_overdue', 'days_past_due']
     search_fields = ['purpose', 'amount', 'plan', 'customer', 'status', 'is_active', 'is_amortized', 'total_payable_amount', 'monthly_payable_amount', 'approved_at', 'disbursed_at']
-    list_filter = ['bank', 'plan', 'status', 'is_active', 'is_amortized', 'approved_at', 'disbursed_at']
+    list_filter = ['bank', 'plan', 'status', 'is_active', 'is_amortized', 'is_overdue', 'schedule_mode', 'is_schedule_ready', 'approved_at', 'disbursed_at']
 
 
 @admin.register(LoanPayment)
 class LoanPaymentAdmin(BaseBankAdmin):
-    list_display = BaseBankAdmin.list_display + ['installment_number', 'loan', 'amount', 'interest_paid', 'principal_paid', 'remaining_principal', 'is_paid']
+    list_display = BaseBankAdmin.list_display + ['installment_number', 'loan', 'amount', 'interest_paid', 'principal_paid', 'remaining_principal', 'is_paid', 'is_overdue', 'days_past_due']
     search_fields = ['installment_number', 'loan', 'amount',]
-    list_filter = ['is_paid',]
+    list_filter = ['is_paid', 'is_overdue']
+
+
+@admin.register(LoanPortfolioSummary)
+class LoanPortfolioSummaryAdmin(admin.ModelAdmin):
+    list_display = ['bank', 'status', 'loans_count', 'total_amount', 'amortized_count', 'outstanding_principal', 'interest_earned']
+    list_filter = ['bank', 'status']
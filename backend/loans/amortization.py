@@ -0,0 +1,156 @@
+import uuid
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_EVEN
+from functools import lru_cache
+from itertools import islice
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from core.versions import bump_versions
+from loans.events import publish_loan_status_changes
+from loans.models import Loan, LoanPayment, LoanStatus, ScheduleMode
+
+
+CENT = Decimal('0.01')
+ZERO = Decimal(0)
+
+Installment = namedtuple('Installment', [
+    'installment_number', 'amount', 'interest_paid', 'principal_paid', 'remaining_principal',
+])
+
+
+def calculate_monthly_interest_rate(annual_interest_rate):
+    return Decimal(annual_interest_rate / Decimal(100) / Decimal(12))
+
+
+@lru_cache(maxsize=settings.LOAN_ANNUITY_FACTOR_CACHE_SIZE)
+def get_annuity_factor(annual_interest_rate, duration_in_months):
+    # Monthly Payment = Principal * Annuity Factor, where the factor only depends on the plan:
+    # Monthly Interest Rate * ((1 + Monthly Interest Rate) ^ Duration) / (((1 + Monthly Interest Rate) ^ Duration) - 1)
+    monthly_interest_rate = calculate_monthly_interest_rate(annual_interest_rate)
+    compounded_rate = (1 + monthly_interest_rate) ** duration_in_months
+    return monthly_interest_rate * compounded_rate / (compounded_rate - 1)
+
+
+def calculate_monthly_payment(principal, annual_interest_rate, duration_in_months):
+    return principal * get_annuity_factor(annual_interest_rate, duration_in_months)
+
+
+def calculate_due_date(start, installment_number):
+    return start + timezone.timedelta(days=30 * installment_number)
+
+
+def get_due_date_range(approved_at, duration_in_months):
+    # First and last due dates of a loan's installments, plans are never updated so they don't move
+    return calculate_due_date(approved_at, 1), calculate_due_date(approved_at, duration_in_months)
+
+
+def round_to_cent(value):
+    # Same rounding the DecimalField(decimal_places=2) columns apply on save
+    return value.quantize(CENT, rounding=ROUND_HALF_EVEN)
+
+
+def iter_schedule(principal, monthly_interest_rate, duration_in_months, monthly_payment, stop=None):
+    # Interest and principal are carried unrounded from one month to the next (exactly like the
+    # original per-row loop did), only the emitted values are rounded to the cent.
+    remaining_principal = principal
+    amount = round_to_cent(monthly_payment)
+    last_month = duration_in_months if stop is None else min(stop, duration_in_months)
+
+    for month in range(1, last_month + 1):
+        interest_paid = remaining_principal * monthly_interest_rate
+        principal_paid = monthly_payment - interest_paid
+        remaining_principal = remaining_principal - principal_paid if remaining_principal > principal_paid else ZERO
+        yield Installment(
+            month, amount, round_to_cent(interest_paid),
+            round_to_cent(principal_paid), round_to_cent(remaining_principal)
+        )
+
+
+def generate_schedule(principal, annual_interest_rate, duration_in_months, monthly_payment):
+    monthly_interest_rate = calculate_monthly_interest_rate(annual_interest_rate)
+    return list(iter_schedule(principal, monthly_interest_rate, duration_in_months, monthly_payment))
+
+
+def generate_schedules(principals, annual_interest_rates, durations_in_months, monthly_payments):
+    # Batch variant, takes one column per loan attribute and returns one schedule per loan.
+    # Monthly rates are computed once per distinct annual rate, since a batch usually shares a few plans.
+    monthly_interest_rates = {}
+    schedules = []
+
+    for principal, annual_interest_rate, duration_in_months, monthly_payment in zip(
+        principals, annual_interest_rates, durations_in_months, monthly_payments, strict=True
+    ):
+        if annual_interest_rate not in monthly_interest_rates:
+            monthly_interest_rates[annual_interest_rate] = calculate_monthly_interest_rate(annual_interest_rate)
+        schedules.append(list(iter_schedule(
+            principal, monthly_interest_rates[annual_interest_rate], duration_in_months, monthly_payment
+        )))
+
+    return schedules
+
+
+def build_payment_rows(loans, schedules, created_by_id, created_at):
+    # Instantiating models positionally skips the per-kwarg work of Model.__init__,
+    # which dominates the cost of building thousands of installments.
+    fields = LoanPayment._meta.concrete_fields
+    defaults = {field.attname: field.get_default() for field in fields}
+    payments = []
+
+    for loan, schedule in zip(loans, schedules, strict=True):
+        for installment in schedule:
+            values = {
+                'id': uuid.uuid4(), 'created_at': created_at, 'updated_at': None, 'deleted_at': None,
+                'created_by_id': created_by_id, 'updated_by_id': None, 'deleted_by_id': None,
+                'installment_number': installment.installment_number, 'loan_id': loan.pk,
+                'amount': installment.amount,
+                'due_date': calculate_due_date(loan.approved_at, installment.installment_number),
+                'is_paid': False, 'paid_at': None,
+                'interest_paid': installment.interest_paid, 'principal_paid': installment.principal_paid,
+                'remaining_principal': installment.remaining_principal,
+            }
+            payments.append(LoanPayment(*[values.get(field.attname, defaults[field.attname]) for field in fields]))
+
+    return payments
+
+
+def get_schedule_version_scope(loan_id):
+    # The amortization schedule of a loan, for its ETag (core.versions)
+    return f'loan:{loan_id}'
+
+
+def bump_schedule_versions(loan_ids):
+    bump_versions(LoanPayment, [get_schedule_version_scope(loan_id) for loan_id in set(loan_ids)])
+
+
+def materialize_payment_schedules(loan_ids, created_by_id=None):
+    # Inserts the installments of disbursed loans whose schedule was deferred (LOAN_SCHEDULE_ASYNC).
+    # Idempotent: the loans are locked and flagged ready in the transaction that inserts their
+    # installments, so a retried or duplicated run skips the ones already done.
+    generated = 0
+    loan_ids = iter(loan_ids)
+    while chunk := list(islice(loan_ids, settings.LOAN_SCHEDULE_ASYNC_CHUNK_SIZE)):
+        with transaction.atomic():
+            loans = list(
+                Loan.objects.select_related('plan').select_for_update(of=('self',)).filter(
+                    pk__in=chunk, status=LoanStatus.DISBURSED.value,
+                    schedule_mode=ScheduleMode.MATERIALIZED.value, is_schedule_ready=False,
+                )
+            )
+            if not loans:
+                continue
+            schedules = generate_schedules(
+                [loan.amount for loan in loans],
+                [loan.plan.annual_interest_rate for loan in loans],
+                [loan.plan.duration_in_months for loan in loans],
+                [loan.monthly_payable_amount for loan in loans],
+            )
+            payments = build_payment_rows(loans, schedules, created_by_id, timezone.now())
+            LoanPayment.objects.bulk_create(payments, batch_size=settings.LOAN_SCHEDULE_BATCH_SIZE)
+            Loan.objects.filter(pk__in=[loan.pk for loan in loans]).update(is_schedule_ready=True)
+            for loan in loans:
+                loan.is_schedule_ready = True
+            publish_loan_status_changes(loans) # Clients waiting on next-payment don't have to poll for it
+            bump_schedule_versions([loan.pk for loan in loans])
+            generated += len(loans)
+    return generated
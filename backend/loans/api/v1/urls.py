@@ -4,13 +4,16 @@ from django.conf import settings
 from rest_framework_nested import routers
 from loans.views import (
     LoanPlanViewSet, LoanViewSet, LoanApplicationViewSet,
-    LoanPaymentViewSet, AmortizationScheduleViewSet
+    LoanPaymentViewSet, AmortizationScheduleViewSet, LoanRepaymentViewSet, LoanPortfolioViewSet, ExportViewSet
 )
 
 router = routers.DefaultRouter(trailing_slash=settings.APPEND_SLASH)
 router.register(r'loan-plans', LoanPlanViewSet)
 router.register(r'loans/applications', LoanApplicationViewSet, basename='loan-applications')
+router.register(r'loans/repayments', LoanRepaymentViewSet, basename='loan-repayments')
+router.register(r'loans/portfolio', LoanPortfolioViewSet, basename='loan-portfolio')
 router.register(r'loans', LoanViewSet)
+router.register(r'exports', ExportViewSet, basename='exports')
 
 loan_router = routers.NestedSimpleRouter(router, r'loans', lookup='loan')
 loan_router.register(r'amortization-schedule', AmortizationScheduleViewSet, basename='loan-amortization-schedule')
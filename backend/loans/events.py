@@ -0,0 +1,36 @@
+from collections import defaultdict
+from core.events import get_bank_group, get_provider_group, get_customer_group, publish_events
+
+# One event per group and batch, a bulk disbursement or a repayment import pushes
+# a handful of messages rather than one per loan or installment
+
+
+def get_loan_groups(loan):
+    return (get_bank_group(loan.bank_id), get_provider_group(loan.provider_id), get_customer_group(loan.customer_id))
+
+
+def publish_grouped(event, key, items):
+    groups = defaultdict(list)
+    for loan, data in items:
+        for group in get_loan_groups(loan):
+            groups[group].append(data)
+    publish_events([(group, event, {key: values}) for group, values in groups.items()])
+
+
+def publish_loan_status_changes(loans):
+    publish_grouped('loans.status_changed', 'loans', [
+        (loan, {'id': str(loan.pk), 'status': loan.status, 'is_schedule_ready': loan.is_schedule_ready})
+        for loan in loans
+    ])
+
+
+def publish_payments(payments, amortized_loans=()):
+    amortized_loan_ids = {loan.pk for loan in amortized_loans}
+    publish_grouped('payments.recorded', 'payments', [
+        (payment.loan, {
+            'id': str(payment.pk), 'loan': str(payment.loan_id), 'installment_number': payment.installment_number,
+            'paid_at': payment.paid_at.isoformat() if payment.paid_at else None,
+            'is_amortized': payment.loan_id in amortized_loan_ids,
+        })
+        for payment in payments
+    ])
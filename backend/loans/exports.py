@@ -0,0 +1,38 @@
+from collections import namedtuple
+from django_filters import utils as filter_utils
+from authentication.models import LoanProvider, LoanCustomer
+from loans.filters import LoanFilter, LoanPaymentFilter
+from loans.models import Loan, LoanPayment
+
+ExportSpec = namedtuple('ExportSpec', ['model', 'fields', 'filterset_class', 'bank_lookup'])
+
+APPLICANT_EXPORT_FIELDS = ('id', 'user_id', 'user__username', 'user__email', 'status', 'created_at', 'updated_at')
+
+EXPORTS = {
+    'loans': ExportSpec(Loan, (
+        'id', 'purpose', 'amount', 'plan_id', 'provider_id', 'customer_id', 'status', 'is_active', 'is_amortized',
+        'schedule_mode', 'monthly_payable_amount', 'total_payable_amount',
+        'created_at', 'approved_at', 'released_at', 'disbursed_at', 'rejected_at',
+    ), LoanFilter, 'bank_id'),
+    'payments': ExportSpec(LoanPayment, (
+        'id', 'loan_id', 'installment_number', 'amount', 'due_date', 'is_paid', 'paid_at',
+        'interest_paid', 'principal_paid', 'remaining_principal',
+    ), LoanPaymentFilter, 'loan__bank_id'),
+    'providers': ExportSpec(LoanProvider, APPLICANT_EXPORT_FIELDS + (
+        'name_en', 'name_ar', 'total_funds', 'registration_number', 'vat_number',
+    ), None, 'bank_id'),
+    'customers': ExportSpec(LoanCustomer, APPLICANT_EXPORT_FIELDS + (
+        'ssn', 'credit_score', 'monthly_income',
+    ), None, 'bank_id'),
+}
+
+
+def get_export_queryset(spec, bank_id, params, request=None):
+    # Selection goes through the same FilterSets as the list endpoints, rows come out in primary key order
+    queryset = spec.model.objects.filter(**{spec.bank_lookup: bank_id})
+    if spec.filterset_class is not None:
+        filterset = spec.filterset_class(params, queryset=queryset, request=request)
+        if not filterset.is_valid():
+            raise filter_utils.translate_validation(filterset.errors)
+        queryset = filterset.qs
+    return queryset.order_by('pk')
@@ -0,0 +1,92 @@
+import random
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from loans.amortization import calculate_monthly_interest_rate, round_to_cent, generate_schedules, build_payment_rows
+from loans.models import LoanPlan, Loan, LoanPayment
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the amortization schedule engine against the original per-installment loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loans', type=int, default=1000, help='Number of loans to generate schedules for')
+        parser.add_argument('--months', type=int, default=360, help='Maximum plan duration in months')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated loans')
+
+    def build_loans(self, count, max_months, seed):
+        rng = random.Random(seed)
+        approved_at = timezone.now()
+        plans = [
+            LoanPlan(annual_interest_rate=Decimal(rate), duration_in_months=months)
+            for rate in ('3.50', '7.25', '12.00', '19.99')
+            for months in (12, 60, max_months)
+        ]
+        loans = []
+        for _ in range(count):
+            plan = rng.choice(plans)
+            amount = Decimal(rng.randrange(100000, 100000000)) / 100
+            monthly_interest_rate = calculate_monthly_interest_rate(plan.annual_interest_rate)
+            growth = (1 + monthly_interest_rate) ** plan.duration_in_months
+            monthly_payable_amount = round_to_cent(amount * monthly_interest_rate * growth / (growth - 1))
+            loans.append(Loan(
+                amount=amount, plan=plan, approved_at=approved_at, monthly_payable_amount=monthly_payable_amount
+            ))
+        return loans
+
+    def run_loop(self, loans):
+        # Verbatim port of the per-installment loop the disburse action used before the engine
+        payment_schedules = []
+        for instance in loans:
+            remaining_principal = instance.amount
+            monthly_interest_rate = calculate_monthly_interest_rate(instance.plan.annual_interest_rate)
+            for month in range(1, instance.plan.duration_in_months + 1):
+                interest_paid = remaining_principal * monthly_interest_rate
+                principal_paid = instance.monthly_payable_amount - interest_paid
+                remaining_principal = Decimal(remaining_principal - principal_paid) if remaining_principal > principal_paid else Decimal(0)
+                payment_schedules.append(LoanPayment(
+                    created_at=timezone.now(),
+                    installment_number=month, loan=instance, amount=instance.monthly_payable_amount,
+                    due_date=(instance.approved_at + timezone.timedelta(days=30 * month)),
+                    interest_paid=interest_paid, principal_paid=principal_paid, remaining_principal=remaining_principal
+                ))
+        return payment_schedules
+
+    def run_engine(self, loans):
+        schedules = generate_schedules(
+            [loan.amount for loan in loans],
+            [loan.plan.annual_interest_rate for loan in loans],
+            [loan.plan.duration_in_months for loan in loans],
+            [loan.monthly_payable_amount for loan in loans],
+        )
+        return build_payment_rows(loans, schedules, None, timezone.now())
+
+    def timed(self, function, loans):
+        start = time.perf_counter()
+        result = function(loans)
+        return result, time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        loans = self.build_loans(options['loans'], options['months'], options['seed'])
+
+        loop_payments, loop_seconds = self.timed(self.run_loop, loans)
+        engine_payments, engine_seconds = self.timed(self.run_engine, loans)
+
+        # The loop leaves rounding to the DecimalField on save, so compare the values as they would be stored
+        fields = ('installment_number', 'amount', 'interest_paid', 'principal_paid', 'remaining_principal')
+        mismatches = sum(
+            1 for expected, actual in zip(loop_payments, engine_payments)
+            if any(
+                round_to_cent(Decimal(getattr(expected, field))) != round_to_cent(Decimal(getattr(actual, field)))
+                for field in fields
+            )
+        )
+
+        self.stdout.write(f'Loans: {len(loans)}, installments: {len(engine_payments)}')
+        self.stdout.write(f'Per-installment loop: {loop_seconds:.3f}s')
+        self.stdout.write(f'Schedule engine:      {engine_seconds:.3f}s ({loop_seconds / engine_seconds:.2f}x)')
+        if mismatches or len(loop_payments) != len(engine_payments):
+            self.stderr.write(self.style.ERROR(f'[-] {mismatches} installment(s) differ from the original loop.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('[+] Schedules match the original loop.'))
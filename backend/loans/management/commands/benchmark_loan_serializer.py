@@ -0,0 +1,96 @@
+import random
+import time
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from authentication.models import User, UserRole, LoanProvider, LoanCustomer, ApplicantStatus
+from authentication.serializers import LoanProviderSubSerializer, LoanCustomerSubSerializer
+from loans.models import LoanPlan, Loan, LoanStatus
+from loans.serializers import LoanPlanSerializer, LoanSerializer
+
+
+def legacy_data(serializer_class, instance, context):
+    # What serializer.data used to do: a fresh serializer, and its fields, for every object
+    serializer = serializer_class(instance, context=context)
+    return serializers.Serializer.to_representation(serializer, instance)
+
+
+class LegacyLoanSerializer(LoanSerializer):
+    # Verbatim port of LoanSerializer.to_representation before the compiled read path
+
+    def to_representation(self, instance):
+        data = serializers.Serializer.to_representation(self, instance)
+        data['plan'] = legacy_data(LoanPlanSerializer, instance.plan, self.context)
+        if self.context['request'].user.role in [UserRole.LOAN_PROVIDER.value, UserRole.BANK_PERSONNEL.value]:
+            data['customer'] = legacy_data(LoanCustomerSubSerializer, instance.customer, self.context)
+        if self.context['request'].user.role in [UserRole.LOAN_CUSTOMER.value, UserRole.BANK_PERSONNEL.value]:
+            data['provider'] = legacy_data(LoanProviderSubSerializer, instance.provider, self.context)
+        return data
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the per-row cost of the Loan list representation against the original per-row serializers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows per page')
+        parser.add_argument('--pages', type=int, default=50, help='Number of pages to serialize')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated loans')
+
+    def build_loans(self, count, seed):
+        # Unsaved instances with their relations already cached, so only serialization is measured
+        rng = random.Random(seed)
+        now = timezone.now()
+        bank_id = uuid.uuid4()
+        plans = [
+            LoanPlan(id=uuid.uuid4(), bank_id=bank_id, annual_interest_rate=Decimal(rate), minimum_amount=Decimal('1000.00'),
+                     maximum_amount=Decimal('1000000.00'), duration_in_months=months)
+            for rate in ('3.50', '12.00') for months in (12, 60)
+        ]
+        providers = [
+            LoanProvider(id=uuid.uuid4(), user_id=uuid.uuid4(), bank_id=bank_id, name_en=f'Provider {i}', name_ar=f'Provider {i}',
+                         total_funds=Decimal('1000000.00'), registration_number=str(i), vat_number=str(i),
+                         status=ApplicantStatus.APPROVED.value)
+            for i in range(5)
+        ]
+        customers = [
+            LoanCustomer(id=uuid.uuid4(), user_id=uuid.uuid4(), bank_id=bank_id, ssn=str(i), credit_score=700,
+                         monthly_income=Decimal('5000.00'), status=ApplicantStatus.APPROVED.value)
+            for i in range(20)
+        ]
+        return [
+            Loan(
+                id=uuid.uuid4(), purpose='Car', amount=Decimal(rng.randrange(100000, 100000000)) / 100,
+                plan=rng.choice(plans), provider=rng.choice(providers), customer=rng.choice(customers),
+                bank_id=bank_id, status=LoanStatus.DISBURSED.value, total_payable_amount=Decimal('12000.00'),
+                monthly_payable_amount=Decimal('1000.00'), approved_at=now, released_at=now, disbursed_at=now,
+            )
+            for _ in range(count)
+        ]
+
+    def timed(self, serializer_class, loans, context, pages):
+        start = time.perf_counter()
+        for _ in range(pages):
+            data = serializer_class(loans, many=True, context=context).data
+        return JSONRenderer().render(data), time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        loans = self.build_loans(options['rows'], options['seed'])
+        request = APIRequestFactory().get('/api/v1/loans')
+        request.user = User(role=UserRole.BANK_PERSONNEL.value) # Sees both the customer and the provider
+        context = {'request': request}
+        rows = options['rows'] * options['pages']
+
+        legacy_json, legacy_seconds = self.timed(LegacyLoanSerializer, loans, context, options['pages'])
+        compiled_json, compiled_seconds = self.timed(LoanSerializer, loans, context, options['pages'])
+
+        self.stdout.write(f'Rows: {rows} ({options["pages"]} page(s) of {options["rows"]})')
+        self.stdout.write(f'Per-row serializers: {legacy_seconds * 1e6 / rows:.1f}us/row')
+        self.stdout.write(f'Compiled read path:  {compiled_seconds * 1e6 / rows:.1f}us/row ({legacy_seconds / compiled_seconds:.2f}x)')
+        if legacy_json != compiled_json:
+            self.stderr.write(self.style.ERROR('[-] The compiled representation differs from the original.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('[+] JSON output is byte-identical.'))
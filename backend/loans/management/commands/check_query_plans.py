@@ -0,0 +1,179 @@
+import json
+import random
+import re
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from authentication.models import User, UserRole, LoanProvider, LoanCustomer, ApplicantStatus
+from banks.models import Bank
+from loans.amortization import calculate_due_date
+from loans.models import LoanPlan, Loan, LoanPayment, LoanStatus
+from loans.partitions import DEFAULT_PARTITION, PARTITION_NAME, filter_loan_payments, get_partition_names, is_partitioned
+
+HOT_TABLES = {model._meta.db_table for model in (Loan, LoanPayment, LoanPlan, LoanProvider, LoanCustomer)}
+PRUNED_QUERIES = ('next payment', 'amortization schedule', 'repayment lookup') # Per loan, must not read every partition
+
+
+class SeededRollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a large dataset and fail if a hot query is planned as a sequential scan (PostgreSQL or SQLite), '
+        'or if a per loan query reads every partition of LoanPayment (partitioned PostgreSQL)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--banks', type=int, default=20, help='Number of seeded banks')
+        parser.add_argument('--loans', type=int, default=20000, help='Number of seeded loans')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the seeded data')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded data instead of rolling it back')
+
+    def seed(self, banks_count, loans_count, seed):
+        rng = random.Random(seed)
+        now = timezone.now()
+        banks = Bank.objects.bulk_create([
+            Bank(name_en=f'Bank {i}', name_ar=f'Bank {i}', created_at=now) for i in range(banks_count)
+        ])
+        plans, providers, customers = [], [], []
+        for bank in banks:
+            plans += [
+                LoanPlan(bank=bank, annual_interest_rate=Decimal(rate), minimum_amount=Decimal('1000.00'),
+                         maximum_amount=Decimal('1000000.00'), duration_in_months=12, created_at=now)
+                for rate in ('5.00', '10.00', '15.00')
+            ]
+            for role, applicants, count in ((UserRole.LOAN_PROVIDER.value, providers, 10), (UserRole.LOAN_CUSTOMER.value, customers, 50)):
+                users = User.objects.bulk_create([
+                    User(username=uuid.uuid4().hex[:30], email=f'{i}@example.com', role=role, created_at=now)
+                    for i in range(count)
+                ])
+                for user in users:
+                    status = rng.choice(ApplicantStatus.values)
+                    if role == UserRole.LOAN_PROVIDER.value:
+                        applicants.append(LoanProvider(
+                            user=user, bank=bank, status=status, name_en='Provider', name_ar='Provider',
+                            total_funds=Decimal('1000000.00'), registration_number='1', vat_number='1', created_at=now,
+                        ))
+                    else:
+                        applicants.append(LoanCustomer(
+                            user=user, bank=bank, status=status, ssn=uuid.uuid4().hex[:20], credit_score=700,
+                            monthly_income=Decimal('5000.00'), created_at=now,
+                        ))
+        LoanPlan.objects.bulk_create(plans, batch_size=1000)
+        LoanProvider.objects.bulk_create(providers, batch_size=1000)
+        LoanCustomer.objects.bulk_create(customers, batch_size=1000)
+
+        plans_by_bank, providers_by_bank, customers_by_bank = {}, {}, {}
+        for rows, by_bank in ((plans, plans_by_bank), (providers, providers_by_bank), (customers, customers_by_bank)):
+            for row in rows:
+                by_bank.setdefault(row.bank_id, []).append(row)
+
+        loans = []
+        for i in range(loans_count):
+            bank = rng.choice(banks)
+            loans.append(Loan(
+                purpose='Seeded', amount=Decimal('12000.00'), plan=rng.choice(plans_by_bank[bank.pk]),
+                provider=rng.choice(providers_by_bank[bank.pk]), customer=rng.choice(customers_by_bank[bank.pk]),
+                bank=bank, status=rng.choice(LoanStatus.values), total_payable_amount=Decimal('12794.23'),
+                monthly_payable_amount=Decimal('1066.19'), created_at=now - timezone.timedelta(minutes=i),
+                approved_at=now - timezone.timedelta(days=rng.randrange(365)),
+            ))
+        Loan.objects.bulk_create(loans, batch_size=2000)
+
+        payments = [
+            LoanPayment(
+                loan=loan, installment_number=month, amount=loan.monthly_payable_amount, created_at=now,
+                due_date=calculate_due_date(loan.approved_at, month), is_paid=month <= rng.randrange(13),
+            )
+            for loan in loans if loan.status == LoanStatus.DISBURSED.value
+            for month in range(1, 13)
+        ]
+        LoanPayment.objects.bulk_create(payments, batch_size=5000)
+
+        with connection.cursor() as cursor: # Fresh statistics, otherwise the planner still sees empty tables
+            cursor.execute('ANALYZE')
+        disbursed_loan = next(loan for loan in reversed(loans) if loan.status == LoanStatus.DISBURSED.value)
+        return banks[0], providers_by_bank[banks[0].pk][0], customers_by_bank[banks[0].pk][0], disbursed_loan
+
+    def get_hot_queries(self, bank, provider, customer, loan):
+        # Mirrors the get_queryset of the views the requests actually go through
+        live_loans = Loan.objects.filter(bank_id=bank.pk)
+        installments = filter_loan_payments(LoanPayment.objects.all(), [loan])
+        return {
+            'loan applications (bank personnel)': live_loans.filter(Q(status=LoanStatus.PENDING.value) | Q(status=LoanStatus.RELEASED.value)),
+            'loan applications (provider)': live_loans.filter(provider_id=provider.pk, status=LoanStatus.APPROVED.value),
+            'loans (provider)': live_loans.filter(provider_id=provider.pk),
+            'loans (customer)': live_loans.filter(customer_id=customer.pk),
+            'loans (cursor page)': live_loans.order_by('-created_at', '-id')[:10],
+            'loan plans': LoanPlan.objects.filter(bank_id=bank.pk),
+            'next payment': installments.filter(is_paid=False, paid_at__isnull=True).order_by('installment_number')[:1],
+            'amortization schedule': installments.order_by('installment_number'),
+            'repayment lookup': installments.filter(installment_number__in=[1, 2]),
+            'provider applications': LoanProvider.objects.filter(bank_id=bank.pk, status=ApplicantStatus.PENDING.value),
+            'customer applications': LoanCustomer.objects.filter(bank_id=bank.pk, status=ApplicantStatus.PENDING.value),
+        }
+
+    def iter_plan_nodes(self, queryset):
+        nodes = [json.loads(queryset.explain(format='json'))[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            yield node
+            nodes.extend(node.get('Plans', []))
+
+    def is_partition(self, relation):
+        return relation == DEFAULT_PARTITION or PARTITION_NAME.match(relation or '') is not None
+
+    def find_sequential_scans(self, queryset):
+        if connection.vendor == 'postgresql':
+            scans = []
+            for node in self.iter_plan_nodes(queryset):
+                relation = node.get('Relation Name')
+                if self.is_partition(relation): # LoanPayment's partitions
+                    relation = LoanPayment._meta.db_table
+                if node['Node Type'] == 'Seq Scan' and relation in HOT_TABLES:
+                    scans.append(node['Relation Name'])
+            return scans
+        # SQLite: "SEARCH <table>" is an index lookup, "SCAN <table>" reads all of it (or all of one of its indexes)
+        return [match.group(1) for match in re.finditer(r'\bSCAN (\w+)', queryset.explain()) if match.group(1) in HOT_TABLES]
+
+    def find_scanned_partitions(self, queryset):
+        # LoanPayment's partitions left in the plan once pruned, PostgreSQL only
+        return sorted({node['Relation Name'] for node in self.iter_plan_nodes(queryset) if self.is_partition(node.get('Relation Name'))})
+
+    def check_pruning(self, queryset, partitions_count):
+        # Returns whether the query reads fewer partitions than there are, printing the ones it reads
+        partitions = self.find_scanned_partitions(queryset)
+        self.stdout.write(f'    {len(partitions)} of {partitions_count} partition(s): {", ".join(partitions) or "none"}')
+        return partitions_count <= 1 or len(partitions) < partitions_count
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(f'Query plans can not be checked on {connection.vendor}')
+
+        failures = []
+        try:
+            with transaction.atomic():
+                hot_rows = self.seed(options['banks'], options['loans'], options['seed'])
+                with connection.cursor() as cursor:
+                    partitions_count = len(get_partition_names(cursor)) if is_partitioned(cursor) else 0
+                for name, queryset in self.get_hot_queries(*hot_rows).items():
+                    scans = self.find_sequential_scans(queryset)
+                    if scans:
+                        failures.append(name)
+                        self.stderr.write(self.style.ERROR(f'[-] {name}: sequential scan on {", ".join(scans)}'))
+                    else:
+                        self.stdout.write(self.style.SUCCESS(f'[+] {name}: index scan'))
+                    if partitions_count and name in PRUNED_QUERIES and not self.check_pruning(queryset, partitions_count):
+                        failures.append(name)
+                        self.stderr.write(self.style.ERROR(f'[-] {name}: no partition pruned'))
+                if not options['keep']:
+                    raise SeededRollback
+        except SeededRollback:
+            pass
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot query(ies) fell back to a sequential scan or read every partition')
@@ -0,0 +1,39 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+from rest_framework.exceptions import ValidationError
+from core.exports import ExportFormat, iter_export
+from loans.exports import EXPORTS, get_export_queryset
+
+
+class Command(BaseCommand):
+    help = 'Stream the loans, payments, providers or customers of a bank to CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=list(EXPORTS), help='What to export')
+        parser.add_argument('--bank', required=True, help='Bank id')
+        parser.add_argument('--format', choices=ExportFormat.choices, default=ExportFormat.CSV)
+        parser.add_argument('--filter', action='append', default=[], help='FilterSet parameter as key=value, e.g. status=disbursed (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows fetched per round trip')
+        parser.add_argument('--output', default=None, help='Output file, stdout when omitted')
+
+    def handle(self, *args, **options):
+        params = QueryDict(mutable=True)
+        for expression in options['filter']:
+            key, separator, value = expression.partition('=')
+            if not separator:
+                raise CommandError(f'Invalid filter: {expression}')
+            params.appendlist(key, value)
+
+        spec = EXPORTS[options['name']]
+        try:
+            queryset = get_export_queryset(spec, options['bank'], params)
+        except ValidationError as exception:
+            raise CommandError(exception.detail)
+        output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        try:
+            for chunk in iter_export(queryset, spec.fields, options['format'], options['chunk_size']):
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
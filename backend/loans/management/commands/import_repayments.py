@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from loans.repayments import RepaymentFileFormat, RepaymentIngestor, read_repayment_rows
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Mark installments as paid from a CSV or NDJSON repayment file (loan, installment_number, paid_at)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the repayment file')
+        parser.add_argument('--format', dest='file_format', choices=RepaymentFileFormat.choices, help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows per transaction')
+        parser.add_argument('--bank', default=None, help='Only match installments of loans in this bank')
+        parser.add_argument('--user', default=None, help='Username recorded as updated_by on the paid installments')
+
+    def handle(self, *args, **options):
+        file_format = options['file_format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if file_format not in RepaymentFileFormat.choices:
+            raise CommandError('Unable to detect the repayment file format, use --format')
+
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'User "{options["user"]}" does not exist')
+
+        ingestor = RepaymentIngestor(user=user, bank_id=options['bank'], chunk_size=options['chunk_size'])
+        with open(options['path'], encoding='utf-8', newline='') as stream:
+            summary = ingestor.ingest(read_repayment_rows(stream, file_format))
+
+        for error in summary['errors']:
+            self.stderr.write(f'Row {error["row"]}: {error["detail"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'[+] Processed {summary["rows"]} row(s): {summary["paid"]} paid, {summary["skipped"]} skipped.'
+        ))
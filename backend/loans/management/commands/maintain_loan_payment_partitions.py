@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.dateparse import parse_date
+from loans.partitions import create_loan_payment_partitions, detach_loan_payment_partitions
+
+
+class Command(BaseCommand):
+    help = 'Create the LoanPayment partitions ahead of time and optionally detach the old ones (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=None, help='Months past the longest plan, defaults to LOAN_PAYMENT_PARTITIONS_AHEAD')
+        parser.add_argument('--detach-before', type=str, default=None, help='Detach the partitions ending on or before this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(f'[!] LoanPayment is not partitioned on {connection.vendor}.'))
+            return
+
+        created = create_loan_payment_partitions(options['months_ahead'])
+        self.stdout.write(self.style.SUCCESS(f'[+] Created {len(created)} partition(s).'))
+
+        if options['detach_before']:
+            before = parse_date(options['detach_before'])
+            if before is None:
+                raise CommandError('--detach-before must be a date (YYYY-MM-DD)')
+            detached = detach_loan_payment_partitions(datetime(before.year, before.month, before.day, tzinfo=timezone.utc))
+            self.stdout.write(self.style.SUCCESS(f'[+] Detached {len(detached)} partition(s): {", ".join(detached)}'))
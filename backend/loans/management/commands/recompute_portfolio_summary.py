@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from loans.portfolio import recompute_portfolio_summary
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the loan portfolio summaries from the loans and their paid installments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bank', action='append', default=None, help='Only recompute this bank (repeatable)')
+
+    def handle(self, *args, **options):
+        summaries = recompute_portfolio_summary(options['bank'])
+        self.stdout.write(self.style.SUCCESS(f'[+] Recomputed {len(summaries)} portfolio summary row(s).'))
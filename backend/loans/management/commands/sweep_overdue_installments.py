@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from loans.overdue import sweep_overdue_installments
+
+
+class Command(BaseCommand):
+    help = 'Mark the overdue installments and loans, and refresh their days past due'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bank', action='append', dest='banks', default=None, help='Only sweep this bank (repeatable)')
+
+    def handle(self, *args, **options):
+        summary = sweep_overdue_installments(options['banks'])
+        self.stdout.write(self.style.SUCCESS(
+            f'[+] Swept {summary["banks"]} bank(s) in {summary["duration"]}s: '
+            f'{summary["installments"]} installment(s) and {summary["loans"]} loan(s) overdue, '
+            f'{summary["cleared_installments"]} installment(s) and {summary["cleared_loans"]} loan(s) cleared.'
+        ))
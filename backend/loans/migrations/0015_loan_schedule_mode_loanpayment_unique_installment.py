@@ -0,0 +1,22 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0014_loan_rejected_at_loan_released_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loan',
+            name='schedule_mode',
+            field=models.CharField(choices=[('materialized', 'Materialized'), ('virtual', 'Virtual')], default='materialized', max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name='loanpayment',
+            constraint=models.UniqueConstraint(condition=models.Q(('deleted_at__isnull', True)), fields=('loan', 'installment_number'), name='loans_loanpayment_unique_installment'),
+        ),
+    ]
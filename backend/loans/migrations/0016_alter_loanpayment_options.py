@@ -0,0 +1,17 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:34
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0015_loan_schedule_mode_loanpayment_unique_installment'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='loanpayment',
+            options={'managed': True, 'permissions': [('can_pay_loan', 'Can pay loan'), ('can_import_repayments', 'Can import repayments'), ('can_view_amortization_schedule', 'Can view amortization schedule')]},
+        ),
+    ]
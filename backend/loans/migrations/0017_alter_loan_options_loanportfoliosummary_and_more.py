@@ -0,0 +1,67 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:42
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+import django.db.models.deletion
+
+
+def seed_portfolio_summary(apps, schema_editor):
+    # Same aggregation as loans.portfolio.recompute_portfolio_summary, on the historical models
+    Loan = apps.get_model('loans', 'Loan')
+    LoanPayment = apps.get_model('loans', 'LoanPayment')
+    LoanPortfolioSummary = apps.get_model('loans', 'LoanPortfolioSummary')
+
+    summaries = {
+        (row['bank_id'], row['status']): LoanPortfolioSummary(
+            bank_id=row['bank_id'], status=row['status'], loans_count=row['loans_count'],
+            total_amount=row['total_amount'], amortized_count=row['amortized_count'],
+            outstanding_principal=row['total_amount'] if row['status'] == 'disbursed' else 0,
+        )
+        for row in Loan.objects.filter(deleted_at__isnull=True).values('bank_id', 'status').annotate(
+            loans_count=Count('id'), total_amount=Sum('amount'), amortized_count=Count('id', filter=Q(is_amortized=True)),
+        ).order_by()
+    }
+    payments = LoanPayment.objects.filter(deleted_at__isnull=True, is_paid=True, loan__status='disbursed', loan__deleted_at__isnull=True)
+    for row in payments.values('loan__bank_id').annotate(
+        principal_paid=Sum('principal_paid'), interest_paid=Sum('interest_paid'),
+    ).order_by():
+        summary = summaries[(row['loan__bank_id'], 'disbursed')]
+        summary.outstanding_principal -= row['principal_paid'] or 0
+        summary.interest_earned += row['interest_paid'] or 0
+    LoanPortfolioSummary.objects.bulk_create(summaries.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banks', '0007_fundssnapshot_fundsledgerentry'),
+        ('loans', '0016_alter_loanpayment_options'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='loan',
+            options={'managed': True, 'permissions': [('can_approve_loan', 'Can approve loan'), ('can_release_loan', 'Can release loan'), ('can_disburse_loan', 'Can disburse loan'), ('can_reject_loan', 'Can reject loan'), ('can_view_portfolio_summary', 'Can view portfolio summary')]},
+        ),
+        migrations.CreateModel(
+            name='LoanPortfolioSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('released', 'Released'), ('disbursed', 'Disbursed'), ('rejected', 'Rejected')], max_length=20)),
+                ('loans_count', models.BigIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('amortized_count', models.BigIntegerField(default=0)),
+                ('outstanding_principal', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('interest_earned', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('bank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='portfolio_summaries', to='banks.bank')),
+            ],
+            options={
+                'managed': True,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='loanportfoliosummary',
+            constraint=models.UniqueConstraint(fields=('bank', 'status'), name='loans_loanportfoliosummary_unique_status'),
+        ),
+        migrations.RunPython(seed_portfolio_summary, migrations.RunPython.noop),
+    ]
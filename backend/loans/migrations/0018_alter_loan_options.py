@@ -0,0 +1,17 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:47
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0017_alter_loan_options_loanportfoliosummary_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='loan',
+            options={'managed': True, 'permissions': [('can_approve_loan', 'Can approve loan'), ('can_release_loan', 'Can release loan'), ('can_disburse_loan', 'Can disburse loan'), ('can_reject_loan', 'Can reject loan'), ('can_view_portfolio_summary', 'Can view portfolio summary'), ('can_export_data', 'Can export loans, payments and applicants')]},
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0018_alter_loan_options'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='loan',
+            name='loans_loan_plan_id_69d92b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='loan',
+            name='loans_loan_custome_53a43c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='loan',
+            name='loans_loan_id_e9d62c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='loan',
+            name='loans_loan_provide_c94afb_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='loan',
+            name='loans_loan_bank_id_665270_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='loanpayment',
+            name='loans_loanp_install_469b88_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='loanpayment',
+            name='loans_loanp_loan_id_db73f0_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='loanplan',
+            name='loans_loanp_id_3268dd_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='loanplan',
+            name='loans_loanp_bank_id_d95500_idx',
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['bank', 'status'], name='loans_loan_bank_status_live'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['bank', 'provider', 'status'], name='loans_loan_bank_provider_live'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['bank', 'customer'], name='loans_loan_bank_customer_live'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['bank', '-created_at', '-id'], name='loans_loan_bank_created_live'),
+        ),
+        migrations.AddIndex(
+            model_name='loanpayment',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True), ('is_paid', False)), fields=['loan', 'installment_number'], name='loans_loanpayment_unpaid'),
+        ),
+        migrations.AddIndex(
+            model_name='loanplan',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['bank'], name='loans_loanplan_bank_live'),
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banks', '0009_brancharchive_bankarchive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('authentication', '0015_userarchive_loanproviderarchive_loancustomerarchive_and_more'),
+        ('loans', '0019_remove_loan_loans_loan_plan_id_69d92b_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanPlanArchive',
+            fields=[
+                ('created_at', models.DateTimeField(verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(blank=True, null=True, verbose_name='Updated at')),
+                ('deleted_at', models.DateTimeField(blank=True, null=True, verbose_name='Deleted at')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('annual_interest_rate', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('minimum_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('maximum_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('duration_in_months', models.PositiveIntegerField(verbose_name='Duration in months')),
+                ('archived_at', models.DateTimeField(db_index=True, verbose_name='Archived at')),
+                ('bank', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='banks.bank', verbose_name='bank')),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+                ('deleted_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Deleted by')),
+                ('updated_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Updated by')),
+            ],
+            options={
+                'verbose_name': 'archived loan plan',
+                'verbose_name_plural': 'archived loan plans',
+                'db_table': 'loans_loanplan_archive',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='LoanPaymentArchive',
+            fields=[
+                ('created_at', models.DateTimeField(verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(blank=True, null=True, verbose_name='Updated at')),
+                ('deleted_at', models.DateTimeField(blank=True, null=True, verbose_name='Deleted at')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('installment_number', models.PositiveIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('due_date', models.DateTimeField()),
+                ('is_paid', models.BooleanField(default=False)),
+                ('paid_at', models.DateTimeField(blank=True, null=True)),
+                ('interest_paid', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('principal_paid', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('remaining_principal', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('archived_at', models.DateTimeField(db_index=True, verbose_name='Archived at')),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+                ('deleted_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Deleted by')),
+                ('loan', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='loans.loan', verbose_name='loan')),
+                ('updated_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Updated by')),
+            ],
+            options={
+                'verbose_name': 'archived loan payment',
+                'verbose_name_plural': 'archived loan payments',
+                'db_table': 'loans_loanpayment_archive',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='LoanArchive',
+            fields=[
+                ('created_at', models.DateTimeField(verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(blank=True, null=True, verbose_name='Updated at')),
+                ('deleted_at', models.DateTimeField(blank=True, null=True, verbose_name='Deleted at')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('purpose', models.CharField(max_length=255)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('released', 'Released'), ('disbursed', 'Disbursed'), ('rejected', 'Rejected')], default='pending', max_length=20)),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_amortized', models.BooleanField(default=False)),
+                ('schedule_mode', models.CharField(choices=[('materialized', 'Materialized'), ('virtual', 'Virtual')], default='materialized', max_length=20)),
+                ('total_payable_amount', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('monthly_payable_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('approved_at', models.DateTimeField(blank=True, null=True)),
+                ('released_at', models.DateTimeField(blank=True, null=True)),
+                ('disbursed_at', models.DateTimeField(blank=True, null=True)),
+                ('rejected_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(db_index=True, verbose_name='Archived at')),
+                ('bank', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='banks.bank', verbose_name='bank')),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+                ('customer', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='authentication.loancustomer', verbose_name='customer')),
+                ('deleted_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Deleted by')),
+                ('plan', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='loans.loanplan', verbose_name='plan')),
+                ('provider', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='authentication.loanprovider', verbose_name='provider')),
+                ('updated_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Updated by')),
+            ],
+            options={
+                'verbose_name': 'archived loan',
+                'verbose_name_plural': 'archived loans',
+                'db_table': 'loans_loan_archive',
+                'managed': True,
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0020_loanplanarchive_loanpaymentarchive_loanarchive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loanpayment',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True), ('is_paid', False)), fields=['due_date'], name='loans_loanpayment_due_unpaid'),
+        ),
+    ]
@@ -0,0 +1,102 @@
+import re
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Max
+from django.utils import timezone
+
+# A frozen copy of the conversion, on the historical models: loans.partitions follows the current
+# models and may change. The partitions created here are the ones of the rows and of the plans at the
+# time, create_loan_payment_partitions (Celery beat) keeps creating them afterwards.
+
+TABLE = 'loans_loanpayment'
+PARTITION_KEY = 'due_date'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def add_months(value, months):
+    year, month = divmod(value.month - 1 + months, 12)
+    return value.replace(year=value.year + year, month=month + 1)
+
+
+def get_period_start(value, months):
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month - (value.month - 1) % months, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_loan_payments(apps, schema_editor):
+    # PostgreSQL only, SQLite keeps the regular table. The primary key and unique indexes include
+    # due_date, as PostgreSQL requires for partitioned tables, an installment's due date never changes
+    # so (loan, installment_number) stays unique.
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    qn = connection.ops.quote_name
+    unpartitioned = f'{TABLE}_unpartitioned'
+    months = 3 if settings.LOAN_PAYMENT_PARTITION_INTERVAL == 'quarter' else 1
+    longest = apps.get_model('loans', 'LoanPlan').objects.aggregate(longest=Max('duration_in_months'))['longest'] or 0
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLE])
+        if cursor.fetchone() is not None:
+            return
+
+        cursor.execute("SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'", [TABLE])
+        foreign_keys = cursor.fetchall()
+        cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", [TABLE])
+        primary_key = cursor.fetchone()[0]
+        cursor.execute(
+            'SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+            'WHERE i.indrelid = %s::regclass AND NOT i.indisprimary',
+            [TABLE],
+        )
+        indexes = cursor.fetchall()
+
+        # Index names are schema wide, the old table's are dropped before they're created again
+        cursor.execute(f'ALTER TABLE {qn(TABLE)} RENAME TO {qn(unpartitioned)}')
+        cursor.execute(f'ALTER TABLE {qn(unpartitioned)} DROP CONSTRAINT {qn(primary_key)}')
+        for name, definition in indexes:
+            cursor.execute(f'DROP INDEX {qn(name)}')
+
+        cursor.execute(
+            f'CREATE TABLE {qn(TABLE)} (LIKE {qn(unpartitioned)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ({PARTITION_KEY})'
+        )
+        cursor.execute(f'ALTER TABLE {qn(TABLE)} ADD PRIMARY KEY (id, {PARTITION_KEY})')
+        cursor.execute(f'CREATE TABLE {qn(DEFAULT_PARTITION)} PARTITION OF {qn(TABLE)} DEFAULT')
+
+        # One partition per period from the oldest row to the last installment of the longest plan
+        cursor.execute(f'SELECT MIN({PARTITION_KEY}), MAX({PARTITION_KEY}) FROM {qn(unpartitioned)}')
+        first, last = cursor.fetchone()
+        now = timezone.now()
+        horizon = add_months(get_period_start(now, 1), longest + settings.LOAN_PAYMENT_PARTITIONS_AHEAD)
+        start, last = get_period_start(min(first or now, now), months), max(last or horizon, horizon)
+        while start <= last:
+            end = add_months(start, months)
+            cursor.execute(
+                f'CREATE TABLE {qn(f"{TABLE}_p{start:%Y_%m}")} PARTITION OF {qn(TABLE)} FOR VALUES FROM (%s) TO (%s)',
+                [start, end],
+            )
+            start = end
+
+        # Indexes and foreign keys are built once over the copied rows rather than maintained row by row
+        cursor.execute(f'INSERT INTO {qn(TABLE)} SELECT * FROM {qn(unpartitioned)}')
+        for name, definition in indexes:
+            if definition.startswith('CREATE UNIQUE'):
+                definition = re.sub(r'USING (\w+) \(([^)]*)\)', rf'USING \1 (\2, {PARTITION_KEY})', definition, count=1)
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(name)} {definition}')
+        cursor.execute(f'DROP TABLE {qn(unpartitioned)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0021_loanpayment_loans_loanpayment_due_unpaid'),
+    ]
+
+    operations = [
+        # The partitioned table works with the previous migrations' state as is, nothing to undo
+        migrations.RunPython(partition_loan_payments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0022_partition_loanpayment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loan',
+            name='days_past_due',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='is_overdue',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='loanarchive',
+            name='days_past_due',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loanarchive',
+            name='is_overdue',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='loanpayment',
+            name='days_past_due',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loanpayment',
+            name='is_overdue',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='loanpaymentarchive',
+            name='days_past_due',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loanpaymentarchive',
+            name='is_overdue',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='loanpayment',
+            index=models.Index(condition=models.Q(('is_overdue', True)), fields=['loan'], name='loans_loanpayment_overdue'),
+        ),
+    ]
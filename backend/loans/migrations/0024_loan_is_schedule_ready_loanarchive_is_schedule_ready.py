@@ -0,0 +1,30 @@
+# Generated by Django 4.2.2 on 2026-10-18 13:01
+
+from django.db import migrations, models
+
+
+def mark_disbursed_schedules_ready(apps, schema_editor):
+    # Loans disbursed so far had their schedule generated (or projected) with the disbursement
+    Loan = apps.get_model('loans', 'Loan')
+    Loan.objects.filter(status='disbursed').update(is_schedule_ready=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0023_loan_days_past_due_loan_is_overdue_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loan',
+            name='is_schedule_ready',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='loanarchive',
+            name='is_schedule_ready',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_disbursed_schedules_ready, migrations.RunPython.noop),
+    ]
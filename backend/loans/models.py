@@ -1,6 +1,6 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
-from core.models import BaseBankModel
+from core.models import BaseBankModel, create_archive_model
 
 
 class LoanPlan(BaseBankModel):
@@ -13,8 +13,7 @@ class LoanPlan(BaseBankModel):
     class Meta:
         managed = True
         indexes = [
-            models.Index(fields=['id']),
-            models.Index(fields=['bank']),
+            models.Index(fields=['bank'], name='loans_loanplan_bank_live', condition=models.Q(deleted_at__isnull=True)),
         ]
 
     def __str__(self) -> str:
@@ -29,6 +28,11 @@ class LoanStatus(models.TextChoices):
     REJECTED = ('rejected', _('Rejected'))
 
 
+class ScheduleMode(models.TextChoices):
+    MATERIALIZED = ('materialized', _('Materialized'))
+    VIRTUAL = ('virtual', _('Virtual'))
+
+
 class Loan(BaseBankModel):
     purpose = models.CharField(max_length=255)
     amount = models.DecimalField(max_digits=14, decimal_places=2)
@@ -39,6 +43,10 @@ class Loan(BaseBankModel):
     status = models.CharField(max_length=20, choices=LoanStatus.choices, default=LoanStatus.PENDING.value)
     is_active = models.BooleanField(default=True)
     is_amortized = models.BooleanField(default=False)
+    is_overdue = models.BooleanField(default=False) # Kept up to date by the overdue sweep (loans.overdue)
+    days_past_due = models.PositiveIntegerField(default=0)
+    schedule_mode = models.CharField(max_length=20, choices=ScheduleMode.choices, default=ScheduleMode.MATERIALIZED.value)
+    is_schedule_ready = models.BooleanField(default=False) # Installments generated, later than disbursement with LOAN_SCHEDULE_ASYNC
     total_payable_amount = models.DecimalField(max_digits=16, decimal_places=2)
     monthly_payable_amount = models.DecimalField(max_digits=12, decimal_places=2)
     approved_at = models.DateTimeField(null=True, blank=True)
@@ -48,18 +56,21 @@ class Loan(BaseBankModel):
 
     class Meta:
         managed = True
+        # Foreign keys are indexed on their own, these follow how the loans are actually read:
+        # applications by status, provider and customer views, and the newest first cursor pagination
         indexes = [
-            models.Index(fields=['id']),
-            models.Index(fields=['plan']),
-            models.Index(fields=['customer']),
-            models.Index(fields=['provider']),
-            models.Index(fields=['bank']),
+            models.Index(fields=['bank', 'status'], name='loans_loan_bank_status_live', condition=models.Q(deleted_at__isnull=True)),
+            models.Index(fields=['bank', 'provider', 'status'], name='loans_loan_bank_provider_live', condition=models.Q(deleted_at__isnull=True)),
+            models.Index(fields=['bank', 'customer'], name='loans_loan_bank_customer_live', condition=models.Q(deleted_at__isnull=True)),
+            models.Index(fields=['bank', '-created_at', '-id'], name='loans_loan_bank_created_live', condition=models.Q(deleted_at__isnull=True)),
         ]
         permissions = [
             ('can_approve_loan', 'Can approve loan'),
             ('can_release_loan', 'Can release loan'),
             ('can_disburse_loan', 'Can disburse loan'),
             ('can_reject_loan', 'Can reject loan'),
+            ('can_view_portfolio_summary', 'Can view portfolio summary'),
+            ('can_export_data', 'Can export loans, payments and applicants'),
         ]
 
     def __str__(self) -> str:
@@ -76,17 +87,63 @@ class LoanPayment(BaseBankModel): # AKA Installment, or Amortization
     interest_paid = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     principal_paid = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     remaining_principal = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    is_overdue = models.BooleanField(default=False) # Unpaid past its due date as of the last overdue sweep
+    days_past_due = models.PositiveIntegerField(default=0) # Kept once paid, how late the installment was
 
     class Meta:
         managed = True
+        # (loan, installment_number) is covered by the unique constraint, next_payment only scans unpaid rows.
+        # On PostgreSQL the table is partitioned by due_date (loans.partitions), every index exists per partition.
         indexes = [
-            models.Index(fields=['installment_number']),
-            models.Index(fields=['loan']),
+            models.Index(
+                fields=['loan', 'installment_number'], name='loans_loanpayment_unpaid',
+                condition=models.Q(is_paid=False, deleted_at__isnull=True),
+            ),
+            models.Index(
+                fields=['due_date'], name='loans_loanpayment_due_unpaid',
+                condition=models.Q(is_paid=False, deleted_at__isnull=True),
+            ),
+            models.Index(fields=['loan'], name='loans_loanpayment_overdue', condition=models.Q(is_overdue=True)),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['loan', 'installment_number'], condition=models.Q(deleted_at__isnull=True),
+                name='loans_loanpayment_unique_installment',
+            ),
         ]
         permissions = [
             ('can_pay_loan', 'Can pay loan'),
+            ('can_import_repayments', 'Can import repayments'),
             ('can_view_amortization_schedule', 'Can view amortization schedule'),
         ]
 
     def __str__(self) -> str:
         return f'{self.loan} ({self.amount})'
+
+
+class LoanPortfolioSummary(models.Model):
+    # Running totals of a bank's loans in one status, kept up to date by loans.portfolio on every
+    # status change and payment, so dashboards read a handful of rows instead of the whole book.
+    # Payment figures only move on the disbursed row. Rebuilt by recompute_portfolio_summary.
+    bank = models.ForeignKey('banks.Bank', on_delete=models.CASCADE, related_name='portfolio_summaries')
+    status = models.CharField(max_length=20, choices=LoanStatus.choices)
+    loans_count = models.BigIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    amortized_count = models.BigIntegerField(default=0)
+    outstanding_principal = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    interest_earned = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        managed = True
+        constraints = [
+            models.UniqueConstraint(fields=['bank', 'status'], name='loans_loanportfoliosummary_unique_status'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.bank} ({self.status})'
+
+
+# Mirror tables of the soft deleted rows moved out by archive_deleted_rows
+LoanPlanArchive = create_archive_model(LoanPlan)
+LoanArchive = create_archive_model(Loan)
+LoanPaymentArchive = create_archive_model(LoanPayment)
@@ -0,0 +1,93 @@
+import logging
+import time
+from django.db import transaction
+from django.db.models import Case, Count, DateTimeField, F, Func, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from core.versions import bump_versions
+from banks.models import Bank
+from loans.models import Loan, LoanPayment, LoanStatus, ScheduleMode
+
+logger = logging.getLogger(__name__)
+
+
+class DaysBetween(Func):
+    # Whole days from the second datetime to the first, computed by the database
+    arg_joiner = ' - '
+    template = 'FLOOR(EXTRACT(EPOCH FROM (%(expressions)s)) / 86400)::integer'
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, template='CAST(julianday(%(expressions)s) AS INTEGER)', arg_joiner=') - julianday(',
+            **extra_context
+        )
+
+
+def get_loan_days_past_due(now):
+    # Days since the oldest unpaid installment fell due, negative (or null) while it hasn't.
+    # Virtual schedules only store paid installments, the first unpaid one follows the paid ones.
+    # Installments fall due after the approval, which prunes the older partitions at run time.
+    installments = LoanPayment.objects.filter(loan_id=OuterRef('pk'), due_date__gt=OuterRef('approved_at'))
+    first_unpaid_due_date = Subquery(
+        installments.filter(is_paid=False).order_by('installment_number').values('due_date')[:1]
+    )
+    paid_installments = Coalesce(Subquery(
+        installments.filter(is_paid=True)
+        .values('loan_id').annotate(paid=Count('pk')).values('paid')
+    ), 0)
+    return Case(
+        When(schedule_mode=ScheduleMode.VIRTUAL.value, then=DaysBetween(now, 'approved_at') - (paid_installments + 1) * 30),
+        default=DaysBetween(now, first_unpaid_due_date),
+        output_field=IntegerField(),
+    )
+
+
+def sweep_bank_overdue(bank_id, now):
+    # A handful of UPDATE statements for the whole bank, rows never come back to Python. Unchanged rows
+    # are left alone, so the counts are the rows actually touched.
+    now = Value(now, output_field=DateTimeField())
+    installment_days = DaysBetween(now, 'due_date')
+    loan_days = get_loan_days_past_due(now)
+    disbursed_loans = Loan.objects.filter(bank_id=bank_id, status=LoanStatus.DISBURSED.value).values('pk')
+
+    with transaction.atomic():
+        # Driven by the partial index on unpaid due dates (and on PostgreSQL pruned to the past partitions)
+        installments = LoanPayment.objects.filter(
+            loan_id__in=disbursed_loans, is_paid=False, due_date__lt=now,
+        ).exclude(is_overdue=True, days_past_due=installment_days).update(is_overdue=True, days_past_due=installment_days)
+        # Paid since the last sweep, days_past_due keeps how late they were. Flagged ones were due before it,
+        # so the future partitions are pruned too.
+        cleared_installments = LoanPayment.objects.filter(
+            loan_id__in=Loan.objects.filter(bank_id=bank_id).values('pk'), is_overdue=True, is_paid=True, due_date__lt=now,
+        ).update(is_overdue=False)
+
+        loans = Loan.objects.filter(bank_id=bank_id).alias(days=loan_days)
+        overdue_loans = loans.filter(status=LoanStatus.DISBURSED.value, is_amortized=False, days__gte=0).exclude(
+            is_overdue=True, days_past_due=F('days'),
+        ).update(is_overdue=True, days_past_due=loan_days)
+        cleared_loans = loans.filter(is_overdue=True).filter(
+            Q(days__lt=0) | Q(days__isnull=True) | Q(is_amortized=True) | ~Q(status=LoanStatus.DISBURSED.value)
+        ).update(is_overdue=False, days_past_due=0)
+
+    return {
+        'installments': installments, 'cleared_installments': cleared_installments,
+        'loans': overdue_loans, 'cleared_loans': cleared_loans,
+    }
+
+
+def sweep_overdue_installments(bank_ids=None):
+    started = time.monotonic()
+    now = timezone.now()
+    summary = {'banks': 0, 'installments': 0, 'cleared_installments': 0, 'loans': 0, 'cleared_loans': 0}
+
+    # One transaction per bank, so a sweep never holds locks over the whole book
+    for bank_id in list(bank_ids or Bank.objects.values_list('pk', flat=True)):
+        for key, count in sweep_bank_overdue(bank_id, now).items():
+            summary[key] += count
+        summary['banks'] += 1
+
+    bump_versions(LoanPayment) # Every swept schedule, without tracking which ones changed
+    summary['duration'] = round(time.monotonic() - started, 3)
+    logger.info('Overdue sweep took %ss: %s', summary['duration'], summary)
+    return summary
@@ -0,0 +1,145 @@
+import re
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from loans.amortization import get_due_date_range
+from loans.models import LoanPayment, LoanPlan
+
+# LoanPayment is range partitioned by due_date on PostgreSQL, one partition per month or quarter,
+# plus a default partition catching rows no partition was created for yet. Every index of the
+# parent exists on each partition, so old partitions can be detached without touching the others.
+# Elsewhere (SQLite) the table stays a regular one and everything here is a no-op. The table is
+# converted by migration 0022, partitions are then created ahead by the Celery beat task.
+
+TABLE = LoanPayment._meta.db_table
+PARTITION_KEY = 'due_date'
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_NAME = re.compile(rf'^{TABLE}_p(\d{{4}})_(\d{{2}})$')
+
+
+class PartitionInterval:
+    MONTH = 'month'
+    QUARTER = 'quarter'
+    choices = (MONTH, QUARTER)
+
+
+def get_interval_months(interval=None):
+    return 3 if (interval or settings.LOAN_PAYMENT_PARTITION_INTERVAL) == PartitionInterval.QUARTER else 1
+
+
+def add_months(value, months):
+    year, month = divmod(value.month - 1 + months, 12)
+    return value.replace(year=value.year + year, month=month + 1)
+
+
+def get_period_start(value, interval=None):
+    # Bounds are in UTC, like the stored due dates
+    value = value.astimezone(dt_timezone.utc)
+    months = get_interval_months(interval)
+    return datetime(value.year, value.month - (value.month - 1) % months, 1, tzinfo=dt_timezone.utc)
+
+
+def get_partition_name(start):
+    return f'{TABLE}_p{start:%Y_%m}'
+
+
+def get_due_date_bounds(loans):
+    # From the first installment of the earliest loan to the last one of the latest, None for loans never approved
+    ranges = [get_due_date_range(loan.approved_at, loan.plan.duration_in_months) for loan in loans if loan.approved_at]
+    if not ranges:
+        return None
+    return min(first for first, last in ranges), max(last for first, last in ranges)
+
+
+def filter_loan_payments(queryset, loans):
+    # A filter on loan_id alone reads every partition, the due date bounds of the loans let PostgreSQL
+    # prune the others. Loans need their plan, approved_at and plan__duration_in_months at least.
+    queryset = queryset.filter(loan_id__in=[loan.pk for loan in loans])
+    bounds = get_due_date_bounds(loans)
+    if bounds is None:
+        return queryset
+    return queryset.filter(**{f'{PARTITION_KEY}__range': bounds})
+
+
+def is_partitioned(cursor):
+    if connection.vendor != 'postgresql':
+        return False
+    cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLE])
+    return cursor.fetchone() is not None
+
+
+def get_partition_names(cursor):
+    cursor.execute(
+        'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass',
+        [TABLE],
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def create_partition(cursor, start, end):
+    # Built aside and attached, so rows that already landed in the default partition for this
+    # range are moved in first (attaching fails otherwise). The parent's indexes and foreign keys
+    # are created on the new partition by ATTACH.
+    name, qn = get_partition_name(start), connection.ops.quote_name
+    cursor.execute(f'CREATE TABLE {qn(name)} (LIKE {qn(TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {qn(DEFAULT_PARTITION)} WHERE {PARTITION_KEY} >= %s AND {PARTITION_KEY} < %s RETURNING *) '
+        f'INSERT INTO {qn(name)} SELECT * FROM moved',
+        [start, end],
+    )
+    cursor.execute(f'ALTER TABLE {qn(TABLE)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)', [start, end])
+    return name
+
+
+def create_partitions(cursor, first, last, interval=None):
+    # One partition per period from the one holding first to the one holding last, existing ones are skipped
+    months = get_interval_months(interval)
+    existing = get_partition_names(cursor)
+    created = []
+    start = get_period_start(first, interval)
+    while start <= last:
+        end = add_months(start, months)
+        if get_partition_name(start) not in existing:
+            with transaction.atomic():
+                created.append(create_partition(cursor, start, end))
+        start = end
+    return created
+
+
+def get_partition_horizon(months_ahead=None):
+    # The longest plan disbursed today has its last installment that many months from now
+    months_ahead = settings.LOAN_PAYMENT_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+    longest = LoanPlan.objects.aggregate(longest=Max('duration_in_months'))['longest'] or 0
+    return add_months(get_period_start(timezone.now(), PartitionInterval.MONTH), longest + months_ahead)
+
+
+def create_loan_payment_partitions(months_ahead=None):
+    # Creates the partitions up to the horizon, and those of any rows stranded in the default partition
+    with connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            return []
+        qn = connection.ops.quote_name
+        cursor.execute(f'SELECT MIN({PARTITION_KEY}), MAX({PARTITION_KEY}) FROM {qn(DEFAULT_PARTITION)}')
+        stranded_first, stranded_last = cursor.fetchone()
+        created = []
+        if stranded_first is not None:
+            created += create_partitions(cursor, stranded_first, stranded_last)
+        created += create_partitions(cursor, timezone.now(), get_partition_horizon(months_ahead))
+        return created
+
+
+def detach_loan_payment_partitions(before):
+    # Detached partitions become regular tables, kept as they are, and their rows leave LoanPayment
+    months = get_interval_months()
+    detached = []
+    with connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            return detached
+        for name in sorted(get_partition_names(cursor)):
+            match = PARTITION_NAME.match(name)
+            if match and add_months(datetime(int(match[1]), int(match[2]), 1, tzinfo=dt_timezone.utc), months) <= before:
+                cursor.execute(f'ALTER TABLE {connection.ops.quote_name(TABLE)} DETACH PARTITION {connection.ops.quote_name(name)}')
+                detached.append(name)
+    return detached
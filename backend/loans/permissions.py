@@ -20,6 +20,10 @@ class DisburseLoanPermissions(BaseBankPermissions):
         return super().has_permission(request, view) and request.user.has_perm(f'{LoansConfig.name}.can_disburse_loan')
 
 
+class BulkDisburseLoanPermissions(DisburseLoanPermissions):
+    perms_map = {**DisburseLoanPermissions.perms_map, 'POST': []} # Disbursing does not require the add permission
+
+
 class RejectLoanPermissions(BaseBankPermissions):
     
     def has_permission(self, request, view):
@@ -36,3 +40,27 @@ class AmortizationSchedulePermissions(BaseBankPermissions):
     
     def has_permission(self, request, view):
         return super().has_permission(request, view) and request.user.has_perm(f'{LoansConfig.name}.can_view_amortization_schedule')
+
+
+class ImportRepaymentsPermissions(BaseBankPermissions):
+    perms_map = {**BaseBankPermissions.perms_map, 'POST': []} # Importing repayments does not require the add permission
+
+    def has_permission(self, request, view):
+        return super().has_permission(request, view) and request.user.has_perm(f'{LoansConfig.name}.can_import_repayments')
+
+
+class QuoteLoanPermissions(BaseBankPermissions):
+    perms_map = {**BaseBankPermissions.perms_map, 'POST': ['%(app_label)s.view_%(model_name)s']} # Quoting only reads the plans
+
+
+class PortfolioSummaryPermissions(BaseBankPermissions):
+    perms_map = {**BaseBankPermissions.perms_map, 'GET': []} # The summary table has no view permission of its own
+
+    def has_permission(self, request, view):
+        return super().has_permission(request, view) and request.user.has_perm(f'{LoansConfig.name}.can_view_portfolio_summary')
+
+
+class ExportPermissions(BaseBankPermissions):
+
+    def has_permission(self, request, view):
+        return super().has_permission(request, view) and request.user.has_perm(f'{LoansConfig.name}.can_export_data')
@@ -0,0 +1,102 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from loans.models import Loan, LoanPayment, LoanPortfolioSummary, LoanStatus
+
+SUMMARY_FIELDS = ('loans_count', 'total_amount', 'amortized_count', 'outstanding_principal', 'interest_earned')
+
+
+def add_to_portfolio(bank_id, status, **deltas):
+    # Deltas are signed, one UPDATE on the (bank, status) row, created on first use
+    changes = {field: F(field) + value for field, value in deltas.items() if value}
+    if not changes:
+        return
+    if not LoanPortfolioSummary.objects.filter(bank_id=bank_id, status=status).update(**changes):
+        LoanPortfolioSummary.objects.bulk_create([LoanPortfolioSummary(bank_id=bank_id, status=status)], ignore_conflicts=True)
+        LoanPortfolioSummary.objects.filter(bank_id=bank_id, status=status).update(**changes)
+
+
+def move_loans(bank_id, from_status, to_status, loans_count, total_amount):
+    with transaction.atomic():
+        add_to_portfolio(bank_id, from_status, loans_count=-loans_count, total_amount=-total_amount)
+        add_to_portfolio(bank_id, to_status, loans_count=loans_count, total_amount=total_amount)
+
+
+def disburse_loans_in_portfolio(instances):
+    # Disbursed loans start with their whole amount outstanding
+    totals = defaultdict(lambda: [0, Decimal(0)])
+    for instance in instances:
+        totals[instance.bank_id][0] += 1
+        totals[instance.bank_id][1] += instance.amount
+
+    with transaction.atomic():
+        for bank_id, (loans_count, total_amount) in totals.items():
+            move_loans(bank_id, LoanStatus.RELEASED.value, LoanStatus.DISBURSED.value, loans_count, total_amount)
+            add_to_portfolio(bank_id, LoanStatus.DISBURSED.value, outstanding_principal=total_amount)
+
+
+def record_payments_in_portfolio(payments, amortized_loans):
+    # payments are paid installments, amortized_loans the loans they paid off
+    totals = defaultdict(lambda: dict.fromkeys(('amortized_count', 'outstanding_principal', 'interest_earned'), 0))
+    for payment in payments:
+        totals[payment.loan.bank_id]['outstanding_principal'] -= payment.principal_paid
+        totals[payment.loan.bank_id]['interest_earned'] += payment.interest_paid
+    for loan in amortized_loans:
+        totals[loan.bank_id]['amortized_count'] += 1
+
+    with transaction.atomic():
+        for bank_id, deltas in totals.items():
+            add_to_portfolio(bank_id, LoanStatus.DISBURSED.value, **deltas)
+
+
+def get_portfolio_summary(bank_id):
+    # At most one row per status, whatever the size of the portfolio
+    rows = {row.status: row for row in LoanPortfolioSummary.objects.filter(bank_id=bank_id)}
+    empty = LoanPortfolioSummary(total_amount=Decimal(0), outstanding_principal=Decimal(0), interest_earned=Decimal(0))
+    by_status = {
+        status: {'loans_count': rows.get(status, empty).loans_count, 'total_amount': rows.get(status, empty).total_amount}
+        for status in LoanStatus.values
+    }
+    disbursed = rows.get(LoanStatus.DISBURSED.value, empty)
+    return {
+        'by_status': by_status,
+        'outstanding_principal': disbursed.outstanding_principal,
+        'interest_earned': disbursed.interest_earned,
+        'active_count': disbursed.loans_count - disbursed.amortized_count,
+        'amortized_count': disbursed.amortized_count,
+    }
+
+
+def recompute_portfolio_summary(bank_ids=None):
+    # Full rebuild from the loans and their paid installments, for repairing drifted totals
+    loans = Loan.objects.all()
+    payments = LoanPayment.objects.filter(is_paid=True, loan__status=LoanStatus.DISBURSED.value, loan__deleted_at__isnull=True)
+    if bank_ids is not None:
+        loans = loans.filter(bank_id__in=bank_ids)
+        payments = payments.filter(loan__bank_id__in=bank_ids)
+
+    summaries = {
+        (row['bank_id'], row['status']): LoanPortfolioSummary(
+            bank_id=row['bank_id'], status=row['status'], loans_count=row['loans_count'],
+            total_amount=row['total_amount'], amortized_count=row['amortized_count'],
+            outstanding_principal=row['total_amount'] if row['status'] == LoanStatus.DISBURSED.value else 0,
+        )
+        for row in loans.values('bank_id', 'status').annotate(
+            loans_count=Count('id'), total_amount=Sum('amount'), amortized_count=Count('id', filter=Q(is_amortized=True)),
+        ).order_by()
+    }
+    for row in payments.values('loan__bank_id').annotate(
+        principal_paid=Sum('principal_paid'), interest_paid=Sum('interest_paid'),
+    ).order_by():
+        summary = summaries[(row['loan__bank_id'], LoanStatus.DISBURSED.value)]
+        summary.outstanding_principal -= row['principal_paid'] or 0
+        summary.interest_earned += row['interest_paid'] or 0
+
+    with transaction.atomic():
+        existing = LoanPortfolioSummary.objects.all()
+        if bank_ids is not None:
+            existing = existing.filter(bank_id__in=bank_ids)
+        existing.delete()
+        LoanPortfolioSummary.objects.bulk_create(summaries.values())
+    return list(summaries.values())
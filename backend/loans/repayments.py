@@ -0,0 +1,210 @@
+import csv
+import json
+import uuid
+from collections import defaultdict
+from itertools import islice
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from banks.funds import apply_funds_movements
+from banks.models import FundsMovement, FundsLedgerEntry
+from loans.models import Loan, LoanPayment, LoanStatus, ScheduleMode
+from loans.partitions import filter_loan_payments
+from loans.schedules import VirtualSchedule
+from loans.amortization import bump_schedule_versions
+from loans.events import publish_payments
+from loans.portfolio import record_payments_in_portfolio
+
+
+class RepaymentFileFormat:
+    CSV = 'csv'
+    NDJSON = 'ndjson'
+    choices = (CSV, NDJSON)
+
+
+def read_repayment_rows(stream, file_format):
+    # Yields one dict per line, the file is never loaded as a whole
+    if file_format == RepaymentFileFormat.CSV:
+        yield from csv.DictReader(stream)
+    elif file_format == RepaymentFileFormat.NDJSON:
+        for line in stream:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+    else:
+        raise ValueError(_('Unsupported repayment file format'))
+
+
+def get_repayment_entry(payment):
+    # Principal goes back out of the loan book, the installment amount into available funds
+    # and the interest into total funds
+    return FundsLedgerEntry(
+        movement=FundsMovement.REPAYMENT.value, bank_id=payment.loan.bank_id, loan_id=payment.loan_id,
+        total_loans=-payment.principal_paid, available_funds=payment.amount, total_funds=payment.interest_paid
+    )
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class RepaymentIngestor:
+    """
+    Marks installments as paid from a stream of repayment rows (loan, installment_number, paid_at).
+
+    Rows are processed in chunks, each chunk in its own transaction with a constant number of
+    queries: one lookup for the loans and one for their installments, one UPDATE per distinct
+    paid_at, one ledger INSERT, one Bank UPDATE and one portfolio summary UPDATE per bank, and
+    one Loan UPDATE for the loans the chunk fully amortizes.
+    """
+
+    def __init__(self, user=None, bank_id=None, chunk_size=None):
+        self.user = user
+        self.bank_id = bank_id
+        self.chunk_size = chunk_size or settings.LOAN_REPAYMENT_CHUNK_SIZE
+        self.summary = {'rows': 0, 'paid': 0, 'skipped': 0, 'errors': []}
+
+    def add_error(self, row_number, detail):
+        self.summary['skipped'] += 1
+        if len(self.summary['errors']) < settings.LOAN_REPAYMENT_MAX_REPORTED_ERRORS:
+            self.summary['errors'].append({'row': row_number, 'detail': detail})
+
+    def parse_row(self, row_number, row, now):
+        if not isinstance(row, dict):
+            self.add_error(row_number, _('Invalid repayment row'))
+            return None
+        try:
+            loan_id = uuid.UUID(str(row['loan']))
+            installment_number = int(row['installment_number'])
+            paid_at = parse_datetime(row['paid_at']) if row.get('paid_at') else now
+        except (KeyError, TypeError, ValueError):
+            self.add_error(row_number, _('Invalid repayment row'))
+            return None
+        if paid_at is None:
+            self.add_error(row_number, _('Invalid paid_at'))
+            return None
+        if timezone.is_naive(paid_at):
+            paid_at = timezone.make_aware(paid_at)
+        return (loan_id, installment_number), paid_at
+
+    def get_loans(self, keys):
+        # Only what bounds their installments' due dates, for the lookup below to skip the other partitions
+        return list(
+            Loan.objects.filter(pk__in={loan_id for loan_id, installment_number in keys})
+            .select_related('plan').only('pk', 'approved_at', 'plan__duration_in_months')
+        )
+
+    def get_payments(self, keys, loans):
+        queryset = filter_loan_payments(
+            LoanPayment.objects.filter(installment_number__in={installment_number for loan_id, installment_number in keys}),
+            loans,
+        )
+        if self.bank_id is not None:
+            queryset = queryset.filter(loan__bank_id=self.bank_id)
+        return {
+            (payment.loan_id, payment.installment_number): payment
+            for payment in queryset.select_related('loan__plan').select_for_update(of=('self',))
+            if (payment.loan_id, payment.installment_number) in keys
+        }
+
+    def lock_virtual_loans(self, keys):
+        # Projected installments get inserted: two imports, or an import and a /pay, projecting the same one
+        # would both insert it. Their loans are locked before the lookup, so the second one finds the row.
+        list(
+            Loan.objects.filter(pk__in={loan_id for loan_id, installment_number in keys}, schedule_mode=ScheduleMode.VIRTUAL.value)
+            .select_for_update().values_list('pk', flat=True)
+        )
+
+    def project_virtual_payments(self, keys):
+        # Loans in virtual schedule mode have no row for unpaid installments, project them instead
+        queryset = Loan.objects.filter(
+            pk__in={loan_id for loan_id, installment_number in keys},
+            schedule_mode=ScheduleMode.VIRTUAL.value, status=LoanStatus.DISBURSED.value,
+        )
+        if self.bank_id is not None:
+            queryset = queryset.filter(bank_id=self.bank_id)
+
+        installment_numbers = defaultdict(list)
+        for loan_id, installment_number in keys:
+            installment_numbers[loan_id].append(installment_number)
+
+        payments = {}
+        for loan in queryset.select_related('plan'):
+            numbers = [n for n in installment_numbers[loan.pk] if 1 <= n <= loan.plan.duration_in_months]
+            for payment in VirtualSchedule(loan, []).project(numbers):
+                payments[(loan.pk, payment.installment_number)] = payment
+        return payments
+
+    def ingest_chunk(self, chunk):
+        now = timezone.now()
+        rows = {}
+        for row_number, row in chunk:
+            parsed = self.parse_row(row_number, row, now)
+            if parsed is None:
+                continue
+            key, paid_at = parsed
+            if key in rows:
+                self.add_error(row_number, _('Duplicate repayment row'))
+                continue
+            rows[key] = (row_number, paid_at)
+
+        with transaction.atomic():
+            self.lock_virtual_loans(rows.keys())
+            payments = self.get_payments(rows.keys(), self.get_loans(rows.keys()))
+            missing = rows.keys() - payments.keys()
+            projected = self.project_virtual_payments(missing) if missing else {}
+
+            paid_at_groups = defaultdict(list)
+            entries = []
+            paid_payments = []
+            amortized_loans = []
+            new_payments = []
+
+            for key, (row_number, paid_at) in rows.items():
+                payment = payments.get(key) or projected.get(key)
+                if payment is None:
+                    self.add_error(row_number, _('Installment not found'))
+                    continue
+                if payment.is_paid:
+                    self.add_error(row_number, _('Payment already paid'))
+                    continue
+
+                if payment._state.adding:
+                    payment.is_paid, payment.paid_at = True, paid_at
+                    payment.updated_by, payment.updated_at = self.user, now
+                    new_payments.append(payment)
+                else:
+                    payment.is_paid, payment.paid_at = True, paid_at # Saved below, one UPDATE per paid_at
+                    paid_at_groups[paid_at].append(payment.pk)
+
+                entries.append(get_repayment_entry(payment))
+                paid_payments.append(payment)
+                if payment.installment_number == payment.loan.plan.duration_in_months:
+                    amortized_loans.append(payment.loan)
+                self.summary['paid'] += 1
+
+            for paid_at, payment_ids in paid_at_groups.items():
+                LoanPayment.objects.filter(pk__in=payment_ids, is_paid=False).update(
+                    is_paid=True, paid_at=paid_at, updated_by=self.user, updated_at=now
+                )
+            LoanPayment.objects.bulk_create(new_payments)
+
+            apply_funds_movements(entries)
+
+            if amortized_loans:
+                Loan.objects.filter(pk__in=[loan.pk for loan in amortized_loans]).update(is_active=False, is_amortized=True)
+            record_payments_in_portfolio(paid_payments, amortized_loans)
+            publish_payments(paid_payments, amortized_loans)
+            bump_schedule_versions([payment.loan_id for payment in paid_payments])
+
+    def ingest(self, rows):
+        for chunk in chunked(enumerate(rows, start=1), self.chunk_size):
+            self.summary['rows'] += len(chunk)
+            self.ingest_chunk(chunk)
+        return self.summary
@@ -0,0 +1,114 @@
+import operator
+import uuid
+from collections import namedtuple
+from django.core.validators import EMPTY_VALUES
+from django.utils import timezone
+from loans.amortization import calculate_monthly_interest_rate, calculate_due_date, iter_schedule
+from loans.models import LoanPayment
+
+
+LOOKUP_OPERATORS = {
+    'exact': operator.eq,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'lt': operator.lt,
+    'lte': operator.le,
+}
+
+PendingInstallment = namedtuple('PendingInstallment', ['installment_number', 'is_paid', 'paid_at'])
+
+
+def get_filterset_lookups(filterset):
+    # Turns a bound, valid FilterSet into (field_name, lookup_expr, value) triples,
+    # so the same query params can be applied to rows that don't live in the database
+    lookups = []
+    for name, value in filterset.form.cleaned_data.items():
+        if value in EMPTY_VALUES:
+            continue
+        schedule_filter = filterset.filters[name]
+        lookups.append((schedule_filter.field_name, schedule_filter.lookup_expr, value))
+    return lookups
+
+
+class VirtualSchedule:
+    """
+    Amortization schedule of a loan in virtual schedule mode.
+
+    Only payment events are stored as LoanPayment rows, every other installment is projected
+    from the loan amount, plan and approval date when it is read. Supports len() and slicing,
+    so it can be handed to the paginator in place of a queryset, and a page only computes
+    the installments up to its last row.
+    """
+
+    def __init__(self, loan, payments, lookups=()):
+        self.loan = loan
+        self.payments = {payment.installment_number: payment for payment in payments}
+        self.lookups = lookups
+        self._installment_numbers = None
+
+    def get_installment_id(self, installment_number):
+        return uuid.uuid5(self.loan.pk, str(installment_number))
+
+    def matches(self, row):
+        for field_name, lookup_expr, value in self.lookups:
+            attribute = getattr(row, field_name)
+            if attribute is None or not LOOKUP_OPERATORS[lookup_expr](attribute, value):
+                return False
+        return True
+
+    @property
+    def installment_numbers(self):
+        # Filtering only needs the payment events, amounts are left for the rows that end up in a page
+        if self._installment_numbers is None:
+            self._installment_numbers = [
+                installment_number
+                for installment_number in range(1, self.loan.plan.duration_in_months + 1)
+                if self.matches(
+                    self.payments.get(installment_number)
+                    or PendingInstallment(installment_number, False, None)
+                )
+            ]
+        return self._installment_numbers
+
+    def project(self, installment_numbers):
+        wanted = set(installment_numbers) - set(self.payments)
+        projected = {}
+        if wanted:
+            now = timezone.now() # Projected rows are overdue as of now, stored ones as of the last sweep
+            monthly_interest_rate = calculate_monthly_interest_rate(self.loan.plan.annual_interest_rate)
+            for installment in iter_schedule(
+                self.loan.amount, monthly_interest_rate, self.loan.plan.duration_in_months,
+                self.loan.monthly_payable_amount, stop=max(wanted)
+            ):
+                if installment.installment_number in wanted:
+                    due_date = calculate_due_date(self.loan.approved_at, installment.installment_number)
+                    projected[installment.installment_number] = LoanPayment(
+                        id=self.get_installment_id(installment.installment_number),
+                        created_at=self.loan.disbursed_at, loan=self.loan,
+                        installment_number=installment.installment_number, amount=installment.amount,
+                        due_date=due_date, is_overdue=due_date < now, days_past_due=max((now - due_date).days, 0),
+                        interest_paid=installment.interest_paid, principal_paid=installment.principal_paid,
+                        remaining_principal=installment.remaining_principal,
+                    )
+        return [self.payments.get(number) or projected[number] for number in installment_numbers]
+
+    def get(self, pk):
+        try:
+            pk = uuid.UUID(str(pk))
+        except ValueError:
+            return None
+        for installment_number in self.installment_numbers:
+            if self.get_installment_id(installment_number) == pk:
+                return self.project([installment_number])[0]
+        return None
+
+    def first(self):
+        return self[0] if len(self) else None
+
+    def __len__(self):
+        return len(self.installment_numbers)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.project(self.installment_numbers[key])
+        return self.project([self.installment_numbers[key]])[0]
@@ -1,18 +1,27 @@
 from rest_framework import serializers
 from rest_framework.settings import api_settings
 from decimal import Decimal
+from django.conf import settings
 from django.db import transaction
-from django.db.models import F
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from core.serializers import BaseBankSerializer
+from core.serializers import BaseBankSerializer, CompiledRepresentationMixin
 from authentication.serializers import LoanProviderSubSerializer, LoanCustomerSubSerializer
 from authentication.models import ApplicantStatus, UserRole, LoanProvider
-from banks.models import Bank
-from loans.models import LoanStatus, LoanPlan, Loan, LoanPayment
+from banks.funds import apply_funds_movements
+from banks.models import FundsMovement, FundsLedgerEntry
+from loans.models import LoanStatus, ScheduleMode, LoanPlan, Loan, LoanPayment
+from loans.repayments import RepaymentFileFormat, get_repayment_entry
+from loans.tasks import generate_payment_schedules
+from loans.events import publish_loan_status_changes, publish_payments
+from loans.portfolio import add_to_portfolio, move_loans, disburse_loans_in_portfolio, record_payments_in_portfolio
+from loans.amortization import (
+    calculate_monthly_interest_rate, calculate_monthly_payment, generate_schedules, build_payment_rows, round_to_cent,
+    bump_schedule_versions,
+)
 
 
-class LoanPlanSerializer(BaseBankSerializer):
+class LoanPlanSerializer(CompiledRepresentationMixin, BaseBankSerializer):
 
     class Meta:
         model = LoanPlan
@@ -49,7 +58,44 @@ class LoanPlanSerializer(BaseBankSerializer):
         return super().create(validated_data)
 
 
-class LoanSerializer(BaseBankSerializer):
+class LoanQuoteResultSerializer(serializers.Serializer):
+    # Same digits as the loan's own amounts, money is rendered as strings like on the loans
+    plan = serializers.UUIDField()
+    monthly_payable_amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total_payable_amount = serializers.DecimalField(max_digits=16, decimal_places=2)
+    is_within_plan_range = serializers.BooleanField()
+
+
+class LoanQuoteSerializer(serializers.Serializer):
+    amount = serializers.DecimalField(max_digits=14, decimal_places=2) # As Loan.amount
+    plans = serializers.ListField(
+        child=serializers.UUIDField(), required=False, allow_empty=False, max_length=settings.LOAN_QUOTE_MAX_PLANS
+    )
+
+    def validate_amount(self, value):
+        if value <= Decimal(0):
+            raise serializers.ValidationError(_('Amount must be greater than 0'))
+        return value
+
+    def get_quote(self, plan, amount):
+        monthly_payable_amount = calculate_monthly_payment(amount, plan.annual_interest_rate, plan.duration_in_months)
+        return {
+            'plan': plan.pk,
+            'monthly_payable_amount': round_to_cent(monthly_payable_amount),
+            'total_payable_amount': round_to_cent(monthly_payable_amount * plan.duration_in_months),
+            'is_within_plan_range': plan.minimum_amount <= amount <= plan.maximum_amount,
+        }
+
+    def get_quotes(self):
+        # Nothing is written, every plan of the bank is quoted unless specific plans are requested
+        plans = self.context['queryset'].only('id', 'annual_interest_rate', 'duration_in_months', 'minimum_amount', 'maximum_amount')
+        if 'plans' in self.validated_data:
+            plans = plans.filter(pk__in=self.validated_data['plans'])
+        quotes = [self.get_quote(plan, self.validated_data['amount']) for plan in plans.order_by('pk')]
+        return LoanQuoteResultSerializer(quotes, many=True).data
+
+
+class LoanSerializer(CompiledRepresentationMixin, BaseBankSerializer):
 
     class Meta:
         model = Loan
@@ -65,29 +111,30 @@ class LoanSerializer(BaseBankSerializer):
             'disbursed_at': {'read_only': True},
             'is_active': {'read_only': True},
             'is_amortized': {'read_only': True},
+            'is_overdue': {'read_only': True},
+            'days_past_due': {'read_only': True},
+            'schedule_mode': {'read_only': True},
+            'is_schedule_ready': {'read_only': True},
             'status': {'read_only': True},
         }
     
     def to_representation(self, instance):
+        # Nested serializers are built once and reused across the rows of a page
         data = super().to_representation(instance)
-        data['plan'] = LoanPlanSerializer(instance.plan, context=self.context).data
+        data['plan'] = self.get_nested_serializer(LoanPlanSerializer).to_representation(instance.plan)
         if self.context['request'].user.role in [UserRole.LOAN_PROVIDER.value, UserRole.BANK_PERSONNEL.value]:
-            data['customer'] = LoanCustomerSubSerializer(instance.customer, context=self.context).data
+            data['customer'] = self.get_nested_serializer(LoanCustomerSubSerializer).to_representation(instance.customer)
         if self.context['request'].user.role in [UserRole.LOAN_CUSTOMER.value, UserRole.BANK_PERSONNEL.value]:
-            data['provider'] = LoanProviderSubSerializer(instance.provider, context=self.context).data
+            data['provider'] = self.get_nested_serializer(LoanProviderSubSerializer).to_representation(instance.provider)
         return data
 
     def calculate_monthly_interest_rate(self, annual_interest_rate):
-        return Decimal(annual_interest_rate / Decimal(100) / Decimal(12))
+        return calculate_monthly_interest_rate(annual_interest_rate)
 
     def calculate_monthly_payable_amount(self, validated_data):
-        # Monthly Payment = Principal * Monthly Interest Rate * ((1 + Monthly Interest Rate) ^ Loan Duration in Months) 
-        #                   / 
-        #                   (((1 + Monthly Interest Rate) ^ Loan Duration in Months) - 1)
-        monthly_interest_rate = self.calculate_monthly_interest_rate(validated_data['plan'].annual_interest_rate)
-        first_part_of_equation = validated_data['amount'] * monthly_interest_rate * ((1 + monthly_interest_rate) ** validated_data['plan'].duration_in_months)
-        second_part_of_equation = (((1 + monthly_interest_rate) ** validated_data['plan'].duration_in_months) - 1)
-        return first_part_of_equation / second_part_of_equation
+        return calculate_monthly_payment(
+            validated_data['amount'], validated_data['plan'].annual_interest_rate, validated_data['plan'].duration_in_months
+        )
 
     def calculate_total_payable_amount(self, validated_data):
         return validated_data['monthly_payable_amount'] * validated_data['plan'].duration_in_months
@@ -128,11 +175,15 @@ class LoanSerializer(BaseBankSerializer):
             validated_data['total_payable_amount'] = self.calculate_total_payable_amount(validated_data)
             validated_data['bank'] = self.context['request'].user.role_object.bank
             instance = super().create(validated_data)
+            add_to_portfolio(instance.bank_id, instance.status, loans_count=1, total_amount=instance.amount)
 
         return instance
     
     def validate_releasability(self, instance):
-        provider_total_funds = LoanProvider.objects.filter(pk=instance.provider_id).values_list('total_funds', flat=True).first()
+        # Locked until the deduction commits, a concurrent release of the same provider waits and sees the new balance
+        provider_total_funds = (
+            LoanProvider.objects.select_for_update().filter(pk=instance.provider_id).values_list('total_funds', flat=True).first()
+        )
         if instance.amount > provider_total_funds:
             raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [_('Loan Provider does not have enough funds')]})
 
@@ -143,47 +194,63 @@ class LoanSerializer(BaseBankSerializer):
         return 'status' in validated_data and validated_data['status'] == LoanStatus.DISBURSED.value
 
     def deposit_loan_amount_to_bank(self, instance):
-        with transaction.atomic():
-            # Deduct loan amount from provider's account
-            LoanProvider.objects.filter(pk=instance.provider_id).update(
-                total_funds=F('total_funds') - instance.amount
-            )
-            # Add the deducted amount to the bank
-            Bank.objects.filter(pk=instance.bank_id).update(
-                available_funds=F('available_funds') + instance.amount,
-                total_funds=F('total_funds') + instance.amount
-            )
+        # Deduct loan amount from provider's account and add it to the bank
+        apply_funds_movements([FundsLedgerEntry(
+            movement=FundsMovement.RELEASE.value, bank_id=instance.bank_id, provider_id=instance.provider_id,
+            loan_id=instance.pk, provider_funds=-instance.amount,
+            available_funds=instance.amount, total_funds=instance.amount
+        )])
+
+    def get_disbursement_entry(self, instance):
+        return FundsLedgerEntry(
+            movement=FundsMovement.DISBURSEMENT.value, bank_id=instance.bank_id, loan_id=instance.pk,
+            available_funds=-instance.amount, total_loans=instance.amount
+        )
 
     def disburse_loan(self, instance):
-        with transaction.atomic():
-            Bank.objects.filter(pk=instance.bank_id).update(
-                available_funds=F('available_funds') - instance.amount,
-                total_loans=F('total_loans') + instance.amount
-            )
+        apply_funds_movements([self.get_disbursement_entry(instance)])
+
+    def build_payment_schedules(self, instances):
+        schedules = generate_schedules(
+            [instance.amount for instance in instances],
+            [instance.plan.annual_interest_rate for instance in instances],
+            [instance.plan.duration_in_months for instance in instances],
+            [instance.monthly_payable_amount for instance in instances],
+        )
+        return build_payment_rows(instances, schedules, self.context['request'].user.pk, timezone.now())
 
     def generate_payment_schedule(self, instance):
-        payment_schedules = []
-        remaining_principal = instance.amount
-        monthly_interest_rate = self.calculate_monthly_interest_rate(instance.plan.annual_interest_rate)
-        
-        for month in range(1, instance.plan.duration_in_months + 1):
-            interest_paid = remaining_principal * monthly_interest_rate
-            principal_paid = instance.monthly_payable_amount - interest_paid
-            remaining_principal = Decimal(remaining_principal - principal_paid) if remaining_principal > principal_paid else Decimal(0)
-            payment_schedule = LoanPayment(
-                created_by=self.context['request'].user, created_at=timezone.now(),
-                installment_number=month, loan=instance, amount=instance.monthly_payable_amount,
-                due_date=(instance.approved_at + timezone.timedelta(days=30 * month)),
-                interest_paid=interest_paid, principal_paid=principal_paid, remaining_principal=remaining_principal
-            )
-            payment_schedules.append(payment_schedule)
-        
+        payment_schedules = self.build_payment_schedules([instance])
         with transaction.atomic():
-            LoanPayment.objects.bulk_create(payment_schedules)
+            LoanPayment.objects.bulk_create(payment_schedules, batch_size=settings.LOAN_SCHEDULE_BATCH_SIZE)
+
+    def is_schedule_deferred(self, schedule_mode):
+        # Materialized schedules can be left to a Celery task, virtual ones are projected on read
+        return schedule_mode == ScheduleMode.MATERIALIZED.value and settings.LOAN_SCHEDULE_ASYNC
+
+    def defer_payment_schedules(self, instances):
+        # Enqueued only once the disbursement is committed, the task would not see the loans before
+        loan_ids = [str(instance.pk) for instance in instances]
+        created_by_id = str(self.context['request'].user.pk)
+        transaction.on_commit(lambda: generate_payment_schedules.delay(loan_ids, created_by_id))
+
+    def update_portfolio(self, instance, previous_status):
+        if instance.status == previous_status:
+            return
+        if instance.status == LoanStatus.DISBURSED.value:
+            disburse_loans_in_portfolio([instance])
+        else:
+            move_loans(instance.bank_id, previous_status, instance.status, 1, instance.amount)
 
     def update(self, instance, validated_data):
+        previous_status = instance.status
+        if self.is_disbursed(validated_data):
+            validated_data['is_schedule_ready'] = not self.is_schedule_deferred(validated_data.get('schedule_mode', instance.schedule_mode))
         with transaction.atomic():
             instance = super().update(instance, validated_data)
+            self.update_portfolio(instance, previous_status)
+            if instance.status != previous_status:
+                publish_loan_status_changes([instance])
 
             if self.is_released(validated_data):
                 self.validate_releasability(instance)
@@ -191,11 +258,79 @@ class LoanSerializer(BaseBankSerializer):
             
             if self.is_disbursed(validated_data):
                 self.disburse_loan(instance)
-                self.generate_payment_schedule(instance)
+                bump_schedule_versions([instance.pk]) # Its schedule mode and installments are set now
+                if self.is_schedule_deferred(instance.schedule_mode):
+                    self.defer_payment_schedules([instance])
+                elif instance.schedule_mode == ScheduleMode.MATERIALIZED.value: # Virtual schedules are projected on read
+                    self.generate_payment_schedule(instance)
         
         return instance
 
 
+class LoanBulkDisburseSerializer(serializers.Serializer):
+    loans = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=settings.LOAN_BULK_DISBURSE_MAX_SIZE
+    )
+
+    def get_result(self, loan_id, status, detail):
+        return {'id': loan_id, 'status': status, 'detail': detail}
+
+    def disburse_loans(self, instances):
+        # One ledger INSERT for the batch and one balance UPDATE per bank instead of one per loan
+        loan_serializer = LoanSerializer(context=self.context)
+        apply_funds_movements([loan_serializer.get_disbursement_entry(instance) for instance in instances])
+
+    def generate_payment_schedules(self, instances):
+        loan_serializer = LoanSerializer(context=self.context)
+        instances = [instance for instance in instances if instance.schedule_mode == ScheduleMode.MATERIALIZED.value]
+        if instances and loan_serializer.is_schedule_deferred(ScheduleMode.MATERIALIZED.value):
+            loan_serializer.defer_payment_schedules(instances)
+            return
+        payment_schedules = loan_serializer.build_payment_schedules(instances)
+        LoanPayment.objects.bulk_create(payment_schedules, batch_size=settings.LOAN_SCHEDULE_BATCH_SIZE)
+
+    def create(self, validated_data):
+        loan_ids = list(dict.fromkeys(validated_data['loans'])) # Drop duplicates, keep the request order
+        user = self.context['request'].user
+        now = timezone.now()
+        results = {}
+
+        with transaction.atomic():
+            instances = {
+                instance.pk: instance
+                for instance in self.context['queryset'].filter(pk__in=loan_ids).select_for_update(of=('self',))
+            }
+
+            disbursable = []
+            for loan_id in loan_ids:
+                instance = instances.get(loan_id)
+                if instance is None:
+                    results[loan_id] = self.get_result(loan_id, False, _('Loan not found'))
+                elif instance.status != LoanStatus.RELEASED.value:
+                    results[loan_id] = self.get_result(loan_id, False, _('Loan is not released'))
+                else:
+                    disbursable.append(instance)
+
+            changes = {
+                'status': LoanStatus.DISBURSED.value, 'disbursed_at': now,
+                'schedule_mode': settings.LOAN_SCHEDULE_MODE, 'updated_by': user, 'updated_at': now,
+                'is_schedule_ready': not LoanSerializer(context=self.context).is_schedule_deferred(settings.LOAN_SCHEDULE_MODE),
+            }
+            Loan.objects.filter(pk__in=[instance.pk for instance in disbursable]).update(**changes)
+            for instance in disbursable:
+                for field, value in changes.items():
+                    setattr(instance, field, value)
+                results[instance.pk] = self.get_result(instance.pk, True, _('Loan disbursed'))
+
+            self.disburse_loans(disbursable)
+            disburse_loans_in_portfolio(disbursable)
+            self.generate_payment_schedules(disbursable)
+            publish_loan_status_changes(disbursable)
+            bump_schedule_versions([instance.pk for instance in disbursable])
+
+        return [results[loan_id] for loan_id in loan_ids]
+
+
 class AmortizationScheduleSerializer(BaseBankSerializer):
     
     class Meta:
@@ -209,7 +344,7 @@ class LoanPaymentSerializer(BaseBankSerializer):
         model = LoanPayment
         exclude = BaseBankSerializer.Meta.exclude + (
             'loan', 'interest_paid', 'principal_paid', 'remaining_principal',
-            'is_paid', 'paid_at',
+            'is_paid', 'paid_at', 'is_overdue', 'days_past_due',
         )
 
     def is_paid(self, validated_data, instance):
@@ -220,13 +355,20 @@ class LoanPaymentSerializer(BaseBankSerializer):
             and 'paid_at' in validated_data and validated_data['paid_at']
         )
 
+    def lock_virtual_installment(self, instance):
+        # A projected installment (virtual schedule) gets inserted, its loan is locked like the repayment
+        # import does, then the row checked for, in case it was inserted since the projection
+        if not instance._state.adding:
+            return
+        list(Loan.objects.filter(pk=instance.loan_id).select_for_update().values_list('pk', flat=True))
+        if LoanPayment.objects.filter(
+            loan_id=instance.loan_id, installment_number=instance.installment_number, due_date=instance.due_date,
+            deleted_at__isnull=True, # The due date is the partition key, only its partition is read
+        ).exists():
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [_('Payment already paid')]})
+
     def update_bank_funds(self, instance):
-        with transaction.atomic():
-            Bank.objects.filter(pk=instance.loan.bank_id).update(
-                total_loans=F('total_loans') - instance.principal_paid,
-                available_funds=F('available_funds') + instance.amount,
-                total_funds=F('total_funds') + instance.interest_paid
-            )
+        apply_funds_movements([get_repayment_entry(instance)])
 
     def is_last_payment(self, instance):
         return (
@@ -237,11 +379,45 @@ class LoanPaymentSerializer(BaseBankSerializer):
         with transaction.atomic():
             if not self.is_paid(validated_data, instance):
                 raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [_('No updates to perform')]})
+            self.lock_virtual_installment(instance)
             instance = super().update(instance, validated_data)
             self.update_bank_funds(instance)
+            amortized_loans = []
             if self.is_last_payment(instance):
                 instance.loan.is_active = False
                 instance.loan.is_amortized = True
                 instance.loan.save(update_fields=['is_active', 'is_amortized'])
+                amortized_loans.append(instance.loan)
+            record_payments_in_portfolio([instance], amortized_loans)
+            publish_payments([instance], amortized_loans)
+            bump_schedule_versions([instance.loan_id])
         
         return instance
+
+
+class RepaymentFileSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(choices=RepaymentFileFormat.choices, required=False)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if 'file_format' not in attrs: # Fall back to the file extension
+            extension = attrs['file'].name.rsplit('.', 1)[-1].lower()
+            if extension not in RepaymentFileFormat.choices:
+                raise serializers.ValidationError({'file_format': [_('Unable to detect the repayment file format')]})
+            attrs['file_format'] = extension
+        return attrs
+
+
+class LoanPortfolioStatusSerializer(serializers.Serializer):
+    loans_count = serializers.IntegerField()
+    total_amount = serializers.DecimalField(max_digits=18, decimal_places=2)
+
+
+class LoanPortfolioSummarySerializer(serializers.Serializer):
+    # Same digits as LoanPortfolioSummary, money is rendered as strings like on the loans
+    by_status = serializers.DictField(child=LoanPortfolioStatusSerializer())
+    outstanding_principal = serializers.DecimalField(max_digits=18, decimal_places=2)
+    interest_earned = serializers.DecimalField(max_digits=18, decimal_places=2)
+    active_count = serializers.IntegerField()
+    amortized_count = serializers.IntegerField()
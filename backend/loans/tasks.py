@@ -0,0 +1,22 @@
+from celery import shared_task
+from django.db import OperationalError
+from loans import overdue, partitions
+from loans.amortization import materialize_payment_schedules
+
+
+@shared_task
+def sweep_overdue_installments():
+    # Scheduled by CELERY_BEAT_SCHEDULE, the summary (counts and duration) is the task result
+    return overdue.sweep_overdue_installments()
+
+
+@shared_task
+def create_loan_payment_partitions():
+    # Scheduled by CELERY_BEAT_SCHEDULE, keeps partitions ready up to the longest plan's last installment
+    return partitions.create_loan_payment_partitions()
+
+
+@shared_task(autoretry_for=(OperationalError,), retry_backoff=True, max_retries=5)
+def generate_payment_schedules(loan_ids, created_by_id=None):
+    # Enqueued once the disbursement commits, safe to retry (see materialize_payment_schedules)
+    return materialize_payment_schedules(loan_ids, created_by_id)
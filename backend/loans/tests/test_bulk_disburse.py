@@ -0,0 +1,89 @@
+import pytest
+import uuid
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from banks.models import Bank
+from loans.models import Loan, LoanPayment, LoanPortfolioSummary, LoanStatus
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/v1/loans/applications/bulk-disburse'
+
+
+@pytest.fixture(autouse=True)
+def funds(settings, bank):
+    settings.BANK_FUNDS_SHARDS = 0 # Balances updated on the Bank row itself
+    settings.LOAN_SCHEDULE_ASYNC = False
+    settings.LOAN_SCHEDULE_MODE = 'materialized'
+    Bank.objects.filter(pk=bank.pk).update(total_funds=Decimal('100000.00'), available_funds=Decimal('100000.00'))
+
+
+@pytest.fixture
+def make_loan(plan, provider, customer):
+    def create_loan(status=LoanStatus.RELEASED.value, amount='10000.00', **kwargs):
+        return Loan.objects.create(**{
+            'purpose': 'Car', 'amount': amount, 'plan': plan, 'provider': provider, 'customer': customer,
+            'bank': plan.bank, 'total_payable_amount': '10661.85', 'monthly_payable_amount': '888.49',
+            'status': status, 'approved_at': timezone.now(), 'created_at': timezone.now(), **kwargs,
+        })
+    return create_loan
+
+
+def count_updates(queries, table):
+    return sum(1 for query in queries if query['sql'].startswith(f'UPDATE "{table}"'))
+
+
+def test_released_loans_are_disbursed_with_one_bank_update(api_client, personnel, bank, make_loan):
+    loans = [make_loan(amount=amount) for amount in ('10000.00', '20000.00', '30000.00')]
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client(personnel.user).post(URL, {'loans': [str(loan.pk) for loan in loans]}, format='json')
+    assert response.status_code == 200
+    assert [row['status'] for row in response.json()['data']] == [True, True, True]
+    assert count_updates(queries.captured_queries, Bank._meta.db_table) == 1
+
+    assert Loan.objects.filter(status=LoanStatus.DISBURSED.value, is_schedule_ready=True).count() == 3
+    assert LoanPayment.objects.filter(loan__in=loans).count() == 3 * loans[0].plan.duration_in_months
+    bank.refresh_from_db()
+    assert (bank.available_funds, bank.total_loans) == (Decimal('40000.00'), Decimal('60000.00'))
+    summary = LoanPortfolioSummary.objects.get(bank=bank, status=LoanStatus.DISBURSED.value)
+    assert (summary.loans_count, summary.outstanding_principal) == (3, Decimal('60000.00'))
+
+
+def test_ineligible_loans_are_reported_and_left_alone(api_client, personnel, bank, make_loan):
+    released = make_loan()
+    pending = make_loan(status=LoanStatus.PENDING.value)
+    disbursed = make_loan(status=LoanStatus.DISBURSED.value)
+    missing = uuid.uuid4()
+    loan_ids = [str(released.pk), str(pending.pk), str(disbursed.pk), str(missing), str(released.pk)]
+
+    response = api_client(personnel.user).post(URL, {'loans': loan_ids}, format='json')
+    assert response.status_code == 200
+    assert [(row['id'], row['status']) for row in response.json()['data']] == [
+        (str(released.pk), True), (str(pending.pk), False), (str(disbursed.pk), False), (str(missing), False),
+    ]
+    pending.refresh_from_db()
+    assert pending.status == LoanStatus.PENDING.value
+    assert not LoanPayment.objects.filter(loan__in=[pending, disbursed]).exists()
+    bank.refresh_from_db()
+    assert bank.available_funds == Decimal('90000.00')
+
+
+def test_loans_of_another_bank_are_not_found(api_client, personnel, provider, customer, plan, bank, make_loan):
+    own = make_loan()
+    other_bank = Bank.objects.create(name_en='Other', name_ar='Other', created_at=timezone.now(), available_funds=Decimal('50000.00'))
+    other = make_loan(bank=other_bank)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client(personnel.user).post(URL, {'loans': [str(own.pk), str(other.pk)]}, format='json')
+    assert response.status_code == 200
+    assert [row['status'] for row in response.json()['data']] == [True, False]
+    assert response.json()['data'][1]['detail'] == 'Loan not found'
+    assert count_updates(queries.captured_queries, Bank._meta.db_table) == 1
+
+    other.refresh_from_db()
+    other_bank.refresh_from_db()
+    assert other.status == LoanStatus.RELEASED.value
+    assert (other_bank.available_funds, other_bank.total_loans) == (Decimal('50000.00'), Decimal('0.00'))
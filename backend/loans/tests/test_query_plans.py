@@ -0,0 +1,31 @@
+import pytest
+from django.db import connection
+from loans.management.commands.check_query_plans import PRUNED_QUERIES, Command as CheckQueryPlansCommand
+from loans.models import LoanPayment
+from loans.partitions import filter_loan_payments, get_partition_names, is_partitioned
+
+# The planners only choose between a scan and an index on large tables with fresh statistics, hence the
+# seeded dataset. Runs on PostgreSQL and SQLite, find_sequential_scans reads either plan format.
+
+
+@pytest.mark.django_db
+def test_hot_queries_do_not_scan_sequentially():
+    command = CheckQueryPlansCommand()
+    hot_rows = command.seed(banks_count=20, loans_count=20000, seed=0)
+    scans = {name: command.find_sequential_scans(queryset) for name, queryset in command.get_hot_queries(*hot_rows).items()}
+    assert {name: tables for name, tables in scans.items() if tables} == {}
+
+
+@pytest.mark.django_db
+def test_per_loan_queries_are_pruned_to_the_loan_due_dates():
+    command = CheckQueryPlansCommand()
+    bank, provider, customer, loan = command.seed(banks_count=2, loans_count=200, seed=0)
+    installments = filter_loan_payments(LoanPayment.objects.all(), [loan])
+    assert set(installments) == set(LoanPayment.objects.filter(loan_id=loan.pk)) # Bounds never leave a row out
+    assert 'due_date' in str(installments.query)
+
+    with connection.cursor() as cursor: # Partitioned PostgreSQL, the plans only read the loan's partitions
+        partitions_count = len(get_partition_names(cursor)) if is_partitioned(cursor) else 0
+    if partitions_count:
+        hot_queries = command.get_hot_queries(bank, provider, customer, loan)
+        assert all(command.check_pruning(hot_queries[name], partitions_count) for name in PRUNED_QUERIES)
@@ -0,0 +1,87 @@
+import io
+import json
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from banks.models import Bank
+from loans.amortization import materialize_payment_schedules
+from loans.models import Loan, LoanPayment, LoanStatus
+from loans.repayments import RepaymentIngestor, RepaymentFileFormat, read_repayment_rows
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def make_loan(plan, provider, customer):
+    # A disbursed loan with its installments
+    def create_loan(bank=None):
+        loan = Loan.objects.create(
+            purpose='Car', amount='12000.00', plan=plan, provider=provider, customer=customer, bank=bank or plan.bank,
+            total_payable_amount='12794.23', monthly_payable_amount='1066.19', status=LoanStatus.DISBURSED.value,
+            approved_at=timezone.now(), created_at=timezone.now(),
+        )
+        materialize_payment_schedules([loan.pk])
+        return loan
+    return create_loan
+
+
+def ingest(lines, file_format, **kwargs):
+    stream = io.StringIO(''.join(f'{line}\n' for line in lines))
+    return RepaymentIngestor(**kwargs).ingest(read_repayment_rows(stream, file_format))
+
+
+def test_csv_file_is_imported(api_client, personnel, bank, make_loan):
+    loan = make_loan()
+    content = f'loan,installment_number,paid_at\n{loan.pk},1,2024-01-01T10:00:00Z\n{loan.pk},2,\n'
+    upload = SimpleUploadedFile('repayments.csv', content.encode(), content_type='text/csv')
+
+    response = api_client(personnel.user).post('/api/v1/loans/repayments', {'file': upload}, format='multipart')
+    assert response.status_code == 200
+    assert response.json()['data'] == {'rows': 2, 'paid': 2, 'skipped': 0, 'errors': []}
+
+    paid = LoanPayment.objects.filter(loan=loan, is_paid=True).order_by('installment_number')
+    assert [payment.installment_number for payment in paid] == [1, 2]
+    assert paid[0].paid_at.isoformat() == '2024-01-01T10:00:00+00:00'
+    bank.refresh_from_db()
+    assert bank.available_funds == sum(payment.amount for payment in paid)
+
+
+def test_ndjson_rows_skip_invalid_duplicate_and_paid_installments(bank, make_loan):
+    loan = make_loan()
+    LoanPayment.objects.filter(loan=loan, installment_number=2).update(is_paid=True, paid_at=timezone.now())
+    lines = [
+        json.dumps({'loan': str(loan.pk), 'installment_number': 1}),
+        json.dumps({'loan': str(loan.pk), 'installment_number': 1}),
+        json.dumps({'loan': str(loan.pk), 'installment_number': 2}),
+        json.dumps({'loan': str(loan.pk), 'installment_number': 13}),
+        'not json',
+    ]
+
+    summary = ingest(lines, RepaymentFileFormat.NDJSON, bank_id=bank.pk)
+    assert (summary['rows'], summary['paid'], summary['skipped']) == (5, 1, 4)
+    assert [(error['row'], str(error['detail'])) for error in summary['errors']] == [
+        (2, 'Duplicate repayment row'), (5, 'Invalid repayment row'), (3, 'Payment already paid'), (4, 'Installment not found'),
+    ]
+    assert LoanPayment.objects.filter(loan=loan, is_paid=True).count() == 2
+
+
+def test_installments_of_another_bank_are_not_found(bank, make_loan):
+    other_bank = Bank.objects.create(name_en='Other', name_ar='Other', created_at=timezone.now())
+    other = make_loan(bank=other_bank)
+
+    summary = ingest([json.dumps({'loan': str(other.pk), 'installment_number': 1})], RepaymentFileFormat.NDJSON, bank_id=bank.pk)
+    assert (summary['paid'], str(summary['errors'][0]['detail'])) == (0, 'Installment not found')
+    assert not LoanPayment.objects.filter(loan=other, is_paid=True).exists()
+    other_bank.refresh_from_db()
+    assert other_bank.available_funds == 0
+
+
+def test_final_installment_amortizes_the_loan(bank, plan, make_loan):
+    loan = make_loan()
+    LoanPayment.objects.filter(loan=loan, installment_number__lt=plan.duration_in_months).update(is_paid=True, paid_at=timezone.now())
+
+    lines = ['loan,installment_number,paid_at', f'{loan.pk},{plan.duration_in_months},']
+    summary = ingest(lines, RepaymentFileFormat.CSV, bank_id=bank.pk)
+    assert summary['paid'] == 1
+    loan.refresh_from_db()
+    assert (loan.is_amortized, loan.is_active) == (True, False)
@@ -0,0 +1,49 @@
+import json
+import pytest
+from django.contrib.auth.models import Group
+from django.utils import timezone
+from authentication.models import LoanCustomer, User, UserRole
+from banks.models import Bank
+from loans.models import Loan, LoanStatus
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def virtual_loan(settings, api_client, plan, personnel, provider, customer):
+    settings.LOAN_SCHEDULE_MODE = 'virtual'
+    loan = Loan.objects.create(
+        purpose='Car', amount='12000.00', plan=plan, provider=provider, customer=customer, bank=plan.bank,
+        total_payable_amount='12794.23', monthly_payable_amount='1066.19', status=LoanStatus.RELEASED.value,
+        approved_at=timezone.now(), created_at=timezone.now(),
+    )
+    assert api_client(personnel.user).get(f'/api/v1/loans/applications/{loan.pk}/disburse').status_code == 200
+    return loan
+
+
+def test_virtual_schedule_is_served_to_the_loan_parties(api_client, personnel, customer, virtual_loan):
+    response = api_client(personnel.user).get(f'/api/v1/loans/{virtual_loan.pk}/amortization-schedule')
+    assert response.status_code == 200
+    assert json.loads(b''.join(response.streaming_content))['data'][0]['installment_number'] == 1
+    response = api_client(customer.user).get(f'/api/v1/loans/{virtual_loan.pk}/payments/next-payment')
+    assert response.status_code == 200
+    assert response.json()['data']['installment_number'] == 1
+
+
+def test_virtual_schedule_of_another_bank_is_not_found(api_client, make_personnel, virtual_loan):
+    other_personnel = make_personnel(Bank.objects.create(name_en='Other', name_ar='Other', created_at=timezone.now()), 'other')
+    client = api_client(other_personnel.user)
+    assert client.get(f'/api/v1/loans/{virtual_loan.pk}/amortization-schedule').status_code == 404
+    assert client.get(f'/api/v1/loans/{virtual_loan.pk}/amortization-schedule/1').status_code == 404
+
+
+def test_virtual_schedule_of_another_customer_is_not_found(api_client, bank, virtual_loan):
+    user = User.objects.create_user('other@example.com', 'other', 'password')
+    user.role = UserRole.LOAN_CUSTOMER.value
+    user.save()
+    user.groups.add(Group.objects.get(name=UserRole.LOAN_CUSTOMER.value))
+    other_customer = LoanCustomer.objects.create(
+        user=user, bank=bank, ssn='2', credit_score=700,
+        monthly_income='5000.00', created_at=timezone.now(),
+    )
+    assert api_client(other_customer.user).get(f'/api/v1/loans/{virtual_loan.pk}/payments/next-payment').status_code == 404
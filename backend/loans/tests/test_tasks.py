@@ -0,0 +1,78 @@
+import pytest
+from unittest import mock
+from django.db import OperationalError
+from backend.celery import app as celery_app
+from loans import tasks
+from loans.amortization import materialize_payment_schedules
+from loans.models import Loan, LoanPayment
+
+
+@pytest.fixture
+def released_loan(api_client, plan, personnel, provider, customer):
+    response = api_client(customer.user).post('/api/v1/loans', {
+        'purpose': 'Car', 'amount': '12000.00', 'plan': plan.pk, 'customer': customer.pk, 'provider': provider.pk,
+    }, format='json')
+    loan_id = response.json()['data']['id']
+    api_client(personnel.user).get(f'/api/v1/loans/applications/{loan_id}/approve')
+    api_client(provider.user).get(f'/api/v1/loans/applications/{loan_id}/release')
+    return Loan.objects.get(pk=loan_id)
+
+
+@pytest.fixture
+def async_schedules(settings):
+    settings.LOAN_SCHEDULE_ASYNC = True
+    settings.LOAN_SCHEDULE_MODE = 'materialized'
+
+
+@pytest.fixture
+def inline_retries():
+    # Eager tasks raise Retry when errors propagate, they're retried inline otherwise
+    celery_app.conf.update(CELERY_TASK_EAGER_PROPAGATES=False)
+    yield
+    celery_app.conf.update(CELERY_TASK_EAGER_PROPAGATES=True)
+
+
+def disburse(api_client, personnel, loan):
+    response = api_client(personnel.user).get(f'/api/v1/loans/applications/{loan.pk}/disburse')
+    assert response.status_code == 200
+
+
+def test_disbursement_generates_the_schedule_after_commit(async_schedules, api_client, personnel, released_loan, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks() as callbacks:
+        disburse(api_client, personnel, released_loan)
+    released_loan.refresh_from_db()
+    assert not released_loan.is_schedule_ready
+    assert not LoanPayment.objects.filter(loan=released_loan).exists()
+
+    for callback in callbacks: # The task, run inline
+        callback()
+    released_loan.refresh_from_db()
+    assert released_loan.is_schedule_ready
+    assert LoanPayment.objects.filter(loan=released_loan).count() == released_loan.plan.duration_in_months
+
+
+def test_rerun_skips_generated_schedules(async_schedules, api_client, personnel, released_loan, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        disburse(api_client, personnel, released_loan)
+
+    assert tasks.generate_payment_schedules.delay([str(released_loan.pk)], str(personnel.user.pk)).get() == 0
+    assert LoanPayment.objects.filter(loan=released_loan).count() == released_loan.plan.duration_in_months
+
+
+def test_retries_on_operational_error(async_schedules, inline_retries, api_client, personnel, released_loan, django_capture_on_commit_callbacks):
+    calls = []
+
+    def materialize_once_unavailable(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise OperationalError('Database unavailable')
+        return materialize_payment_schedules(*args)
+
+    with mock.patch('loans.tasks.materialize_payment_schedules', side_effect=materialize_once_unavailable):
+        with django_capture_on_commit_callbacks(execute=True):
+            disburse(api_client, personnel, released_loan)
+
+    assert len(calls) == 2
+    released_loan.refresh_from_db()
+    assert released_loan.is_schedule_ready
+    assert LoanPayment.objects.filter(loan=released_loan).count() == released_loan.plan.duration_in_months
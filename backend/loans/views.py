@@ -1,18 +1,39 @@
+import io
 from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import BrowsableAPIRenderer
+from django_filters.rest_framework import DjangoFilterBackend
+from django_filters import utils as filter_utils
 from django.db.models import Q
+from django.http import Http404
 from django.utils import timezone
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
+from core.renderers import BankJSONRenderer
+from core.idempotency import idempotent
+from core.exports import ExportFormat, get_export_response
+from core.versions import get_version_key
 from core.views import BaseBankViewSet, NonCreatableViewSet, NonUpdatableViewSet, NonDeletableViewSet
 from authentication.models import UserRole
-from loans.serializers import LoanPlanSerializer, LoanSerializer, LoanPaymentSerializer, AmortizationScheduleSerializer
-from loans.models import LoanPlan, Loan, LoanPayment, LoanStatus
+from loans.serializers import (
+    LoanPlanSerializer, LoanQuoteSerializer, LoanSerializer, LoanBulkDisburseSerializer,
+    LoanPaymentSerializer, AmortizationScheduleSerializer, RepaymentFileSerializer, LoanPortfolioSummarySerializer
+)
+from loans.models import LoanPlan, Loan, LoanPayment, LoanPortfolioSummary, LoanStatus, ScheduleMode
 from loans.filters import LoanFilter, LoanPaymentFilter
+from loans.amortization import get_schedule_version_scope
+from loans.partitions import filter_loan_payments
+from loans.schedules import VirtualSchedule, get_filterset_lookups
+from loans.repayments import RepaymentIngestor, read_repayment_rows
+from loans.portfolio import get_portfolio_summary
+from loans.exports import EXPORTS, get_export_queryset
 from loans.permissions import (
     ApproveLoanPermissions, RejectLoanPermissions,
-    ReleaseLoanPermissions, DisburseLoanPermissions,
-    PayLoanPermissions, AmortizationSchedulePermissions
+    ReleaseLoanPermissions, DisburseLoanPermissions, BulkDisburseLoanPermissions,
+    PayLoanPermissions, AmortizationSchedulePermissions, ImportRepaymentsPermissions, QuoteLoanPermissions,
+    PortfolioSummaryPermissions, ExportPermissions
 )
 
 
@@ -20,6 +41,7 @@ class LoanPlanViewSet(NonUpdatableViewSet, NonDeletableViewSet, BaseBankViewSet)
     model = LoanPlan
     queryset = model.objects.all()
     serializer_class = LoanPlanSerializer
+    cache_list_responses = True # Read on most screens, rarely written
 
     def get_queryset(self):
         return (
@@ -27,23 +49,33 @@ class LoanPlanViewSet(NonUpdatableViewSet, NonDeletableViewSet, BaseBankViewSet)
             .filter(bank_id=self.request.user.role_object.bank_id)
         )
 
+    def get_version_scope(self):
+        return f'bank:{self.request.user.role_object.bank_id}'
+
+    @action(detail=False, methods=['post',], url_path='quote', url_name='quote', permission_classes=[QuoteLoanPermissions])
+    def quote(self, request):
+        serializer = LoanQuoteSerializer(data=request.data, context={**self.get_serializer_context(), 'queryset': self.get_queryset()})
+        serializer.is_valid(raise_exception=True)
+        return Response({'data': serializer.get_quotes()}, status=status.HTTP_200_OK)
+
+
+def filter_user_loans(queryset, user):
+    queryset = queryset.filter(bank_id=user.role_object.bank_id)
+    if user.role == UserRole.LOAN_PROVIDER.value: # Loan provider can only see loans that they provided
+        queryset = queryset.filter(provider_id=user.role_object.pk)
+    elif user.role == UserRole.LOAN_CUSTOMER.value: # Loan customer can only see loans that they applied for
+        queryset = queryset.filter(customer_id=user.role_object.pk)
+    return queryset
+
 
 class LoanViewSet(NonUpdatableViewSet, NonDeletableViewSet, BaseBankViewSet):
     model = Loan
     queryset = model.objects.all()
     serializer_class = LoanSerializer
+    streaming_list = True
 
     def get_queryset(self):
-        queryset = (
-            super().get_queryset()
-            .filter(bank_id=self.request.user.role_object.bank_id)
-            .select_related('plan', 'customer', 'provider')
-        )
-        if self.request.user.role == UserRole.LOAN_PROVIDER.value: # Loan provider can only see loans that they provided
-            queryset = queryset.filter(provider=self.request.user.role_object)
-        elif self.request.user.role == UserRole.LOAN_CUSTOMER.value: # Loan customer can only see loans that they applied for
-            queryset = queryset.filter(customer=self.request.user.role_object)
-        return queryset
+        return filter_user_loans(super().get_queryset(), self.request.user).select_related('plan', 'customer', 'provider')
 
 
 class LoanApplicationViewSet(NonCreatableViewSet, LoanViewSet):
@@ -57,7 +89,8 @@ class LoanApplicationViewSet(NonCreatableViewSet, LoanViewSet):
             queryset = queryset.filter(status=LoanStatus.APPROVED.value)
         return queryset
 
-    @action(detail=True, methods=['get',], url_path='approve', url_name='approve', permission_classes=[ApproveLoanPermissions])
+    @action(detail=True, methods=['get',], url_path='approve', url_name='approve', permission_classes=[ApproveLoanPermissions], rate_limit_scope='transitions')
+    @idempotent
     def approve(self, request, pk=None):
         instance = self.get_object()
         if instance.status != LoanStatus.PENDING.value:
@@ -70,7 +103,8 @@ class LoanApplicationViewSet(NonCreatableViewSet, LoanViewSet):
         )
         return Response({'message': _('Loan approved')}, status=status.HTTP_200_OK)
     
-    @action(detail=True, methods=['get',], url_path='reject', url_name='reject', permission_classes=[RejectLoanPermissions])
+    @action(detail=True, methods=['get',], url_path='reject', url_name='reject', permission_classes=[RejectLoanPermissions], rate_limit_scope='transitions')
+    @idempotent
     def reject(self, request, pk=None):
         instance = self.get_object()
         if instance.status != LoanStatus.PENDING.value:
@@ -83,7 +117,8 @@ class LoanApplicationViewSet(NonCreatableViewSet, LoanViewSet):
         )
         return Response({'message': _('Loan rejected')}, status=status.HTTP_200_OK)
     
-    @action(detail=True, methods=['get',], url_path='release', url_name='release', permission_classes=[ReleaseLoanPermissions])
+    @action(detail=True, methods=['get',], url_path='release', url_name='release', permission_classes=[ReleaseLoanPermissions], rate_limit_scope='transitions')
+    @idempotent
     def release(self, request, pk=None):
         instance = self.get_object()
         if instance.status != LoanStatus.APPROVED.value:
@@ -96,7 +131,8 @@ class LoanApplicationViewSet(NonCreatableViewSet, LoanViewSet):
         )
         return Response({'message': _('Loan released')}, status=status.HTTP_200_OK)
     
-    @action(detail=True, methods=['get',], url_path='disburse', url_name='disburse', permission_classes=[DisburseLoanPermissions])
+    @action(detail=True, methods=['get',], url_path='disburse', url_name='disburse', permission_classes=[DisburseLoanPermissions], rate_limit_scope='transitions')
+    @idempotent
     def disburse(self, request, pk=None):
         instance = self.get_object()
         if instance.status != LoanStatus.RELEASED.value:
@@ -105,51 +141,130 @@ class LoanApplicationViewSet(NonCreatableViewSet, LoanViewSet):
         serializer.is_valid(raise_exception=True)
         serializer.save(
             updated_by=self.request.user, updated_at=timezone.now(),
-            disbursed_at=timezone.now(), status=LoanStatus.DISBURSED.value
+            disbursed_at=timezone.now(), status=LoanStatus.DISBURSED.value,
+            schedule_mode=settings.LOAN_SCHEDULE_MODE
         )
         return Response({'message': _('Loan disbursed')}, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post',], url_path='bulk-disburse', url_name='bulk-disburse', permission_classes=[BulkDisburseLoanPermissions], rate_limit_scope='transitions')
+    def bulk_disburse(self, request):
+        serializer = LoanBulkDisburseSerializer(
+            data=request.data, context={**self.get_serializer_context(), 'queryset': self.get_queryset()}
+        )
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        return Response({'message': _('Bulk disbursement processed'), 'data': results}, status=status.HTTP_200_OK)
+
+
+class VirtualScheduleMixin:
+    """
+    Serves the installments of loans disbursed in virtual schedule mode, where only
+    payment events are stored and the remaining installments are projected on read.
+    """
+
+    def get_loan(self):
+        # Only the loans the user can see, like LoanViewSet, anything else is a 404
+        if not hasattr(self, '_loan'):
+            loans = filter_user_loans(Loan.objects.select_related('plan'), self.request.user)
+            self._loan = loans.filter(pk=self.kwargs['loan_pk']).first()
+        if self._loan is None:
+            raise Http404
+        return self._loan
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.get_loan() # Once authenticated, before anything of the loan is read
+
+    def has_virtual_schedule(self):
+        return self.get_loan().schedule_mode == ScheduleMode.VIRTUAL.value
 
-class AmortizationScheduleViewSet(NonCreatableViewSet, NonUpdatableViewSet, NonDeletableViewSet, BaseBankViewSet):
+    def get_virtual_schedule(self, lookups=()):
+        return VirtualSchedule(self.get_loan(), self.get_queryset(), lookups)
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            if not self.has_virtual_schedule():
+                raise
+            instance = self.get_virtual_schedule().get(self.kwargs['pk'])
+            if instance is None:
+                raise
+            self.check_object_permissions(self.request, instance)
+            return instance
+
+
+class AmortizationScheduleViewSet(VirtualScheduleMixin, NonCreatableViewSet, NonUpdatableViewSet, NonDeletableViewSet, BaseBankViewSet):
     model = LoanPayment
     queryset = model.objects.all()
     permission_classes = [AmortizationSchedulePermissions]
     serializer_class = AmortizationScheduleSerializer
     filterset_class = LoanPaymentFilter
+    cursor_ordering = ('installment_number',)
+    streaming_list = True
 
     def get_queryset(self):
-        return (
-            super().get_queryset()
-            .filter(loan_id=self.kwargs['loan_pk'])
-        )
+        return filter_loan_payments(super().get_queryset(), [self.get_loan()]) # Pruned to the loan's partitions
+
+    def get_version_scope(self):
+        return get_schedule_version_scope(self.kwargs['loan_pk'])
+
+    def get_version_keys(self):
+        # Overdue flags of virtual schedules are projected from today's date, they change with it
+        return super().get_version_keys() + [get_version_key(self.model, f'date:{timezone.localdate()}')]
+
+    def list(self, request, *args, **kwargs):
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+        if not self.has_virtual_schedule():
+            return super().list(request, *args, **kwargs)
+
+        filterset = DjangoFilterBackend().get_filterset(request, self.get_queryset(), self)
+        if not filterset.is_valid():
+            raise filter_utils.translate_validation(filterset.errors)
+
+        schedule = self.get_virtual_schedule(get_filterset_lookups(filterset))
+        self._paginator = self.pagination_class() # Virtual schedules are not querysets, page numbers only
+        page = self.paginate_queryset(schedule)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
 
+        serializer = self.get_serializer(schedule[:], many=True)
+        return Response(serializer.data)
 
-class LoanPaymentViewSet(NonCreatableViewSet, NonUpdatableViewSet, NonDeletableViewSet, BaseBankViewSet):
+
+class LoanPaymentViewSet(VirtualScheduleMixin, NonCreatableViewSet, NonUpdatableViewSet, NonDeletableViewSet, BaseBankViewSet):
     model = LoanPayment
     queryset = model.objects.all()
     permission_classes = [PayLoanPermissions]
     serializer_class = LoanPaymentSerializer
 
     def get_queryset(self):
-        return (
-            super().get_queryset()
-            .filter(loan_id=self.kwargs['loan_pk'])
-        )
+        return filter_loan_payments(super().get_queryset(), [self.get_loan()]) # Pruned to the loan's partitions
 
     @action(detail=False, methods=['get',], url_path='next-payment', url_name='next-payment')
     def next_payment(self, request, loan_pk=None):
-        instance = (
-            self.get_queryset()
-            .filter(is_paid=False, paid_at__isnull=True)
-            .order_by('installment_number')
-            .first()
-        )
+        loan = self.get_loan()
+        if loan.status == LoanStatus.DISBURSED.value and not loan.is_schedule_ready:
+            return Response({'detail': _('Payment schedule is still being generated')}, status=status.HTTP_400_BAD_REQUEST)
+        if self.has_virtual_schedule():
+            instance = self.get_virtual_schedule(lookups=[('is_paid', 'exact', False)]).first()
+        else:
+            instance = (
+                self.get_queryset()
+                .filter(is_paid=False, paid_at__isnull=True)
+                .order_by('installment_number')
+                .first()
+            )
         serializer = self.get_serializer(instance)
         if instance is None:
             return Response({'message': _('No more payments to be made')}, status=status.HTTP_200_OK)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-    @action(detail=True, methods=['get',], url_path='pay', url_name='pay')
+    @action(detail=True, methods=['get',], url_path='pay', url_name='pay', rate_limit_scope='transitions')
+    @idempotent
     def pay(self, request, loan_pk=None, pk=None):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data={}, partial=True)
@@ -159,3 +274,45 @@ class LoanPaymentViewSet(NonCreatableViewSet, NonUpdatableViewSet, NonDeletableV
             is_paid=True, paid_at=timezone.now()
         )
         return Response({'message': _('Loan payment successful')}, status=status.HTTP_200_OK)
+
+
+class LoanRepaymentViewSet(viewsets.GenericViewSet):
+    queryset = LoanPayment.objects.all()
+    serializer_class = RepaymentFileSerializer
+    permission_classes = [ImportRepaymentsPermissions]
+    parser_classes = [MultiPartParser]
+    renderer_classes = [BankJSONRenderer, BrowsableAPIRenderer]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        stream = io.TextIOWrapper(serializer.validated_data['file'], encoding='utf-8', newline='')
+        ingestor = RepaymentIngestor(user=request.user, bank_id=request.user.role_object.bank_id)
+        summary = ingestor.ingest(read_repayment_rows(stream, serializer.validated_data['file_format']))
+        return Response({'message': _('Repayment file processed'), 'data': summary}, status=status.HTTP_200_OK)
+
+
+class LoanPortfolioViewSet(viewsets.GenericViewSet):
+    queryset = LoanPortfolioSummary.objects.all()
+    serializer_class = LoanPortfolioSummarySerializer
+    permission_classes = [PortfolioSummaryPermissions]
+    renderer_classes = [BankJSONRenderer, BrowsableAPIRenderer]
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer(get_portfolio_summary(request.user.role_object.bank_id))
+        return Response({'data': serializer.data}, status=status.HTTP_200_OK)
+
+
+class ExportViewSet(viewsets.GenericViewSet):
+    queryset = Loan.objects.all()
+    permission_classes = [ExportPermissions]
+    lookup_field = 'name'
+    lookup_value_regex = '|'.join(EXPORTS)
+    file_format_query_param = 'file_format' # ?format= is taken by DRF's renderer negotiation
+
+    def retrieve(self, request, name=None):
+        file_format = request.query_params.get(self.file_format_query_param, ExportFormat.CSV)
+        if file_format not in ExportFormat.choices:
+            return Response({'detail': _('Unsupported export format')}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = get_export_queryset(EXPORTS[name], request.user.role_object.bank_id, request.query_params, request)
+        return get_export_response(queryset, EXPORTS[name].fields, file_format, name)